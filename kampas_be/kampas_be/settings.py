@@ -399,3 +399,75 @@ BULK_UPLOAD_MAX_CHECKS = 15
 # Worker settings for better shutdown
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 50
+
+# Cache (hot vector tiles)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }
+}
+
+# Vector tile settings
+VECTOR_TILE_EXTENT = 4096
+VECTOR_TILE_BUFFER = 64
+VECTOR_TILE_MAX_FEATURES = 50000  # Lowest ids kept, capped tiles flagged with X-Tile-Truncated
+VECTOR_TILE_CACHE_TIMEOUT = 24 * 60 * 60  # Redis TTL for hot tiles
+VECTOR_TILE_CACHE_MAX_ZOOM = 16  # Deeper tiles are always built on request
+VECTOR_TILE_STALE_DELETE_DELAY = 5 * 60  # Seconds before a superseded tile version is removed from S3
+VECTOR_TILE_S3_PREFIX = 'tiles/vector_layers'
+
+# Vector layer processing
+VECTOR_SPLIT_MAX_OUTPUTS = 500  # Upper bound on layers created by one multi-output split
+VECTOR_FEATURE_BATCH_MAX_ITEMS = 10000  # Items accepted by one features/batch/ request
+VECTOR_INGEST_REPAIR_INVALID = True  # ST_MakeValid invalid geometries on upload instead of rejecting them
+VECTOR_INGEST_REPORT_S3_PREFIX = 'ingest_reports/vector_layers'
+
+# Pre-simplified geometry levels (ST_SimplifyPreserveTopology tolerances in degrees, finest first)
+VECTOR_LOD_TOLERANCES = (0.0001, 0.001, 0.01)
+
+# Point clustering
+VECTOR_CLUSTER_CELLS_PER_TILE = 8  # Grid cells across a 256px tile (about 32px per cluster)
+VECTOR_CLUSTER_MAX_ZOOM = 17  # From this zoom on points are returned individually
+VECTOR_CLUSTER_MAX_POINTS = 5000  # Cap on individual points per response
+
+# Attribute filter expression indexes
+VECTOR_ATTRIBUTE_INDEX_MIN_FILTERS = 50  # Filters on a key before an index is built for it
+VECTOR_ATTRIBUTE_INDEX_MIN_FEATURES = 10000  # Smaller layers are scanned quickly enough without one
+VECTOR_ATTRIBUTE_INDEX_PENDING_TIMEOUT = 60 * 60  # Seconds before an unfinished index build is queued again
+
+# Attribute catalog (per-layer key/type/value statistics)
+VECTOR_ATTRIBUTE_CATALOG_TOP_VALUES = 10  # Most frequent values kept per attribute
+VECTOR_ATTRIBUTE_CATALOG_REFRESH_DELAY = 30  # Seconds edits are batched before the catalog is rebuilt
+
+# Cloud-Optimized GeoTIFF conversion of raster and terrain uploads
+RASTER_COG_ENABLED = True
+RASTER_COG_COMPRESSION = 'DEFLATE'  # JPEG/WEBP are used only for 8-bit greyscale or RGB rasters
+RASTER_COG_BLOCKSIZE = 512  # Internal tile size in pixels
+RASTER_COG_OVERVIEW_RESAMPLING = 'average'
+
+# Raster band statistics
+RASTER_STATS_APPROXIMATE = False  # True computes statistics from overviews only
+RASTER_STATS_APPROX_SIZE = 1024  # Largest dimension of the decimated read used for approximate stats
+RASTER_STATS_HISTOGRAM_BINS = 256
+RASTER_STATS_MAX_WORKERS = 4  # Bands computed in parallel
+
+# GDAL reads straight from S3 (/vsis3/)
+RASTER_GDAL_CACHEMAX = 512  # GDAL block cache in MB
+RASTER_VSI_CACHE_SIZE = 64 * 1024 * 1024  # Bytes of fetched ranges kept per file
+
+# How raster/terrain files reach GeoServer: 'upload' (HTTP PUT of the file),
+# 'external' (file placed in a directory GeoServer mounts) or 'url' (GeoServer COG plugin
+# reads S3). Uploads that are already COGs are never downloaded by the workers: 'upload'
+# and 'external' stream them from S3, 'url' only registers their location.
+GEOSERVER_RASTER_PUBLISH_MODE = 'upload'
+GEOSERVER_RASTER_SHARED_DIR = '/mnt/geoserver_rasters'  # Shared directory as mounted on the workers
+GEOSERVER_RASTER_SHARED_DIR_GEOSERVER = '/mnt/geoserver_rasters'  # Same directory as mounted on GeoServer
+GEOSERVER_COG_RANGE_READER = 'S3'  # COG plugin range reader: 'S3', 'HTTP', 'GS' or 'Azure'
+
+# XYZ raster/terrain tiles rendered from COGs by the API
+RASTER_TILE_SIZE = 256
+RASTER_TILE_RESAMPLING = 'bilinear'
+RASTER_TILE_WEBP_QUALITY = 85
+RASTER_TILE_CACHE_TIMEOUT = 24 * 60 * 60  # Redis TTL for rendered tiles
+RASTER_TILE_CACHE_MAX_ZOOM = 18  # Deeper tiles are always rendered on request
@@ -1,6 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.gis import admin as gis_admin
-from .models import Project, GroupType, GroupTag, CoordinateReferenceSystem, VectorLayer, VectorFeature, RasterGroupTag, RasterLayer, StreetImage, TerrainModel
+from .models import Project, GroupType, GroupTag, CoordinateReferenceSystem, VectorLayer, VectorFeature, RasterGroupTag, RasterLayer, StreetImage, TerrainModel, LayerAttributeFilterStat
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
@@ -50,6 +50,30 @@ class VectorFeatureAdmin(gis_admin.ModelAdmin):
     readonly_fields = ('id', 'created_at', 'updated_at')
     # geom is automatically handled by OSMGeoAdmin
 
+@admin.register(LayerAttributeFilterStat)
+class LayerAttributeFilterStatAdmin(admin.ModelAdmin):
+    list_display = ('attribute_key', 'layer', 'filter_count', 'last_filtered_at', 'index_name', 'indexed_at')
+    search_fields = ('attribute_key', 'layer__name', 'layer__title')
+    readonly_fields = ('filter_count', 'last_filtered_at', 'index_name', 'indexed_at')
+    raw_id_fields = ('layer',)
+    actions = ['create_expression_index']
+
+    @admin.action(description='Create expression index on selected attributes')
+    def create_expression_index(self, request, queryset):
+        # CREATE INDEX CONCURRENTLY can run for minutes, so builds go to the worker
+        from .tasks import create_attribute_index_task
+        queued, failed = 0, []
+        for stat in queryset:
+            try:
+                create_attribute_index_task.delay(str(stat.layer_id), stat.attribute_key)
+                queued += 1
+            except Exception as e:
+                failed.append(f"{stat.attribute_key} ({e})")
+        if queued:
+            self.message_user(request, f'Queued {queued} attribute index builds')
+        if failed:
+            self.message_user(request, f'Could not queue index builds for: {", ".join(failed)}', messages.ERROR)
+
 @admin.register(RasterGroupTag)
 class RasterGroupTagAdmin(admin.ModelAdmin):
     list_display = ('name', 'project', 'created_at')
@@ -0,0 +1,218 @@
+import logging
+import time
+from django.db import connection, transaction
+from .models import VectorLayer, VectorFeature
+from .partition_utils import get_feature_table_for_layer
+from .layer_metadata_utils import recalculate_layer_stats
+from .attribute_catalog_utils import refresh_attribute_catalog
+from .lod_utils import get_lod_insert_sql
+from .vector_layer_utils import create_vector_layer
+from .vector_utils import VectorDataProcessor
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_OPERATIONS = ('buffer', 'clip', 'intersection', 'dissolve', 'spatial_join')
+OVERLAY_OPERATIONS = ('clip', 'intersection', 'spatial_join')
+JOIN_PREDICATES = {
+    'intersects': 'ST_Intersects(o.geom, f.geom)',
+    'within': 'ST_Within(f.geom, o.geom)',
+    'contains': 'ST_Contains(f.geom, o.geom)',
+}
+POLYGON_TYPES = ('Polygon', 'MultiPolygon')
+
+# ST_CollectionExtract dimension of each geometry family
+GEOMETRY_DIMENSIONS = {
+    'Point': 1, 'MultiPoint': 1,
+    'LineString': 2, 'MultiLineString': 2,
+    'Polygon': 3, 'MultiPolygon': 3,
+}
+MULTI_GEOMETRY_TYPES = {1: 'MultiPoint', 2: 'MultiLineString', 3: 'MultiPolygon'}
+
+
+def get_analysis_geometry_type(operation, layer, overlay_layer=None):
+    """Geometry type of the layer an operation produces."""
+    if operation == 'buffer':
+        return 'MultiPolygon'
+    if operation == 'spatial_join':
+        return layer.geometry_type
+    dimension = GEOMETRY_DIMENSIONS[layer.geometry_type]
+    if operation == 'intersection':
+        dimension = min(dimension, GEOMETRY_DIMENSIONS[overlay_layer.geometry_type])
+    return MULTI_GEOMETRY_TYPES[dimension]
+
+
+def _analysis_select_sql(operation, layer, output_type, overlay_layer=None, distance=None,
+                         dissolve_key=None, predicate='intersects', keep_unmatched=True):
+    """
+    SELECT producing (geom, attributes) rows for an analysis operation.
+
+    Returns:
+        tuple: (select_sql, params)
+    """
+    feature_table = VectorFeature._meta.db_table
+    dimension = GEOMETRY_DIMENSIONS[output_type]
+
+    if operation == 'buffer':
+        # Buffer on the geography so the distance is in metres whatever the latitude
+        return f"""
+            SELECT ST_Multi(ST_Buffer(f.geom::geography, %s)::geometry) AS geom, f.attributes
+            FROM {feature_table} f
+            WHERE f.layer_id = %s
+        """, [distance, str(layer.id)]
+
+    if operation == 'clip':
+        # Clip each feature against the union of the overlay polygons it touches only
+        return f"""
+            SELECT ST_Multi(ST_CollectionExtract(ST_Intersection(f.geom, o.geom), %s)) AS geom, f.attributes
+            FROM {feature_table} f
+            CROSS JOIN LATERAL (
+                SELECT ST_Union(o.geom) AS geom FROM {feature_table} o
+                WHERE o.layer_id = %s AND ST_Intersects(o.geom, f.geom)
+            ) o
+            WHERE f.layer_id = %s AND o.geom IS NOT NULL
+        """, [dimension, str(overlay_layer.id), str(layer.id)]
+
+    if operation == 'intersection':
+        # One output feature per intersecting pair; input attributes win on key conflicts
+        return f"""
+            SELECT ST_Multi(ST_CollectionExtract(ST_Intersection(f.geom, o.geom), %s)) AS geom,
+                   o.attributes || f.attributes AS attributes
+            FROM {feature_table} f
+            JOIN {feature_table} o ON o.layer_id = %s AND ST_Intersects(o.geom, f.geom)
+            WHERE f.layer_id = %s
+        """, [dimension, str(overlay_layer.id), str(layer.id)]
+
+    if operation == 'dissolve':
+        if dissolve_key:
+            return f"""
+                SELECT ST_Multi(ST_CollectionExtract(ST_Union(d.geom), %s)) AS geom,
+                       jsonb_build_object(%s::text, d.value, 'feature_count', COUNT(*)) AS attributes
+                FROM (
+                    SELECT f.geom, f.attributes->%s AS value FROM {feature_table} f
+                    WHERE f.layer_id = %s
+                ) d
+                GROUP BY d.value
+            """, [dimension, dissolve_key, dissolve_key, str(layer.id)]
+        return f"""
+            SELECT ST_Multi(ST_CollectionExtract(ST_Union(f.geom), %s)) AS geom,
+                   jsonb_build_object('feature_count', COUNT(*)) AS attributes
+            FROM {feature_table} f
+            WHERE f.layer_id = %s
+        """, [dimension, str(layer.id)]
+
+    if operation == 'spatial_join':
+        # Geometry is kept; attributes of the first matching overlay feature are joined
+        join_type = 'LEFT JOIN' if keep_unmatched else 'JOIN'
+        return f"""
+            SELECT f.geom,
+                   COALESCE(o.attributes, '{{}}'::jsonb) || f.attributes
+                       || jsonb_build_object('join_count', COALESCE(o.match_count, 0)) AS attributes
+            FROM {feature_table} f
+            {join_type} LATERAL (
+                SELECT o.attributes, COUNT(*) OVER () AS match_count FROM {feature_table} o
+                WHERE o.layer_id = %s AND {JOIN_PREDICATES[predicate]}
+                ORDER BY o.created_at, o.id
+                LIMIT 1
+            ) o ON true
+            WHERE f.layer_id = %s
+        """, [str(overlay_layer.id), str(layer.id)]
+
+    raise ValueError(f"Unsupported analysis operation: {operation}")
+
+
+def run_spatial_analysis(operation, layer_id, created_by, new_layer_name=None, overlay_layer_id=None,
+                         distance=None, dissolve_key=None, predicate='intersects', keep_unmatched=True,
+                         description=None, progress_callback=None):
+    """
+    Run a spatial analysis operation inside PostGIS and publish the result as a new layer.
+
+    The result rows are written by a single INSERT ... SELECT, so features never leave
+    the database. Operations:
+        buffer: every feature buffered by distance metres
+        clip: features cut to the polygons of the overlay layer
+        intersection: the overlapping parts of every input/overlay feature pair
+        dissolve: features unioned per value of dissolve_key (or all together)
+        spatial_join: features with the attributes of the overlay feature they match
+
+    Args:
+        operation (str): One of ANALYSIS_OPERATIONS
+        layer_id (UUID): The input layer
+        created_by (CustomUser): The user running the analysis
+        new_layer_name (str, optional): Title of the result layer
+        overlay_layer_id (UUID, optional): Second layer for clip, intersection and spatial_join
+        distance (float, optional): Buffer distance in metres
+        dissolve_key (str, optional): Attribute to dissolve by
+        predicate (str): Spatial join predicate ('intersects', 'within' or 'contains')
+        keep_unmatched (bool): Keep input features without a spatial join match
+        description (str, optional): Description for the result layer
+        progress_callback (callable, optional): Called with (percent, message) as work proceeds
+
+    Returns:
+        tuple: (VectorLayer, timings) with the seconds spent in each step
+    """
+    report = progress_callback or (lambda percent, message: None)
+    timings = {}
+    step_started = time.monotonic()
+
+    def finish_step(name):
+        nonlocal step_started
+        now = time.monotonic()
+        timings[name] = round(now - step_started, 3)
+        step_started = now
+
+    if operation not in ANALYSIS_OPERATIONS:
+        raise ValueError(f"Unsupported analysis operation: {operation}")
+
+    layer = VectorLayer.objects.get(id=layer_id)
+    overlay_layer = None
+    if operation in OVERLAY_OPERATIONS:
+        overlay_layer = VectorLayer.objects.get(id=overlay_layer_id)
+        if operation == 'clip' and overlay_layer.geometry_type not in POLYGON_TYPES:
+            raise ValueError("Clip requires a polygon overlay layer.")
+    if operation == 'spatial_join' and predicate not in JOIN_PREDICATES:
+        raise ValueError(f"Unsupported spatial join predicate: {predicate}")
+
+    output_type = get_analysis_geometry_type(operation, layer, overlay_layer)
+    title = new_layer_name or f"{operation.replace('_', ' ').title()}: {layer.title or layer.name}"
+
+    with transaction.atomic():
+        result_layer = create_vector_layer(
+            title,
+            output_type,
+            layer.project,
+            created_by,
+            description or f"{operation} of {layer.name}" + (f" with {overlay_layer.name}" if overlay_layer else "")
+        )
+        result_layer.title = title
+        result_layer.save(update_fields=['title'])
+        finish_step('create_layer')
+
+        report(10, f"Running {operation}")
+        select_sql, select_params = _analysis_select_sql(
+            operation, layer, output_type, overlay_layer, distance, dissolve_key, predicate, keep_unmatched
+        )
+        lod_columns, lod_select, lod_params = get_lod_insert_sql(result_layer, 'r.geom')
+        target_table = get_feature_table_for_layer(result_layer.id)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {target_table} (id, layer_id, geom{lod_columns}, attributes, created_at, updated_at)
+                SELECT gen_random_uuid(), %s, r.geom{lod_select}, r.attributes, now(), now()
+                FROM ({select_sql}) r
+                WHERE r.geom IS NOT NULL AND NOT ST_IsEmpty(r.geom);
+            """, [str(result_layer.id)] + lod_params + select_params)
+            written = cursor.rowcount
+        logger.info(f"{operation} of layer {layer.id} wrote {written} features into {result_layer.name}")
+        finish_step('analysis')
+
+        report(70, "Updating layer statistics")
+        recalculate_layer_stats(result_layer)
+        refresh_attribute_catalog(result_layer)
+        finish_step('statistics')
+
+    report(85, "Publishing layer")
+    VectorDataProcessor()._create_and_publish_layer(result_layer)
+    finish_step('publish')
+
+    timings['total'] = round(sum(timings.values()), 3)
+    return result_layer, timings
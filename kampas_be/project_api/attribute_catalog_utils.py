@@ -0,0 +1,126 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import VectorFeature
+
+logger = logging.getLogger(__name__)
+
+SCALAR_JSON_TYPES = ('string', 'number', 'boolean')
+
+
+def infer_attribute_type(json_types):
+    """Catalog type of a key from the JSON types of its non-null values."""
+    json_types = set(json_types or [])
+    if not json_types:
+        return 'null'
+    if len(json_types) == 1:
+        return json_types.pop()
+    return 'mixed'
+
+
+def build_attribute_catalog(layer, top_values=None):
+    """
+    Compute a layer's attribute catalog in SQL and store it on the layer.
+
+    For every attribute key: its inferred type, the share of features where it is null or
+    missing, its distinct value count, its most frequent scalar values and, for numbers,
+    the min and max. Two grouped queries over jsonb_each of the layer's features.
+
+    Args:
+        layer (VectorLayer): The layer to catalog
+        top_values (int, optional): Most frequent values kept per key
+            (VECTOR_ATTRIBUTE_CATALOG_TOP_VALUES by default)
+
+    Returns:
+        dict: The catalog
+    """
+    if top_values is None:
+        top_values = getattr(settings, 'VECTOR_ATTRIBUTE_CATALOG_TOP_VALUES', 10)
+    feature_table = VectorFeature._meta.db_table
+    layer_id = str(layer.id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {feature_table} WHERE layer_id = %s;", [layer_id])
+        feature_count = cursor.fetchone()[0]
+
+        cursor.execute(f"""
+            SELECT e.key,
+                   COUNT(*) FILTER (WHERE jsonb_typeof(e.value) <> 'null'),
+                   array_agg(DISTINCT jsonb_typeof(e.value)) FILTER (WHERE jsonb_typeof(e.value) <> 'null'),
+                   COUNT(DISTINCT e.value) FILTER (WHERE jsonb_typeof(e.value) <> 'null'),
+                   MIN((e.value #>> '{{}}')::double precision) FILTER (WHERE jsonb_typeof(e.value) = 'number'),
+                   MAX((e.value #>> '{{}}')::double precision) FILTER (WHERE jsonb_typeof(e.value) = 'number')
+            FROM {feature_table} f
+            CROSS JOIN LATERAL jsonb_each(f.attributes) e
+            WHERE f.layer_id = %s
+            GROUP BY e.key
+            ORDER BY e.key;
+        """, [layer_id])
+        key_rows = cursor.fetchall()
+
+        cursor.execute(f"""
+            SELECT key, value, count
+            FROM (
+                SELECT e.key, e.value, COUNT(*) AS count,
+                       ROW_NUMBER() OVER (PARTITION BY e.key ORDER BY COUNT(*) DESC, e.value) AS rank
+                FROM {feature_table} f
+                CROSS JOIN LATERAL jsonb_each(f.attributes) e
+                WHERE f.layer_id = %s AND jsonb_typeof(e.value) = ANY(%s)
+                GROUP BY e.key, e.value
+            ) ranked
+            WHERE rank <= %s
+            ORDER BY key, rank;
+        """, [layer_id, list(SCALAR_JSON_TYPES), top_values])
+        top_rows = cursor.fetchall()
+
+    frequent = {}
+    for key, value, count in top_rows:
+        frequent.setdefault(key, []).append({'value': value, 'count': count})
+
+    attributes = []
+    for key, non_null, json_types, distinct_count, min_value, max_value in key_rows:
+        entry = {
+            'key': key,
+            'type': infer_attribute_type(json_types),
+            'null_ratio': round(1 - non_null / feature_count, 4) if feature_count else 0,
+            'distinct_count': distinct_count,
+            'top_values': frequent.get(key, []),
+        }
+        if min_value is not None:
+            entry['min'] = min_value
+            entry['max'] = max_value
+        attributes.append(entry)
+
+    catalog = {'feature_count': feature_count, 'attributes': attributes}
+    layer.attribute_catalog = catalog
+    layer.attribute_catalog_updated_at = timezone.now()
+    layer.save(update_fields=['attribute_catalog', 'attribute_catalog_updated_at'])
+    return catalog
+
+
+def refresh_attribute_catalog(layer):
+    """Rebuild a layer's catalog, logging instead of raising so ingest and edits never fail on it."""
+    try:
+        # Savepoint so a failure cannot abort an enclosing ingest transaction
+        with transaction.atomic():
+            return build_attribute_catalog(layer)
+    except Exception as e:
+        logger.warning(f"Could not build attribute catalog for layer {layer.id}: {e}")
+        return None
+
+
+def schedule_attribute_catalog_refresh(layer):
+    """
+    Queue a catalog rebuild after feature edits, debounced so a burst of edits within
+    VECTOR_ATTRIBUTE_CATALOG_REFRESH_DELAY seconds triggers a single rebuild.
+    """
+    delay = getattr(settings, 'VECTOR_ATTRIBUTE_CATALOG_REFRESH_DELAY', 30)
+    try:
+        if not cache.add(f"attribute_catalog_refresh:{layer.id}", True, delay):
+            return
+        from .tasks import refresh_attribute_catalog_task
+        refresh_attribute_catalog_task.apply_async(args=[str(layer.id)], countdown=delay)
+    except Exception as e:
+        logger.warning(f"Could not schedule attribute catalog refresh for layer {layer.id}: {e}")
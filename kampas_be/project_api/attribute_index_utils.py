@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Func, TextField, Value
+from django.utils import timezone
+from .models import LayerAttributeFilterStat, VectorFeature
+from .partition_utils import get_partition_name, is_feature_table_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+def attribute_filter_value(value):
+    """Text form of a filter value as returned by attributes->>'key' (JSON literals for non-strings)."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class AttributeText(Func):
+    """
+    attributes->>'key' with the key always bound as one text literal. KT()/KeyTextTransform
+    would split a key on '__' into a path and turn a digit key into an array index, and
+    neither form matches the expression index.
+    """
+    arg_joiner = ' ->> '
+    template = '(%(expressions)s)'
+    output_field = TextField()
+
+    def __init__(self, key):
+        super().__init__(F('attributes'), Value(key))
+
+
+def filter_by_attributes(features_qs, attributes):
+    """
+    Filter features with attributes->>'key' = 'value' predicates, the form the
+    per-layer expression indexes are built on. A None value matches a missing or null key.
+    """
+    for index, (key, value) in enumerate(attributes.items()):
+        alias = f"attribute_filter_{index}"
+        features_qs = features_qs.annotate(**{alias: AttributeText(key)})
+        if value is None:
+            features_qs = features_qs.filter(**{f"{alias}__isnull": True})
+        else:
+            features_qs = features_qs.filter(**{alias: attribute_filter_value(value)})
+    return features_qs
+
+
+def record_attribute_filters(layer, keys):
+    """
+    Count one filter on each key of a layer and queue an expression index build for unindexed
+    keys with at least VECTOR_ATTRIBUTE_INDEX_MIN_FILTERS filters on a layer of at least
+    VECTOR_ATTRIBUTE_INDEX_MIN_FEATURES features. A queued build blocks new ones for
+    VECTOR_ATTRIBUTE_INDEX_PENDING_TIMEOUT seconds, after which a lost or failed build is
+    queued again. Failures are logged, never raised.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+
+    min_filters = getattr(settings, 'VECTOR_ATTRIBUTE_INDEX_MIN_FILTERS', 50)
+    min_features = getattr(settings, 'VECTOR_ATTRIBUTE_INDEX_MIN_FEATURES', 10000)
+    pending_timeout = getattr(settings, 'VECTOR_ATTRIBUTE_INDEX_PENDING_TIMEOUT', 60 * 60)
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {LayerAttributeFilterStat._meta.db_table}
+                    (layer_id, attribute_key, filter_count, last_filtered_at, index_name)
+                SELECT %s, key, 1, now(), '' FROM unnest(%s::text[]) AS key
+                ON CONFLICT (layer_id, attribute_key) DO UPDATE
+                SET filter_count = {LayerAttributeFilterStat._meta.db_table}.filter_count + 1,
+                    last_filtered_at = now()
+                RETURNING attribute_key, filter_count, index_name;
+            """, [str(layer.id), keys])
+            hot_keys = [key for key, count, index_name in cursor.fetchall()
+                        if count >= min_filters and not index_name]
+
+        if hot_keys and layer.feature_count >= min_features:
+            from .tasks import create_attribute_index_task
+            for key in hot_keys:
+                if not cache.add(f"attribute_index_pending:{get_attribute_index_name(layer.id, key)}", True, pending_timeout):
+                    continue
+                create_attribute_index_task.delay(str(layer.id), key)
+                logger.info(f"Queued expression index for hot attribute '{key}' on layer {layer.id}")
+
+    except Exception as e:
+        logger.warning(f"Could not record attribute filters for layer {layer.id}: {e}")
+
+
+def get_attribute_index_name(layer_id, key):
+    """Stable index name (within the 63 character limit) for a layer/key pair."""
+    key_hash = hashlib.md5(key.encode('utf-8')).hexdigest()[:8]
+    return f"vf_attr_{layer_id.hex[:16]}_{key_hash}"
+
+
+def create_attribute_index(layer, key):
+    """
+    Build a btree index on (attributes->>'key') for one layer with CREATE INDEX CONCURRENTLY.
+
+    On a partitioned VectorFeature table the index goes on the layer partition; otherwise it
+    is a partial index restricted to the layer's rows. Must run outside a transaction.
+
+    Returns:
+        str: The index name
+    """
+    index_name = get_attribute_index_name(layer.id, key)
+
+    with connection.cursor() as cursor:
+        if is_feature_table_partitioned(cursor):
+            target_sql = get_partition_name(layer.id)
+            where_sql, params = '', [key]
+        else:
+            target_sql = VectorFeature._meta.db_table
+            where_sql, params = 'WHERE layer_id = %s', [key, str(layer.id)]
+
+        # DDL cannot take bind parameters, so the key and layer id are quoted by the driver
+        cursor.execute(connection.ops.compose_sql(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+            f"ON {target_sql} ((attributes ->> %s)) {where_sql}",
+            params
+        ))
+
+    LayerAttributeFilterStat.objects.update_or_create(
+        layer=layer, attribute_key=key,
+        defaults={'index_name': index_name, 'indexed_at': timezone.now()}
+    )
+    logger.info(f"Created expression index {index_name} on attribute '{key}' of layer {layer.id}")
+    return index_name
+
+
+def drop_attribute_indexes(layer):
+    """Drop the expression indexes built for a layer (partition indexes go with the partition)."""
+    stats = LayerAttributeFilterStat.objects.filter(layer=layer).exclude(index_name='')
+    with connection.cursor() as cursor:
+        for stat in stats:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {stat.index_name};")
+    stats.update(index_name='', indexed_at=None)
+
+
+def get_index_candidates(min_filters=None, min_features=None):
+    """Filter stats of unindexed keys that are filtered often on large active layers."""
+    if min_filters is None:
+        min_filters = getattr(settings, 'VECTOR_ATTRIBUTE_INDEX_MIN_FILTERS', 50)
+    if min_features is None:
+        min_features = getattr(settings, 'VECTOR_ATTRIBUTE_INDEX_MIN_FEATURES', 10000)
+
+    return LayerAttributeFilterStat.objects.filter(
+        index_name='',
+        filter_count__gte=min_filters,
+        layer__is_active=True,
+        layer__feature_count__gte=min_features
+    ).select_related('layer')
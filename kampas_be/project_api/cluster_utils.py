@@ -0,0 +1,94 @@
+import logging
+from django.conf import settings
+from django.db import connection
+from .tile_utils import WEB_MERCATOR_WORLD_SIZE, MAX_MERCATOR_LATITUDE
+
+logger = logging.getLogger(__name__)
+
+
+def get_cluster_cell_size(zoom):
+    """Grid cell size in EPSG:3857 metres: VECTOR_CLUSTER_CELLS_PER_TILE cells across a tile at this zoom."""
+    cells_per_tile = getattr(settings, 'VECTOR_CLUSTER_CELLS_PER_TILE', 8)
+    return WEB_MERCATOR_WORLD_SIZE / (2 ** zoom * cells_per_tile)
+
+
+def should_cluster(zoom):
+    """Points are clustered below VECTOR_CLUSTER_MAX_ZOOM and returned individually from it on."""
+    return zoom < getattr(settings, 'VECTOR_CLUSTER_MAX_ZOOM', 17)
+
+
+def cluster_points(table_name, geom_column, where_sql, params, zoom, bbox=None, id_column='id'):
+    """
+    Aggregate the points of a table into grid clusters with ST_SnapToGrid.
+
+    Each point (or the point on surface of a multipoint) is snapped to a Web Mercator grid
+    whose cell size follows the zoom level, and every occupied cell becomes one cluster
+    with its member count, the centroid of its members and their extent.
+
+    Args:
+        table_name (str): Table holding the points
+        geom_column (str): EPSG:4326 geometry column
+        where_sql (str): SQL predicate selecting the rows (without WHERE)
+        params (list): Parameters of where_sql
+        zoom (int): Map zoom level
+        bbox (tuple, optional): (min_x, min_y, max_x, max_y) in degrees limiting the points
+
+    Returns:
+        list: dicts with 'count', 'coordinates', 'bbox' and 'id' (set for single-point cells)
+    """
+    bbox_sql = ''
+    bbox_params = []
+    if bbox:
+        bbox_sql = f'AND {geom_column} && ST_MakeEnvelope(%s, %s, %s, %s, 4326)'
+        bbox_params = list(bbox)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT COUNT(*),
+                   ST_X(ST_Centroid(ST_Collect(point))), ST_Y(ST_Centroid(ST_Collect(point))),
+                   ST_XMin(ST_Extent(point)), ST_YMin(ST_Extent(point)),
+                   ST_XMax(ST_Extent(point)), ST_YMax(ST_Extent(point)),
+                   MIN({id_column}::text)
+            FROM (
+                SELECT {id_column}, ST_PointOnSurface({geom_column}) AS point,
+                       ST_SnapToGrid(
+                           ST_Transform(ST_PointOnSurface({geom_column}), 3857), %s
+                       ) AS cell
+                FROM {table_name}
+                WHERE {where_sql} {bbox_sql}
+                  AND ST_Y(ST_PointOnSurface({geom_column})) BETWEEN -%s AND %s
+            ) points
+            GROUP BY cell;
+        """, [get_cluster_cell_size(zoom)] + list(params) + bbox_params + [MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE])
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'count': count,
+            'coordinates': [x, y],
+            'bbox': [min_x, min_y, max_x, max_y],
+            'id': first_id if count == 1 else None,
+        }
+        for count, x, y, min_x, min_y, max_x, max_y, first_id in rows
+    ]
+
+
+def cluster_feature(cluster, properties=None):
+    """GeoJSON feature for one cluster; single-point cells carry the point's own properties."""
+    if cluster['count'] == 1:
+        return {
+            'type': 'Feature',
+            'id': cluster['id'],
+            'geometry': {'type': 'Point', 'coordinates': cluster['coordinates']},
+            'properties': {'cluster': False, **(properties or {})},
+        }
+
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': cluster['coordinates']},
+        'properties': {
+            'cluster': True,
+            'point_count': cluster['count'],
+            'bbox': cluster['bbox'],
+        },
+    }
@@ -18,7 +18,7 @@ class FileUploadProcessor:
     
     # Define file type to folder mapping
     FOLDER_MAPPING = {
-        'vector_layers': ['.geojson', '.shp', '.zip', '.kml', '.gpx'],
+        'vector_layers': ['.geojson', '.shp', '.zip', '.kml', '.gpx', '.gpkg', '.fgb'],
         'raster_layers': ['.tif', '.tiff', '.geotiff', '.jp2'],
         'terrain_models': ['.dem', '.dtm', '.dsm', '.asc', '.xyz', '.tif', '.tiff'],
         'street_imagery': ['.jpg', '.jpeg', '.png', '.tiff', '.raw', '.cr2', '.nef'],
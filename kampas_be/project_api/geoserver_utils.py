@@ -1,10 +1,19 @@
+import os
+import shutil
 import requests
 import json
 import logging
+from contextlib import closing
+import boto3
 from django.conf import settings
 from requests.auth import HTTPBasicAuth
 import xml.etree.ElementTree as ET
 
+# GDAL virtual path prefix of S3 objects (raster_io_utils.VSIS3_PREFIX, not imported to keep
+# rasterio out of the models import chain)
+VSIS3_PREFIX = '/vsis3/'
+RASTER_COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
 logger = logging.getLogger(__name__)
 
 class GeoServerManager:
@@ -428,6 +437,112 @@ class GeoServerManager:
             return False
     
 
+    def publish_layers_to_group(self, company_id, project_id, layers, layer_type):
+        """
+        Publishes several layers and adds them to the layer group with a single group update.
+        
+        Args:
+            layers (list): (layer_name, table_name) tuples
+            
+        Returns:
+            dict: layer_name -> (success, result) as returned by publish_layer
+        """
+        results = {}
+        published = []
+        for layer_name, table_name in layers:
+            try:
+                success, result = self.publish_layer(
+                    layer_name=layer_name,
+                    table_name=table_name,
+                    workspace_name=company_id,
+                    store_name=project_id
+                )
+            except Exception as e:
+                success, result = False, str(e)
+            
+            results[layer_name] = (success, result)
+            if success:
+                published.append(layer_name)
+            else:
+                logger.error(f"Failed to publish layer {layer_name}: {result}")
+        
+        if not published:
+            return results
+        
+        try:
+            group_name = f"{project_id}_{layer_type}"
+            group_url = f"{self.base_url}/rest/workspaces/{company_id}/layergroups/{group_name}"
+            response = requests.get(group_url, auth=self.auth)
+            
+            if response.status_code == 404:
+                # The group cannot be created empty, so seed it with the first layer
+                if not self.create_layer_group_with_layer(company_id, project_id, layer_type, published[0]):
+                    logger.warning(f"Failed to create layer group {group_name}")
+                    return results
+            
+            if self.add_layers_to_group(company_id, group_name, published):
+                logger.info(f"Added {len(published)} layers to group {group_name}")
+            else:
+                logger.warning(f"Failed to add {len(published)} layers to group {group_name}")
+        
+        except Exception as e:
+            logger.error(f"Error adding layers to group: {e}")
+        
+        return results
+
+    def add_layers_to_group(self, workspace, group_name, layer_names):
+        """
+        Adds several layers to an existing layer group with one GET and one PUT.
+        """
+        try:
+            url = f"{self.base_url}/rest/workspaces/{workspace}/layergroups/{group_name}"
+            response = requests.get(url, auth=self.auth)
+            
+            if response.status_code != 200:
+                logger.error(f"Layer group {group_name} not found")
+                return False
+            
+            group_data = response.json()
+            publishables = group_data.get('layerGroup', {}).get('publishables')
+            if not isinstance(publishables, dict):
+                publishables = {}
+                group_data.setdefault('layerGroup', {})['publishables'] = publishables
+            
+            # GeoServer returns a bare object instead of a list for single-layer groups
+            published = publishables.get('published') or []
+            if isinstance(published, dict):
+                published = [published]
+            
+            existing = {pub.get('name') for pub in published if isinstance(pub, dict)}
+            added = False
+            for layer_name in layer_names:
+                qualified_name = f"{workspace}:{layer_name}"
+                if qualified_name not in existing:
+                    published.append({"@type": "layer", "name": qualified_name})
+                    existing.add(qualified_name)
+                    added = True
+            
+            if not added:
+                return True
+            
+            publishables['published'] = published
+            update_response = requests.put(
+                url,
+                json=group_data,
+                auth=self.auth,
+                headers={'Content-Type': 'application/json'}
+            )
+            
+            if update_response.status_code == 200:
+                return True
+            
+            logger.error(f"Failed to update layer group: {update_response.text}")
+            return False
+            
+        except Exception as e:
+            logger.error(f"Error adding layers to group: {e}")
+            return False
+
     def delete_layer(self, layer_name, workspace_name=None, store_name=None):
         """
         Deletes a specified layer from GeoServer.
@@ -544,7 +659,7 @@ class GeoServerManager:
 
 
     def delete_layer_from_geoserver(self, vector_layer):
-        """Delete layer from GeoServer and PostGIS table (used only during permanent deletion)"""
+        """Delete layer from GeoServer (used only during permanent deletion)"""
         try:
             geoserver_success = False
             
@@ -556,7 +671,7 @@ class GeoServerManager:
                 
                 logger.info(f"Deleting layer {vector_layer.geoserver_layer_name} from GeoServer workspace {workspace_name}")
                 
-                success = self.geoserver_manager.delete_layer(
+                success = self.delete_layer(
                     vector_layer.geoserver_layer_name,
                     workspace_name=workspace_name,
                     store_name=store_name
@@ -571,7 +686,7 @@ class GeoServerManager:
                     # Try alternative deletion approach
                     logger.info("Attempting alternative deletion method...")
                     try:
-                        alt_success = self.geoserver_manager.delete_layer(
+                        alt_success = self.delete_layer(
                             vector_layer.name,
                             workspace_name=workspace_name,
                             store_name=store_name
@@ -594,15 +709,142 @@ class GeoServerManager:
             return False
 
 
-    def publish_raster_layer(self, workspace, store_name, layer_name, file_path, title=None):
+    def get_raster_reference(self, workspace, layer_name, file_path=None, cog_s3_file_key=None):
+        """
+        Location GeoServer should read a raster from, per GEOSERVER_RASTER_PUBLISH_MODE.
+        
+        'upload' (default): None, the file body is uploaded (streamed from S3 for a /vsis3/ path).
+        'external': the file is moved into GEOSERVER_RASTER_SHARED_DIR, a directory both the
+            workers and GeoServer mount, and its path as seen by GeoServer is returned.
+            A /vsis3/ file_path is streamed from S3 into the directory instead.
+        'url': GeoServer's COG reader is pointed at the COG in S3.
+        
+        Returns:
+            dict: {'type': 'external' | 'url', 'location': str}, or None to upload the file
+        """
+        mode = getattr(settings, 'GEOSERVER_RASTER_PUBLISH_MODE', 'upload')
+        try:
+            if mode == 'url' and cog_s3_file_key:
+                default_prefix = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com"
+                url_prefix = getattr(settings, 'GEOSERVER_COG_URL_PREFIX', default_prefix).rstrip('/')
+                return {'type': 'url', 'location': f"cog://{url_prefix}/{cog_s3_file_key}"}
+            
+            is_remote = bool(file_path) and file_path.startswith(VSIS3_PREFIX)
+            if mode == 'external' and file_path and (is_remote or os.path.exists(file_path)):
+                shared_dir = settings.GEOSERVER_RASTER_SHARED_DIR
+                target_dir = os.path.join(shared_dir, str(workspace))
+                os.makedirs(target_dir, exist_ok=True)
+                target_path = os.path.join(target_dir, f"{layer_name}.tif")
+                if is_remote:
+                    with closing(open_raster_file(file_path)) as source, open(target_path, 'wb') as target:
+                        shutil.copyfileobj(source, target, RASTER_COPY_CHUNK_SIZE)
+                else:
+                    # The temp file is not needed afterwards, so move it rather than keep two copies
+                    shutil.move(file_path, target_path)
+                geoserver_dir = getattr(settings, 'GEOSERVER_RASTER_SHARED_DIR_GEOSERVER', shared_dir).rstrip('/')
+                return {'type': 'external', 'location': f"file://{geoserver_dir}/{workspace}/{layer_name}.tif"}
+        except Exception as e:
+            logger.error(f"Could not prepare {mode} reference for {layer_name}, uploading instead: {e}")
+            return None
+        
+        if mode != 'upload':
+            logger.warning(f"Raster publish mode '{mode}' is not possible for {layer_name}, uploading instead")
+        return None
+
+    def create_coverage_store_by_reference(self, workspace, store_name, layer_name, reference, title=None):
+        """
+        Create a GeoTIFF coverage store and its coverage pointing at a file GeoServer reads in place.
+        Only metadata is sent, whatever the size of the raster.
+        
+        Args:
+            workspace: The workspace name
+            store_name: The coverage store name
+            layer_name: The coverage/layer name
+            reference: dict from get_raster_reference
+            title: Optional title for the layer
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            store_url = f"{self.base_url}/rest/workspaces/{workspace}/coveragestores"
+            
+            if reference['type'] == 'external':
+                # external.geotiff registers the store and configures its first coverage in one call
+                response = requests.put(
+                    f"{store_url}/{store_name}/external.geotiff",
+                    data=reference['location'],
+                    params={'configure': 'first', 'coverageName': layer_name},
+                    auth=self.auth,
+                    headers={'Content-type': 'text/plain'}
+                )
+                if response.status_code not in [201, 200]:
+                    logger.error(f"Failed to create external coverage store: {response.status_code} - {response.text}")
+                    return False, f"Failed to create coverage store: {response.text}"
+                logger.info(f"Created coverage store {store_name} referencing {reference['location']}")
+                return True, f"Successfully published raster layer {layer_name}"
+            
+            # COG plugin store reading the file with HTTP range requests
+            store_data = {
+                "coverageStore": {
+                    "name": store_name,
+                    "type": "GeoTIFF",
+                    "enabled": True,
+                    "workspace": {"name": str(workspace)},
+                    "url": reference['location'],
+                    "metadata": {
+                        "entry": {
+                            "@key": "CogSettings.Key",
+                            "cogSettings": {
+                                "useCachingStream": getattr(settings, 'GEOSERVER_COG_USE_CACHING_STREAM', True),
+                                "rangeReaderSettings": getattr(settings, 'GEOSERVER_COG_RANGE_READER', 'S3')
+                            }
+                        }
+                    }
+                }
+            }
+            response = requests.post(store_url, json=store_data, auth=self.auth,
+                                     headers={'Content-Type': 'application/json'})
+            if response.status_code not in [201, 200]:
+                logger.error(f"Failed to create COG coverage store: {response.status_code} - {response.text}")
+                return False, f"Failed to create coverage store: {response.text}"
+            
+            coverage_data = {
+                "coverage": {
+                    "name": layer_name,
+                    "nativeCoverageName": os.path.splitext(os.path.basename(reference['location']))[0],
+                    "title": title or layer_name,
+                    "enabled": True
+                }
+            }
+            response = requests.post(
+                f"{store_url}/{store_name}/coverages",
+                json=coverage_data,
+                auth=self.auth,
+                headers={'Content-Type': 'application/json'}
+            )
+            if response.status_code not in [201, 200]:
+                logger.error(f"Failed to publish COG coverage: {response.status_code} - {response.text}")
+                return False, f"Failed to publish coverage: {response.text}"
+            
+            logger.info(f"Created COG coverage store {store_name} reading {reference['location']}")
+            return True, f"Successfully published raster layer {layer_name}"
+            
+        except Exception as e:
+            logger.error(f"Error creating coverage store by reference: {str(e)}")
+            return False, f"Error creating coverage store by reference: {str(e)}"
+
+    def publish_raster_layer(self, workspace, store_name, layer_name, file_path, title=None, reference=None):
         """Publishes a GeoTIFF file as a coverage in GeoServer
         
         Args:
             workspace: The workspace name
             store_name: The coverage store name (should be same as layer_name)
             layer_name: The layer name (should be same as store_name)
-            file_path: Path to the GeoTIFF file
+            file_path: Path to the GeoTIFF file, local or /vsis3/
             title: Optional title for the layer
+            reference: Optional location from get_raster_reference; the store is then
+                registered against it instead of uploading file_path
             
         Returns:
             Tuple of (success, message)
@@ -625,10 +867,13 @@ class GeoServerManager:
                 if coverage_check.status_code == 200:
                     logger.info(f"Coverage {layer_name} already exists in store {store_name}")
                     return True, f"Coverage {layer_name} already exists"
+            elif reference:
+                # Register the store against the file in place: a metadata call, no file bytes
+                return self.create_coverage_store_by_reference(workspace, store_name, layer_name, reference, title)
             else:
-                # Create the coverage store by uploading the file
+                # Create the coverage store by uploading the file (a /vsis3/ path streams from S3)
                 # This automatically creates both the store AND the coverage in one step
-                with open(file_path, 'rb') as f:
+                with closing(open_raster_file(file_path)) as f:
                     headers = {'Content-type': 'image/tiff'}
                     create_store_url = f"{self.base_url}/rest/workspaces/{workspace}/coveragestores/{store_name}/file.geotiff"
                     
@@ -711,8 +956,9 @@ class GeoServerManager:
 
 
     
-    def publish_terrain_layer(self, workspace, store_name, layer_name, file_path, terrain_type=None, title=None):
-        """Publishes a terrain file as a coverage in GeoServer"""
+    def publish_terrain_layer(self, workspace, store_name, layer_name, file_path, terrain_type=None, title=None,
+                              reference=None):
+        """Publishes a terrain file as a coverage in GeoServer (by reference when one is given)"""
         try:
             # **FIX: Use consistent naming - store_name and layer_name should be the same**
             # This prevents creating two separate layers in GeoServer
@@ -732,10 +978,13 @@ class GeoServerManager:
                 if coverage_check.status_code == 200:
                     logger.info(f"Terrain coverage {layer_name} already exists in store {store_name}")
                     return True, f"Terrain coverage {layer_name} already exists"
+            elif reference:
+                # Register the store against the file in place: a metadata call, no file bytes
+                return self.create_coverage_store_by_reference(workspace, store_name, layer_name, reference, title)
             else:
-                # Create the coverage store by uploading the file
+                # Create the coverage store by uploading the file (a /vsis3/ path streams from S3)
                 # This automatically creates both the store AND the coverage in one step
-                with open(file_path, 'rb') as f:
+                with closing(open_raster_file(file_path)) as f:
                     headers = {'Content-type': 'image/tiff'}
                     create_store_url = f"{self.base_url}/rest/workspaces/{workspace}/coveragestores/{store_name}/file.geotiff"
                     
@@ -795,8 +1044,19 @@ class GeoServerManager:
             logger.error(f"Error publishing terrain layer: {str(e)}")
             return False, f"Error publishing terrain layer: {str(e)}"
 
+    def delete_raster_layer(self, workspace, store_name, layer_name):
+        """Delete raster layer, its coverage store and its published file from GeoServer"""
+        return self._delete_coverage_layer(workspace, store_name, layer_name, 'raster')
+
     def delete_terrain_layer(self, workspace, store_name, layer_name):
-        """Delete terrain layer and its coverage store from GeoServer"""
+        """Delete terrain layer, its coverage store and its published file from GeoServer"""
+        return self._delete_coverage_layer(workspace, store_name, layer_name, 'terrain')
+
+    def _delete_coverage_layer(self, workspace, store_name, layer_name, kind):
+        """
+        Delete a coverage and its store. purge=all makes GeoServer remove uploaded files from
+        its data directory; a copy in GEOSERVER_RASTER_SHARED_DIR ('external' mode) is removed here.
+        """
         try:
             # Step 1: Remove layer from any layer groups first
             self._remove_layer_from_groups(workspace, layer_name)
@@ -807,26 +1067,55 @@ class GeoServerManager:
             coverage_response = requests.delete(coverage_url, auth=self.auth, params={'recurse': 'true'})
             
             if coverage_response.status_code == 200:
-                logger.info(f"Successfully deleted terrain coverage: {layer_name}")
+                logger.info(f"Successfully deleted {kind} coverage: {layer_name}")
             else:
-                logger.warning(f"Failed to delete terrain coverage {layer_name}: {coverage_response.text}")
+                logger.warning(f"Failed to delete {kind} coverage {layer_name}: {coverage_response.text}")
             
-            # Step 3: Delete the coverage store
+            # Step 3: Delete the coverage store along with the files it owns
             store_url = f"{self.base_url}/rest/workspaces/{workspace}/coveragestores/{store_name}"
             
-            store_response = requests.delete(store_url, auth=self.auth, params={'recurse': 'true'})
+            store_response = requests.delete(store_url, auth=self.auth, params={'recurse': 'true', 'purge': 'all'})
+            
+            # Step 4: Remove the shared-directory copy of an externally referenced raster
+            self.remove_raster_reference(workspace, layer_name)
             
-            if store_response.status_code == 200:
-                logger.info(f"Successfully deleted terrain coverage store: {store_name}")
+            if store_response.status_code in [200, 404]:
+                logger.info(f"Successfully deleted {kind} coverage store: {store_name}")
                 return True
             else:
-                logger.warning(f"Failed to delete terrain coverage store {store_name}: {store_response.text}")
+                logger.warning(f"Failed to delete {kind} coverage store {store_name}: {store_response.text}")
                 return False
 
         except Exception as e:
-            logger.error(f"Error deleting terrain layer {layer_name}: {e}")
+            logger.error(f"Error deleting {kind} layer {layer_name}: {e}")
             return False
 
+    def remove_raster_reference(self, workspace, layer_name):
+        """Delete the file get_raster_reference copied into GEOSERVER_RASTER_SHARED_DIR, if any"""
+        shared_dir = getattr(settings, 'GEOSERVER_RASTER_SHARED_DIR', None)
+        if not shared_dir:
+            return
+        shared_path = os.path.join(shared_dir, str(workspace), f"{layer_name}.tif")
+        try:
+            if os.path.exists(shared_path):
+                os.remove(shared_path)
+                logger.info(f"Removed shared raster file {shared_path}")
+        except OSError as e:
+            logger.warning(f"Could not remove shared raster file {shared_path}: {e}")
+
+def open_raster_file(file_path):
+    """Binary file object reading a local raster, or the S3 object behind a /vsis3/ path as a stream"""
+    if file_path.startswith(VSIS3_PREFIX):
+        bucket, key = file_path[len(VSIS3_PREFIX):].split('/', 1)
+        s3_client = boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_S3_REGION_NAME
+        )
+        return s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    return open(file_path, 'rb')
+
 def get_geoserver_manager():
     """
     Returns a singleton instance of the GeoServerManager.
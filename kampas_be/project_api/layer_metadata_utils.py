@@ -0,0 +1,136 @@
+import logging
+from django.contrib.gis.geos import Polygon
+from django.db import connection
+from .models import VectorLayer, VectorFeature
+
+logger = logging.getLogger(__name__)
+
+
+def recalculate_layer_stats(layer):
+    """
+    Recompute a layer's feature_count and bbox from its features in SQL.
+    
+    Args:
+        layer (VectorLayer): The layer to update
+        
+    Returns:
+        VectorLayer: The updated layer
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT count, ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+            FROM (
+                SELECT COUNT(*) AS count, ST_Extent(geom) AS extent
+                FROM {VectorFeature._meta.db_table}
+                WHERE layer_id = %s
+            ) stats;
+        """, [str(layer.id)])
+        count, min_x, min_y, max_x, max_y = cursor.fetchone()
+    
+    layer.feature_count = count
+    layer.bbox = Polygon.from_bbox((min_x, min_y, max_x, max_y)) if count else None
+    if layer.bbox:
+        layer.bbox.srid = 4326
+    layer.save(update_fields=['feature_count', 'bbox', 'updated_at'])
+    return layer
+
+
+def recalculate_layers_stats(layers):
+    """
+    Recompute feature_count and bbox for several layers with one grouped query.
+    
+    Args:
+        layers (list): VectorLayer instances to update
+    """
+    if not layers:
+        return
+    
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT layer_id, count, ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+            FROM (
+                SELECT layer_id, COUNT(*) AS count, ST_Extent(geom) AS extent
+                FROM {VectorFeature._meta.db_table}
+                WHERE layer_id = ANY(%s::uuid[])
+                GROUP BY layer_id
+            ) stats;
+        """, [[str(layer.id) for layer in layers]])
+        stats = {str(row[0]): row[1:] for row in cursor.fetchall()}
+    
+    for layer in layers:
+        count, min_x, min_y, max_x, max_y = stats.get(str(layer.id), (0, None, None, None, None))
+        layer.feature_count = count
+        layer.bbox = Polygon.from_bbox((min_x, min_y, max_x, max_y)) if count else None
+        if layer.bbox:
+            layer.bbox.srid = 4326
+    VectorLayer.objects.bulk_update(layers, ['feature_count', 'bbox'])
+
+
+def union_extents(extents):
+    """Smallest (min_x, min_y, max_x, max_y) covering all the given extents, or None."""
+    extents = [extent for extent in extents or [] if extent]
+    if not extents:
+        return None
+    return (
+        min(extent[0] for extent in extents),
+        min(extent[1] for extent in extents),
+        max(extent[2] for extent in extents),
+        max(extent[3] for extent in extents),
+    )
+
+
+def update_layer_metadata(layer, added=0, removed=0, added_extents=None, removed_extents=None):
+    """
+    Keep a layer's feature_count and bbox current after features are added, edited or removed.
+    
+    The count is adjusted and the bbox grown in a single UPDATE. A full recompute with
+    recalculate_layer_stats only runs when a removed geometry touched the bbox edge,
+    since only then can the bbox shrink.
+    
+    Args:
+        layer (VectorLayer): The layer to update (its fields are refreshed in place)
+        added (int): Number of features inserted
+        removed (int): Number of features deleted
+        added_extents (list, optional): Extents of inserted or edited geometries
+        removed_extents (list, optional): Extents of deleted geometries and of edited
+            geometries before the edit
+        
+    Returns:
+        VectorLayer: The updated layer
+    """
+    grown = union_extents(added_extents)
+    params = [added - removed]
+    bbox_sql = "bbox"
+    if grown:
+        bbox_sql = """ST_SetSRID(ST_MakeEnvelope(
+            LEAST(ST_XMin(bbox), %s), LEAST(ST_YMin(bbox), %s),
+            GREATEST(ST_XMax(bbox), %s), GREATEST(ST_YMax(bbox), %s)
+        ), 4326)"""
+        params.extend(grown)
+    params.append(str(layer.id))
+    
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {VectorLayer._meta.db_table}
+            SET feature_count = GREATEST(feature_count + %s, 0),
+                bbox = {bbox_sql},
+                updated_at = now()
+            WHERE id = %s
+            RETURNING feature_count, ST_XMin(bbox), ST_YMin(bbox), ST_XMax(bbox), ST_YMax(bbox);
+        """, params)
+        row = cursor.fetchone()
+    
+    if row is None:
+        return layer
+    
+    count, min_x, min_y, max_x, max_y = row
+    shrunk = union_extents(removed_extents)
+    if shrunk and (count == 0 or min_x is None or shrunk[0] <= min_x or shrunk[1] <= min_y
+                   or shrunk[2] >= max_x or shrunk[3] >= max_y):
+        return recalculate_layer_stats(layer)
+    
+    layer.feature_count = count
+    layer.bbox = Polygon.from_bbox((min_x, min_y, max_x, max_y)) if min_x is not None else None
+    if layer.bbox:
+        layer.bbox.srid = 4326
+    return layer
@@ -0,0 +1,130 @@
+import logging
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Coalesce
+from .models import VectorFeature
+from .partition_utils import get_feature_table_for_layer
+
+logger = logging.getLogger(__name__)
+
+# Pre-simplified copies of VectorFeature.geom, from finest to coarsest
+LOD_FIELDS = VectorFeature.LOD_FIELDS
+DEFAULT_LOD_TOLERANCES = (0.0001, 0.001, 0.01)
+POINT_GEOMETRY_TYPES = ('Point', 'MultiPoint')
+
+
+def get_lod_tolerances():
+    """ST_SimplifyPreserveTopology tolerances (degrees) of the LOD columns, finest first."""
+    tolerances = tuple(getattr(settings, 'VECTOR_LOD_TOLERANCES', DEFAULT_LOD_TOLERANCES))
+    return tolerances[:len(LOD_FIELDS)]
+
+
+def layer_supports_lod(layer):
+    """Points cannot be simplified, so point layers keep their LOD columns empty."""
+    return layer.geometry_type not in POINT_GEOMETRY_TYPES
+
+
+def get_lod_insert_sql(layer, geom_sql='geom'):
+    """
+    Column list and SELECT expressions that fill the LOD columns from geom_sql in an
+    INSERT ... SELECT. Returns (columns_sql, select_sql, params); all empty for point layers.
+    """
+    if not layer_supports_lod(layer):
+        return '', '', []
+
+    tolerances = get_lod_tolerances()
+    fields = LOD_FIELDS[:len(tolerances)]
+    columns_sql = ''.join(f', {field}' for field in fields)
+    select_sql = ''.join(f', ST_SimplifyPreserveTopology({geom_sql}, %s)' for _ in fields)
+    return columns_sql, select_sql, list(tolerances)
+
+
+def refresh_feature_lods(layer, feature_ids=None):
+    """
+    Rebuild the simplified geometries of a layer's features in one UPDATE.
+
+    Args:
+        layer (VectorLayer): The layer whose features changed
+        feature_ids (list, optional): Only refresh these features (all when None)
+
+    Returns:
+        int: Number of features refreshed
+    """
+    if not layer_supports_lod(layer) or feature_ids == []:
+        return 0
+
+    tolerances = get_lod_tolerances()
+    fields = LOD_FIELDS[:len(tolerances)]
+    assignments = ', '.join(f'{field} = ST_SimplifyPreserveTopology(geom, %s)' for field in fields)
+    params = list(tolerances) + [str(layer.id)]
+
+    id_sql = ''
+    if feature_ids is not None:
+        id_sql = 'AND id = ANY(%s::uuid[])'
+        params.append([str(feature_id) for feature_id in feature_ids])
+
+    with connection.cursor() as cursor:
+        feature_table = get_feature_table_for_layer(layer.id, cursor)
+        cursor.execute(f"""
+            UPDATE {feature_table}
+            SET {assignments}
+            WHERE layer_id = %s {id_sql};
+        """, params)
+        return cursor.rowcount
+
+
+def get_lod_field(resolution):
+    """
+    Coarsest geometry column whose simplification is invisible at the given resolution
+    (degrees per pixel), or 'geom' when only full resolution will do.
+    """
+    lod_field = 'geom'
+    if not resolution:
+        return lod_field
+
+    for field, tolerance in zip(LOD_FIELDS, get_lod_tolerances()):
+        if tolerance <= resolution:
+            lod_field = field
+    return lod_field
+
+
+def get_lod_field_for_zoom(z, tile_size=256):
+    """LOD column for a web map zoom level."""
+    return get_lod_field(360.0 / (tile_size * 2 ** z))
+
+
+def with_lod_geometry(features_qs, lod_field):
+    """Annotate a feature queryset with lod_geom, the chosen LOD falling back to geom."""
+    if lod_field == 'geom':
+        return features_qs
+    return features_qs.annotate(lod_geom=Coalesce(lod_field, 'geom'))
+
+
+def apply_lod_geometry(features):
+    """Swap the annotated lod_geom into geom so serializers emit the simplified geometry."""
+    for feature in features:
+        lod_geom = getattr(feature, 'lod_geom', None)
+        if lod_geom is not None:
+            feature.geom = lod_geom
+    return features
+
+
+def choose_lod_field(zoom=None):
+    """
+    LOD column for a request. Simplified geometry is strictly opt-in: only an explicit map
+    zoom selects a LOD column, anything else gets full resolution geometry.
+    """
+    if zoom is not None:
+        return get_lod_field_for_zoom(zoom)
+    return 'geom'
+
+
+def describe_lod(lod_field):
+    """
+    Level of detail a response was built from, so clients know when geometry is simplified:
+    level 0 is full resolution, level n the n-th LOD column with its tolerance in degrees.
+    """
+    if lod_field not in LOD_FIELDS:
+        return {'level': 0, 'tolerance': None}
+    index = LOD_FIELDS.index(lod_field)
+    return {'level': index + 1, 'tolerance': get_lod_tolerances()[index]}
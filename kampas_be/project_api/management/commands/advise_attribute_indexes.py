@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from kampas_be.project_api.attribute_index_utils import create_attribute_index, get_index_candidates
+
+
+class Command(BaseCommand):
+    help = 'List frequently filtered, unindexed layer attributes and optionally build expression indexes for them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-filters', type=int, help='Filters recorded before a key is suggested')
+        parser.add_argument('--min-features', type=int, help='Smallest layer worth indexing')
+        parser.add_argument('--create', action='store_true', help='Build the suggested indexes')
+
+    def handle(self, *args, **options):
+        candidates = get_index_candidates(options['min_filters'], options['min_features'])
+        created = 0
+
+        for stat in candidates:
+            layer = stat.layer
+            self.stdout.write(
+                f"{layer.name} ({layer.title}): '{stat.attribute_key}' filtered {stat.filter_count} times, "
+                f"{layer.feature_count} features"
+            )
+            if not options['create']:
+                continue
+
+            try:
+                index_name = create_attribute_index(layer, stat.attribute_key)
+                created += 1
+                self.stdout.write(f'  created {index_name}')
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'  could not create index: {e}'))
+
+        if options['create']:
+            self.stdout.write(self.style.SUCCESS(f'Created {created} attribute indexes'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from kampas_be.project_api.models import VectorLayer
+from kampas_be.project_api.lod_utils import layer_supports_lod, refresh_feature_lods
+
+
+class Command(BaseCommand):
+    help = 'Build the pre-simplified LOD geometries of existing line and polygon vector layers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help='Only build the layers of this project')
+        parser.add_argument('--layer', help='Only build this layer')
+
+    def handle(self, *args, **options):
+        layers = VectorLayer.objects.filter(is_active=True)
+        if options['project']:
+            layers = layers.filter(project_id=options['project'])
+        if options['layer']:
+            layers = layers.filter(id=options['layer'])
+
+        built = 0
+        for layer in layers:
+            if not layer_supports_lod(layer):
+                continue
+            feature_count = refresh_feature_lods(layer)
+            built += 1
+            self.stdout.write(f'Built LODs for {layer.name} ({feature_count} features)')
+
+        self.stdout.write(self.style.SUCCESS(f'Built LODs for {built} vector layers'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from kampas_be.project_api.models import VectorLayer
+from kampas_be.project_api.vector_utils import VectorDataProcessor, get_layer_view_name, get_relation_kind
+
+
+class Command(BaseCommand):
+    help = 'Replace legacy per-layer vector_layer_<hex> tables with views over the VectorFeature table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the tables that would be converted')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        processor = VectorDataProcessor()
+        converted = 0
+
+        for layer in VectorLayer.objects.all().iterator():
+            table_name = get_layer_view_name(layer)
+
+            with connection.cursor() as cursor:
+                relation_kind = get_relation_kind(cursor, table_name)
+
+            # Only plain tables need converting; views and unpublished layers are left alone
+            if relation_kind != 'r':
+                continue
+
+            if dry_run:
+                self.stdout.write(f'Would convert {table_name} ({layer.title or layer.name})')
+                converted += 1
+                continue
+
+            # VectorFeature rows were always written alongside the table, so the view has the same data
+            with transaction.atomic():
+                processor._create_layer_view(layer)
+            converted += 1
+            self.stdout.write(f'Converted {table_name}')
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f'{converted} layer tables would be converted'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Converted {converted} layer tables to views'))
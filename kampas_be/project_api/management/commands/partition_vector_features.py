@@ -0,0 +1,103 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from kampas_be.project_api.models import VectorLayer
+from kampas_be.project_api.partition_utils import (
+    VECTOR_FEATURE_TABLE, DEFAULT_PARTITION, get_partition_name, is_feature_table_partitioned
+)
+from kampas_be.project_api.vector_utils import VectorDataProcessor, get_layer_view_name, get_relation_kind
+
+LEGACY_TABLE = f'{VECTOR_FEATURE_TABLE}_unpartitioned'
+
+
+class Command(BaseCommand):
+    help = 'Convert the VectorFeature table into a table LIST-partitioned by layer_id (one partition per layer)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-old', action='store_true',
+                            help=f'Keep the original table as {LEGACY_TABLE} instead of dropping it')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if is_feature_table_partitioned(cursor):
+                raise CommandError(f'{VECTOR_FEATURE_TABLE} is already partitioned')
+
+        layer_ids = list(VectorLayer.objects.values_list('id', flat=True))
+        self.stdout.write(f'Partitioning {VECTOR_FEATURE_TABLE} into {len(layer_ids)} layer partitions')
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {VECTOR_FEATURE_TABLE} IN ACCESS EXCLUSIVE MODE;')
+                cursor.execute(f'ALTER TABLE {VECTOR_FEATURE_TABLE} RENAME TO {LEGACY_TABLE};')
+
+                # Same columns as the model table; the primary key has to include the partition key
+                cursor.execute(f"""
+                    CREATE TABLE {VECTOR_FEATURE_TABLE}
+                    (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS)
+                    PARTITION BY LIST (layer_id);
+                """)
+                cursor.execute(f"""
+                    ALTER TABLE {VECTOR_FEATURE_TABLE}
+                    ADD CONSTRAINT {VECTOR_FEATURE_TABLE}_part_pkey PRIMARY KEY (id, layer_id);
+                """)
+                cursor.execute(f"""
+                    ALTER TABLE {VECTOR_FEATURE_TABLE}
+                    ADD CONSTRAINT {VECTOR_FEATURE_TABLE}_part_layer_fk FOREIGN KEY (layer_id)
+                    REFERENCES {VectorLayer._meta.db_table} (id) DEFERRABLE INITIALLY DEFERRED;
+                """)
+                cursor.execute(f"""
+                    CREATE INDEX {VECTOR_FEATURE_TABLE}_part_geom_idx
+                    ON {VECTOR_FEATURE_TABLE} USING GIST (geom);
+                """)
+                cursor.execute(f"""
+                    CREATE INDEX {VECTOR_FEATURE_TABLE}_part_attributes_idx
+                    ON {VECTOR_FEATURE_TABLE} USING GIN (attributes);
+                """)
+                cursor.execute(f"""
+                    CREATE INDEX {VECTOR_FEATURE_TABLE}_part_created_idx
+                    ON {VECTOR_FEATURE_TABLE} (created_at, id);
+                """)
+                cursor.execute(f"""
+                    CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {VECTOR_FEATURE_TABLE} DEFAULT;
+                """)
+
+                # Load each layer into a bare table and attach it, so indexes are built once per partition
+                moved = 0
+                for layer_id in layer_ids:
+                    partition_name = get_partition_name(layer_id)
+                    cursor.execute(f"""
+                        CREATE TABLE {partition_name} (LIKE {VECTOR_FEATURE_TABLE} INCLUDING DEFAULTS);
+                    """)
+                    cursor.execute(f"""
+                        INSERT INTO {partition_name} SELECT * FROM {LEGACY_TABLE} WHERE layer_id = %s;
+                    """, [str(layer_id)])
+                    moved += cursor.rowcount
+                    cursor.execute(f"""
+                        ALTER TABLE {VECTOR_FEATURE_TABLE}
+                        ATTACH PARTITION {partition_name} FOR VALUES IN (%s);
+                    """, [str(layer_id)])
+
+                cursor.execute(f"""
+                    SELECT COUNT(*) FROM {LEGACY_TABLE} f
+                    WHERE NOT EXISTS (SELECT 1 FROM {VectorLayer._meta.db_table} l WHERE l.id = f.layer_id);
+                """)
+                orphaned = cursor.fetchone()[0]
+
+            # Layer views still point at the renamed table, rebuild them over the partitioned one
+            processor = VectorDataProcessor()
+            for layer in VectorLayer.objects.all().iterator():
+                with connection.cursor() as cursor:
+                    relation_kind = get_relation_kind(cursor, get_layer_view_name(layer))
+                if relation_kind == 'v':
+                    processor._create_layer_view(layer)
+
+            if not options['keep_old']:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {LEGACY_TABLE};')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {VECTOR_FEATURE_TABLE};')
+
+        if orphaned:
+            self.stdout.write(self.style.WARNING(f'Skipped {orphaned} features that reference missing layers'))
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} features into {len(layer_ids)} partitions'))
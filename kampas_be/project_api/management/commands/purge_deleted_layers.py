@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from kampas_be.project_api.models import VectorLayer, RasterLayer, TerrainModel
+from kampas_be.project_api.partition_utils import drop_layer_partition
+from kampas_be.project_api.attribute_index_utils import drop_attribute_indexes
+from kampas_be.project_api.tile_utils import delete_tile_prefix, get_tile_s3_prefix
+from kampas_be.project_api.geoserver_utils import get_geoserver_manager
+from kampas_be.project_api.vector_utils import get_layer_view_name, drop_layer_relation
+from kampas_be.project_api.raster_utils import RasterDataProcessor
+from kampas_be.project_api.terrain_utils import TerrainDataProcessor
+
+
+class Command(BaseCommand):
+    help = 'Permanently delete vector layers, raster layers and terrain models that were soft deleted more than 7 days ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Days a layer stays soft deleted before purge')
+        parser.add_argument('--dry-run', action='store_true', help='List the layers that would be purged')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        layers = VectorLayer.objects.filter(
+            is_active=False, deleted_at__isnull=False, deleted_at__lte=cutoff
+        ).select_related('project__company')
+
+        geoserver_manager = get_geoserver_manager()
+        purged = 0
+
+        for layer in layers:
+            if options['dry_run']:
+                self.stdout.write(f'Would purge {layer.name} ({layer.title}), deleted {layer.deleted_at}')
+                continue
+
+            if not geoserver_manager.delete_layer_from_geoserver(layer):
+                self.stdout.write(self.style.WARNING(f'Could not remove {layer.name} from GeoServer'))
+
+            layer_name = layer.name
+            delete_tile_prefix(get_tile_s3_prefix(layer.id))
+            # DROP INDEX CONCURRENTLY cannot run inside the transaction below
+            drop_attribute_indexes(layer)
+
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    drop_layer_relation(cursor, get_layer_view_name(layer))
+                # Dropping the partition removes the features without a row-by-row DELETE
+                feature_count = drop_layer_partition(layer.id)
+                layer.delete()
+
+            purged += 1
+            self.stdout.write(f'Purged {layer_name} ({feature_count} features)')
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} vector layers'))
+        
+        self._purge_coverages(RasterLayer, RasterDataProcessor(), cutoff, options['dry_run'], 'raster layers')
+        self._purge_coverages(TerrainModel, TerrainDataProcessor(), cutoff, options['dry_run'], 'terrain models')
+    
+    def _purge_coverages(self, model, processor, cutoff, dry_run, label):
+        """Remove soft deleted rasters from GeoServer (with their published files) and the database"""
+        sources = model.objects.filter(
+            deleted_at__isnull=False, deleted_at__lte=cutoff
+        ).select_related('project__company')
+        purged = 0
+        
+        for source in sources:
+            if dry_run:
+                self.stdout.write(f'Would purge {source.file_name}, deleted {source.deleted_at}')
+                continue
+            
+            if not processor.delete_layer_from_geoserver(source):
+                self.stdout.write(self.style.WARNING(f'Could not remove {source.file_name} from GeoServer'))
+                continue
+            
+            file_name = source.file_name
+            source.delete()
+            purged += 1
+            self.stdout.write(f'Purged {file_name}')
+        
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} {label}'))
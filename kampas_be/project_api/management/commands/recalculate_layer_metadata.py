@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from kampas_be.project_api.models import VectorLayer
+from kampas_be.project_api.layer_metadata_utils import recalculate_layers_stats
+from kampas_be.project_api.attribute_catalog_utils import refresh_attribute_catalog
+
+
+class Command(BaseCommand):
+    help = 'Recompute feature_count and bbox of vector layers from their stored features'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help='Only recompute the layers of this project')
+        parser.add_argument('--batch-size', type=int, default=100, help='Layers recomputed per grouped query')
+        parser.add_argument('--catalog', action='store_true', help='Also rebuild the attribute catalogs')
+
+    def handle(self, *args, **options):
+        layers = VectorLayer.objects.filter(is_active=True).order_by('id')
+        if options['project']:
+            layers = layers.filter(project_id=options['project'])
+
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+
+        for layer in layers.iterator(chunk_size=batch_size):
+            batch.append(layer)
+            if options['catalog']:
+                refresh_attribute_catalog(layer)
+            if len(batch) >= batch_size:
+                recalculate_layers_stats(batch)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            recalculate_layers_stats(batch)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed metadata for {updated} vector layers'))
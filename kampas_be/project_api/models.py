@@ -4,10 +4,12 @@ import uuid
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.db import models as geomodels
+from django.contrib.postgres.indexes import GinIndex
 from kampas_be.company_api.models import Company, Client
 from kampas_be.auth_app.models import CustomUser
 from kampas_be.kampas_be.storage_backends import create_project_folder
 from kampas_be.project_api.geoserver_utils import get_geoserver_manager, GeoServerManager
+from kampas_be.project_api.partition_utils import ensure_layer_partition
 from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
@@ -203,6 +205,10 @@ class VectorLayer(models.Model):
     s3_file_key = models.CharField(max_length=500, blank=True, null=True)
     feature_count = models.IntegerField(default=0)
     bbox = gis_models.PolygonField(srid=4326, null=True, blank=True)
+    tile_version = models.PositiveIntegerField(default=1)  # Bumped to invalidate all cached vector tiles
+    ingest_report = models.JSONField(null=True, blank=True)  # Validation summary of the last upload
+    attribute_catalog = models.JSONField(default=dict, blank=True)  # Attribute keys, types and value statistics
+    attribute_catalog_updated_at = models.DateTimeField(null=True, blank=True)
     
     # Timestamps and tags
     created_at = models.DateTimeField(auto_now_add=True)
@@ -219,6 +225,13 @@ class VectorLayer(models.Model):
     def __str__(self):
         return f"{self.title or self.name} ({self.geometry_type}) - {self.project.project_name}"
     
+    def save(self, *args, **kwargs):
+        """Create the layer's VectorFeature partition when the layer is first saved"""
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if is_new:
+            ensure_layer_partition(self.id)
+    
     @property
     def display_name(self):
         return self.title or self.name
@@ -242,22 +255,58 @@ class VectorLayer(models.Model):
 # VectorFeature Model
 # Represents an individual geographic feature within a VectorLayer.
 # Stores the geometry and a flexible JSON field for attributes.
+class VectorFeatureManager(models.Manager):
+    def get_queryset(self):
+        # Simplified geometries are only read when a view asks for a level of detail
+        return super().get_queryset().defer(*VectorFeature.LOD_FIELDS)
+
+
 class VectorFeature(models.Model):
+    LOD_FIELDS = ('geom_lod1', 'geom_lod2', 'geom_lod3')
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     layer = models.ForeignKey(VectorLayer, on_delete=models.CASCADE, related_name='features')
     geom = gis_models.GeometryField(srid=4326)
+    # geom simplified at the VECTOR_LOD_TOLERANCES, finest first (empty for point layers)
+    geom_lod1 = gis_models.GeometryField(srid=4326, null=True, blank=True)
+    geom_lod2 = gis_models.GeometryField(srid=4326, null=True, blank=True)
+    geom_lod3 = gis_models.GeometryField(srid=4326, null=True, blank=True)
     attributes = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = VectorFeatureManager()
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            GinIndex(fields=["attributes"]),
+            models.Index(fields=["layer", "created_at", "id"]),
+        ]
     
     def __str__(self):
         return f"Feature {self.id} - {self.layer.name}"
 
 
 
+# LayerAttributeFilterStat Model
+# Counts attribute filters per layer and key so hot keys can get expression indexes.
+class LayerAttributeFilterStat(models.Model):
+    layer = models.ForeignKey(VectorLayer, on_delete=models.CASCADE, related_name='attribute_filter_stats')
+    attribute_key = models.CharField(max_length=255)
+    filter_count = models.PositiveIntegerField(default=0)
+    last_filtered_at = models.DateTimeField(auto_now=True)
+    index_name = models.CharField(max_length=63, blank=True)  # Expression index on attributes->>key, once built
+    indexed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ('layer', 'attribute_key')
+        ordering = ['-filter_count']
+    
+    def __str__(self):
+        return f"{self.layer.name}.{self.attribute_key} ({self.filter_count} filters)"
+
+
 # RasterGroupTag Model
 # Represents specific tags for raster layers, used for categorization.
 class RasterGroupTag(models.Model):
@@ -281,6 +330,7 @@ class RasterLayer(models.Model):
     description = models.TextField(blank=True)
      
     s3_file_key = models.CharField(max_length=500, help_text="S3 key/path for the raster file")  # Store S3 path only
+    cog_s3_file_key = models.CharField(max_length=500, blank=True, null=True, help_text="S3 key of the Cloud-Optimized GeoTIFF")
     uploaded_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
      
@@ -509,6 +559,7 @@ class TerrainModel(models.Model):
     file_type = models.CharField(max_length=10, choices=FILE_TYPE_CHOICES, default='tif')
     description = models.TextField(blank=True)
     s3_file_key = models.CharField(max_length=500, help_text="S3 key/path for the terrain file")
+    cog_s3_file_key = models.CharField(max_length=500, blank=True, null=True, help_text="S3 key of the Cloud-Optimized GeoTIFF")
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
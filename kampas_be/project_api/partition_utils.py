@@ -0,0 +1,88 @@
+import logging
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# VectorFeature is LIST-partitioned on layer_id once the partition_vector_features command has run
+VECTOR_FEATURE_TABLE = 'project_api_vectorfeature'
+DEFAULT_PARTITION = f'{VECTOR_FEATURE_TABLE}_default'
+
+
+def get_partition_name(layer_id):
+    """Name of the VectorFeature partition holding one layer's features."""
+    return f"{VECTOR_FEATURE_TABLE}_{layer_id.hex}"
+
+
+def is_feature_table_partitioned(cursor=None):
+    """Return True if the VectorFeature table has been converted to a partitioned table."""
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return is_feature_table_partitioned(cursor)
+
+    cursor.execute("""
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema();
+    """, [VECTOR_FEATURE_TABLE])
+    return cursor.fetchone() is not None
+
+
+def get_feature_table_for_layer(layer_id, cursor=None):
+    """
+    Table that a layer's features should be read from or written to directly:
+    the layer partition when the table is partitioned, the VectorFeature table otherwise.
+    """
+    if is_feature_table_partitioned(cursor):
+        return get_partition_name(layer_id)
+    return VECTOR_FEATURE_TABLE
+
+
+def ensure_layer_partition(layer_id):
+    """
+    Create the VectorFeature partition for a layer if the table is partitioned.
+    Does nothing on an unpartitioned table.
+    """
+    try:
+        with connection.cursor() as cursor:
+            if not is_feature_table_partitioned(cursor):
+                return False
+
+            partition_name = get_partition_name(layer_id)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {partition_name}
+                PARTITION OF {VECTOR_FEATURE_TABLE} FOR VALUES IN (%s);
+            """, [str(layer_id)])
+            return True
+
+    except Exception as e:
+        logger.error(f"Error creating feature partition for layer {layer_id}: {e}")
+        raise
+
+
+def drop_layer_partition(layer_id):
+    """
+    Remove all features of a layer. On a partitioned table this detaches and drops the
+    layer partition instead of running a DELETE over the layer's rows.
+    """
+    try:
+        with connection.cursor() as cursor:
+            if not is_feature_table_partitioned(cursor):
+                cursor.execute(f"DELETE FROM {VECTOR_FEATURE_TABLE} WHERE layer_id = %s;", [str(layer_id)])
+                return cursor.rowcount
+
+            partition_name = get_partition_name(layer_id)
+            cursor.execute("SELECT to_regclass(%s);", [partition_name])
+            if cursor.fetchone()[0] is None:
+                return 0
+
+            cursor.execute(f"SELECT COUNT(*) FROM {partition_name};")
+            row_count = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {VECTOR_FEATURE_TABLE} DETACH PARTITION {partition_name};")
+            cursor.execute(f"DROP TABLE {partition_name};")
+            logger.info(f"Dropped partition {partition_name} ({row_count} features)")
+            return row_count
+
+    except Exception as e:
+        logger.error(f"Error dropping feature partition for layer {layer_id}: {e}")
+        raise
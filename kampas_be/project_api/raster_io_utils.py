@@ -0,0 +1,402 @@
+import os
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Optional, Tuple
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from rasterio.session import AWSSession
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+VSIS3_PREFIX = '/vsis3/'
+DEFAULT_COG_COMPRESSION = 'DEFLATE'
+DEFAULT_COG_BLOCKSIZE = 512
+# Compressions that benefit from a horizontal differencing predictor
+PREDICTOR_COMPRESSIONS = ('DEFLATE', 'LZW', 'ZSTD')
+
+
+def get_vsis3_path(file_key: str) -> str:
+    """GDAL virtual path reading an S3 object with HTTP range requests."""
+    return f"{VSIS3_PREFIX}{settings.AWS_STORAGE_BUCKET_NAME}/{file_key}"
+
+
+def s3_raster_env(**options):
+    """
+    rasterio.Env tuned for reading rasters straight from S3.
+
+    Directory listings are skipped on open, consecutive ranges are merged into one
+    request, and fetched ranges are kept in the VSI cache. The GDAL block cache size
+    comes from RASTER_GDAL_CACHEMAX (MB).
+    """
+    env_options = {
+        'GDAL_CACHEMAX': getattr(settings, 'RASTER_GDAL_CACHEMAX', 512),
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.tiff,.TIF,.TIFF,.asc,.xyz',
+        'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'GDAL_HTTP_VERSION': 2,
+        'VSI_CACHE': True,
+        'VSI_CACHE_SIZE': getattr(settings, 'RASTER_VSI_CACHE_SIZE', 64 * 1024 * 1024),
+    }
+    env_options.update(options)
+    session = AWSSession(
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME
+    )
+    return rasterio.Env(session=session, **env_options)
+
+
+def raster_env_for(file_path: str):
+    """S3 read environment for /vsis3/ paths, a no-op context for local files."""
+    if file_path.startswith(VSIS3_PREFIX):
+        return s3_raster_env()
+    return nullcontext()
+
+
+def get_cog_s3_key(file_key: str) -> str:
+    """S3 key of the COG written next to an uploaded raster: <name>_cog.tif."""
+    base, _ = os.path.splitext(file_key)
+    return f"{base}_cog.tif"
+
+
+def get_overview_factors(width: int, height: int, blocksize: int) -> list:
+    """Power-of-two decimation factors until the smallest overview fits in one block."""
+    factors = []
+    factor = 2
+    while max(width, height) / factor >= blocksize / 2 and factor <= 2 ** 16:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def is_cloud_optimized(file_path: str, blocksize: Optional[int] = None) -> bool:
+    """True when a GeoTIFF is internally tiled and carries overviews (if it is large enough to need them)."""
+    blocksize = blocksize or getattr(settings, 'RASTER_COG_BLOCKSIZE', DEFAULT_COG_BLOCKSIZE)
+    with raster_env_for(file_path), rasterio.open(file_path) as dataset:
+        if dataset.driver != 'GTiff' or not dataset.profile.get('tiled'):
+            return False
+        if max(dataset.width, dataset.height) > blocksize and not dataset.overviews(1):
+            return False
+        return True
+
+
+def _get_cog_creation_options(dataset, compression: str, blocksize: int) -> dict:
+    """GTiff creation options for a COG of the given dataset."""
+    dtype = np.dtype(dataset.dtypes[0])
+    if compression in ('JPEG', 'WEBP') and not (dtype == np.uint8 and dataset.count in (1, 3)):
+        # Lossy codecs only take 8-bit greyscale/RGB; fall back to lossless for the rest
+        compression = DEFAULT_COG_COMPRESSION
+
+    options = {
+        'driver': 'GTiff',
+        'tiled': True,
+        'blockxsize': blocksize,
+        'blockysize': blocksize,
+        'compress': compression,
+        'BIGTIFF': 'IF_SAFER',
+        'NUM_THREADS': 'ALL_CPUS',
+    }
+    if compression in PREDICTOR_COMPRESSIONS:
+        options['predictor'] = 3 if dtype.kind == 'f' else 2
+    if compression == 'JPEG' and dataset.count == 3:
+        options['photometric'] = 'YCBCR'
+    return options
+
+
+def convert_to_cog(src_path: str, dst_path: Optional[str] = None, compression: Optional[str] = None,
+                   blocksize: Optional[int] = None, resampling: Optional[str] = None) -> str:
+    """
+    Rewrite a raster as a Cloud-Optimized GeoTIFF.
+
+    The source is copied block by block into an internally tiled GTiff, overviews are
+    built on it with rasterio, and a final copy with copy_src_overviews puts the overview
+    IFDs ahead of the full-resolution data as the COG layout requires.
+
+    Args:
+        src_path (str): Raster to convert
+        dst_path (str, optional): Output path (a temporary .tif by default)
+        compression (str, optional): GTiff compression (RASTER_COG_COMPRESSION by default)
+        blocksize (int, optional): Internal tile size (RASTER_COG_BLOCKSIZE by default)
+        resampling (str, optional): Overview resampling (RASTER_COG_OVERVIEW_RESAMPLING by default)
+
+    Returns:
+        str: Path of the COG
+    """
+    compression = (compression or getattr(settings, 'RASTER_COG_COMPRESSION', DEFAULT_COG_COMPRESSION)).upper()
+    blocksize = blocksize or getattr(settings, 'RASTER_COG_BLOCKSIZE', DEFAULT_COG_BLOCKSIZE)
+    resampling = resampling or getattr(settings, 'RASTER_COG_OVERVIEW_RESAMPLING', 'average')
+
+    if dst_path is None:
+        dst_file = tempfile.NamedTemporaryFile(delete=False, suffix='.tif')
+        dst_path = dst_file.name
+        dst_file.close()
+
+    tiled_file = tempfile.NamedTemporaryFile(delete=False, suffix='.tif')
+    tiled_path = tiled_file.name
+    tiled_file.close()
+
+    try:
+        with rasterio.open(src_path) as src:
+            options = _get_cog_creation_options(src, compression, blocksize)
+            profile = src.profile.copy()
+            profile.update(options)
+
+            with rasterio.open(tiled_path, 'w', **profile) as tiled:
+                # Block-sized windows keep memory flat whatever the raster size
+                for _, window in tiled.block_windows(1):
+                    tiled.write(src.read(window=window), window=window)
+                for index, description in enumerate(src.descriptions, start=1):
+                    if description:
+                        tiled.set_band_description(index, description)
+                tiled.update_tags(**src.tags())
+
+        with rasterio.open(tiled_path, 'r+') as tiled:
+            factors = get_overview_factors(tiled.width, tiled.height, blocksize)
+            if factors:
+                tiled.build_overviews(factors, Resampling[resampling])
+                tiled.update_tags(ns='rio_overview', resampling=resampling)
+
+        copy_options = {key: value for key, value in options.items() if key != 'driver'}
+        rasterio.shutil.copy(tiled_path, dst_path, driver='GTiff', copy_src_overviews=True, **copy_options)
+        logger.info(f"Converted {src_path} to COG {dst_path} ({compression}, {blocksize}px tiles, overviews {factors})")
+        return dst_path
+
+    except Exception:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
+
+    finally:
+        if os.path.exists(tiled_path):
+            os.remove(tiled_path)
+
+
+def prepare_cog(s3_client, local_file_path: str, file_key: str) -> Tuple[str, Optional[str]]:
+    """
+    Convert an uploaded raster to a COG and store it in S3 next to the original.
+
+    Uploads that are already cloud optimized are used as they are. Conversion failures
+    are logged and the original is published instead, so an upload never fails on it.
+
+    Args:
+        s3_client: boto3 S3 client
+        local_file_path (str): Downloaded upload
+        file_key (str): S3 key of the upload
+
+    Returns:
+        tuple: (path of the file to publish, S3 key of the COG or None)
+    """
+    if not getattr(settings, 'RASTER_COG_ENABLED', True):
+        return local_file_path, None
+
+    try:
+        if is_cloud_optimized(local_file_path):
+            logger.info(f"{file_key} is already cloud optimized")
+            return local_file_path, file_key
+
+        cog_path = convert_to_cog(local_file_path)
+        cog_key = get_cog_s3_key(file_key)
+        try:
+            s3_client.upload_file(
+                cog_path, settings.AWS_STORAGE_BUCKET_NAME, cog_key,
+                ExtraArgs={'ContentType': 'image/tiff'}
+            )
+        except Exception:
+            os.remove(cog_path)
+            raise
+        logger.info(f"Uploaded COG of {file_key} to {cog_key}")
+        return cog_path, cog_key
+
+    except Exception as e:
+        logger.error(f"COG conversion failed for {file_key}, publishing the original: {e}")
+        return local_file_path, None
+
+
+DEFAULT_STATS_PERCENTILES = (2, 25, 50, 75, 98)
+
+
+class BandStatistics:
+    """
+    Running accumulators for one band: count, min, max, mean, std and a fixed-range histogram.
+
+    Each block contributes its own (count, mean, M2), merged with Chan et al.'s parallel
+    update. Unlike sum / sum-of-squares this stays exact for data far from zero with a small
+    spread (elevations, projected coordinates).
+    """
+
+    def __init__(self, hist_range: Optional[Tuple[float, float]] = None, bins: int = 256):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.bins = bins
+        self.hist_range = hist_range
+        self.histogram = np.zeros(bins, dtype=np.int64) if hist_range else None
+
+    def update(self, values: np.ndarray):
+        """Add the valid (unmasked) values of one block."""
+        if values.size == 0:
+            return
+        values = values.astype(np.float64, copy=False)
+        block_count = values.size
+        block_mean = float(values.mean())
+        block_m2 = float(np.square(values - block_mean).sum())
+
+        total = self.count + block_count
+        delta = block_mean - self.mean
+        self.mean += delta * block_count / total
+        self.m2 += block_m2 + delta * delta * self.count * block_count / total
+        self.count = total
+        block_min, block_max = float(values.min()), float(values.max())
+        self.min = block_min if self.min is None else min(self.min, block_min)
+        self.max = block_max if self.max is None else max(self.max, block_max)
+        if self.histogram is not None:
+            # Values outside the approximate range land in the end bins
+            low, high = self.hist_range
+            counts, _ = np.histogram(np.clip(values, low, high), bins=self.bins, range=(low, high))
+            self.histogram += counts
+
+    def percentiles(self, percents=DEFAULT_STATS_PERCENTILES) -> dict:
+        """Percentiles interpolated within the histogram bins."""
+        if self.histogram is None or not self.count:
+            return {}
+        low, high = self.hist_range
+        edges = np.linspace(low, high, self.bins + 1)
+        cumulative = np.cumsum(self.histogram)
+        result = {}
+        for percent in percents:
+            target = self.count * percent / 100.0
+            index = int(np.searchsorted(cumulative, target))
+            index = min(index, self.bins - 1)
+            before = cumulative[index - 1] if index > 0 else 0
+            in_bin = self.histogram[index]
+            fraction = (target - before) / in_bin if in_bin else 0.0
+            value = edges[index] + fraction * (edges[index + 1] - edges[index])
+            result[f"p{percent}"] = float(min(max(value, self.min), self.max))
+        return result
+
+    def as_dict(self) -> dict:
+        """Summary for RasterLayer.band_descriptions; empty when the band has no valid pixels."""
+        if not self.count:
+            return {}
+        summary = {
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'std': float(np.sqrt(self.m2 / self.count)),
+            'valid_pixels': self.count,
+        }
+        if self.histogram is not None:
+            summary['histogram'] = {
+                'range': list(self.hist_range),
+                'counts': self.histogram.tolist(),
+            }
+            summary['percentiles'] = self.percentiles()
+        return summary
+
+
+def _read_valid(dataset, band_index: int, **read_kwargs) -> np.ndarray:
+    """Unmasked values of a band read (nodata and mask removed)."""
+    data = dataset.read(band_index, masked=True, **read_kwargs)
+    if np.ma.is_masked(data):
+        return data.compressed()
+    return np.asarray(data).ravel()
+
+
+def _overview_read_shape(dataset, max_size: int) -> Tuple[int, int]:
+    """Decimated (rows, cols) no larger than max_size; GDAL serves such reads from overviews."""
+    scale = max(dataset.width, dataset.height) / float(max_size)
+    if scale <= 1:
+        return dataset.height, dataset.width
+    return max(1, int(dataset.height / scale)), max(1, int(dataset.width / scale))
+
+
+def compute_band_statistics(file_path: str, band_index: int, approximate: bool = False,
+                            bins: Optional[int] = None) -> dict:
+    """
+    Statistics of one band without loading it whole.
+
+    A decimated read (served from overviews when the file has them) gives the histogram
+    range. In approximate mode that read is the whole answer; otherwise the band is
+    streamed block window by block window into running accumulators.
+
+    Args:
+        file_path (str): Raster path (local or GDAL virtual path)
+        band_index (int): 1-based band index
+        approximate (bool): Use the decimated read only
+        bins (int, optional): Histogram bins (RASTER_STATS_HISTOGRAM_BINS by default)
+
+    Returns:
+        dict: min, max, mean, std, valid_pixels, histogram and percentiles
+    """
+    bins = bins or getattr(settings, 'RASTER_STATS_HISTOGRAM_BINS', 256)
+    approx_size = getattr(settings, 'RASTER_STATS_APPROX_SIZE', 1024)
+
+    # Environments are per thread, so each worker thread enters its own
+    with raster_env_for(file_path), rasterio.open(file_path) as dataset:
+        sample = _read_valid(dataset, band_index, out_shape=_overview_read_shape(dataset, approx_size))
+        if sample.size == 0 and approximate:
+            return {}
+
+        hist_range = None
+        if sample.size:
+            low, high = float(sample.min()), float(sample.max())
+            hist_range = (low, high if high > low else low + 1)
+
+        if approximate:
+            stats = BandStatistics(hist_range, bins)
+            stats.update(sample)
+            summary = stats.as_dict()
+            summary['approximate'] = True
+            return summary
+
+        stats = BandStatistics(hist_range, bins)
+        for _, window in dataset.block_windows(band_index):
+            stats.update(_read_valid(dataset, band_index, window=window))
+        return stats.as_dict()
+
+
+def compute_raster_statistics(file_path: str, bands: Optional[list] = None, approximate: Optional[bool] = None,
+                              max_workers: Optional[int] = None) -> dict:
+    """
+    Statistics of several bands, computed in parallel threads.
+
+    Each thread opens its own dataset handle (rasterio datasets are not thread safe);
+    GDAL and numpy release the GIL while reading and reducing blocks.
+
+    Args:
+        file_path (str): Raster path (local or GDAL virtual path)
+        bands (list, optional): 1-based band indexes (all bands by default)
+        approximate (bool, optional): Overview-based mode (RASTER_STATS_APPROXIMATE by default)
+        max_workers (int, optional): Threads (RASTER_STATS_MAX_WORKERS by default)
+
+    Returns:
+        dict: band index -> statistics dict (empty for bands that failed)
+    """
+    if approximate is None:
+        approximate = getattr(settings, 'RASTER_STATS_APPROXIMATE', False)
+    if bands is None:
+        with raster_env_for(file_path), rasterio.open(file_path) as dataset:
+            bands = list(range(1, dataset.count + 1))
+    max_workers = max_workers or getattr(settings, 'RASTER_STATS_MAX_WORKERS', 4)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(bands)) or 1) as executor:
+        futures = {
+            band_index: executor.submit(compute_band_statistics, file_path, band_index, approximate)
+            for band_index in bands
+        }
+        for band_index, future in futures.items():
+            try:
+                results[band_index] = future.result()
+            except Exception as e:
+                logger.warning(f"Could not compute statistics for band {band_index} of {file_path}: {e}")
+                results[band_index] = {}
+    return results
@@ -0,0 +1,335 @@
+import io
+import json
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.enums import ColorInterp, Resampling
+from rasterio.transform import from_bounds
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import BaseRenderer
+from .raster_io_utils import get_vsis3_path, raster_env_for
+from .tile_utils import WEB_MERCATOR_WORLD_SIZE
+
+logger = logging.getLogger(__name__)
+
+RASTER_TILE_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+}
+RASTER_TILE_RESAMPLING = ('nearest', 'bilinear', 'cubic', 'average')
+
+# Colour ramps as (position, RGB) stops, interpolated into 256-entry lookup tables
+COLORMAP_STOPS = {
+    'gray': [(0.0, (0, 0, 0)), (1.0, (255, 255, 255))],
+    'viridis': [(0.0, (68, 1, 84)), (0.25, (59, 82, 139)), (0.5, (33, 145, 140)),
+                (0.75, (94, 201, 98)), (1.0, (253, 231, 37))],
+    'magma': [(0.0, (0, 0, 4)), (0.25, (81, 18, 124)), (0.5, (183, 55, 121)),
+              (0.75, (252, 137, 97)), (1.0, (252, 253, 191))],
+    'terrain': [(0.0, (0, 97, 71)), (0.25, (16, 122, 47)), (0.5, (232, 215, 125)),
+                (0.75, (161, 67, 0)), (1.0, (255, 255, 255))],
+    'rdylgn': [(0.0, (165, 0, 38)), (0.25, (244, 109, 67)), (0.5, (255, 255, 191)),
+               (0.75, (102, 189, 99)), (1.0, (0, 104, 55))],
+}
+
+
+class RasterTileRenderer(BaseRenderer):
+    """
+    Lets raster tile views pass DRF content negotiation for clients that ask for images.
+    Error payloads are still encoded as JSON.
+    """
+    media_type = 'image/*'
+    format = 'png'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or isinstance(data, bytes):
+            return data or b''
+        return json.dumps(data).encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def get_colormap(name: str) -> np.ndarray:
+    """256x3 uint8 lookup table of a named colour ramp."""
+    stops = COLORMAP_STOPS[name]
+    positions = [position for position, _ in stops]
+    steps = np.linspace(0.0, 1.0, 256)
+    channels = [np.interp(steps, positions, [color[i] for _, color in stops]) for i in range(3)]
+    return np.stack(channels, axis=-1).round().astype(np.uint8)
+
+
+def get_tile_bounds(z: int, x: int, y: int) -> tuple:
+    """EPSG:3857 bounds (minx, miny, maxx, maxy) of an XYZ tile."""
+    half_world = WEB_MERCATOR_WORLD_SIZE / 2
+    tile_size = WEB_MERCATOR_WORLD_SIZE / 2 ** z
+    minx = -half_world + x * tile_size
+    maxy = half_world - y * tile_size
+    return minx, maxy - tile_size, minx + tile_size, maxy
+
+
+def has_tileable_cog(source) -> bool:
+    """
+    Tiles are only rendered from COGs: a striped upload without overviews would make a
+    low-zoom tile read most of the file over /vsis3/ inside an API worker.
+    """
+    return bool(source.cog_s3_file_key)
+
+
+def get_raster_source_path(source) -> str:
+    """/vsis3/ path of the COG of a raster or terrain model."""
+    if not has_tileable_cog(source):
+        raise ValueError("Raster has no Cloud-Optimized GeoTIFF to render tiles from.")
+    return get_vsis3_path(source.cog_s3_file_key)
+
+
+def _parse_number_list(value: str, name: str) -> list:
+    try:
+        return [float(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"'{name}' must be comma-separated numbers.")
+
+
+def parse_raster_tile_params(query_params, band_count: Optional[int]) -> dict:
+    """
+    Parse raster tile query parameters.
+
+    Args:
+        query_params: Request query parameters
+            bands: '1' or '1,2,3' (1-based band indexes)
+            rescale: 'min,max' for every band, or 'min,max;min,max;min,max' per band
+            colormap: Name from COLORMAP_STOPS, single band only
+            resampling: One of RASTER_TILE_RESAMPLING
+        band_count (int, optional): Bands of the source raster
+
+    Returns:
+        dict: bands, rescale, colormap and resampling (None where defaults apply)
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    bands = None
+    if query_params.get('bands'):
+        try:
+            bands = [int(band) for band in query_params['bands'].split(',') if band.strip()]
+        except ValueError:
+            raise ValueError("'bands' must be comma-separated band numbers.")
+        if len(bands) not in (1, 3):
+            raise ValueError("'bands' must select 1 or 3 bands.")
+        if any(band < 1 or (band_count and band > band_count) for band in bands):
+            raise ValueError(f"Band indexes must be between 1 and {band_count}.")
+
+    rescale = None
+    if query_params.get('rescale'):
+        rescale = []
+        for pair in query_params['rescale'].split(';'):
+            values = _parse_number_list(pair, 'rescale')
+            if len(values) != 2 or values[0] >= values[1]:
+                raise ValueError("'rescale' ranges must be 'min,max' with min < max.")
+            rescale.append(values)
+
+    colormap = query_params.get('colormap')
+    if colormap:
+        colormap = colormap.lower()
+        if colormap not in COLORMAP_STOPS:
+            raise ValueError(f"Unknown colormap '{colormap}'. Options: {', '.join(COLORMAP_STOPS)}.")
+        if bands and len(bands) != 1:
+            raise ValueError("'colormap' applies to a single band only.")
+
+    resampling = query_params.get('resampling')
+    if resampling and resampling not in RASTER_TILE_RESAMPLING:
+        raise ValueError(f"'resampling' must be one of: {', '.join(RASTER_TILE_RESAMPLING)}.")
+
+    return {'bands': bands, 'rescale': rescale, 'colormap': colormap, 'resampling': resampling}
+
+
+def get_default_bands(band_count: int) -> list:
+    """RGB for three or more bands, the first band otherwise."""
+    return [1, 2, 3] if band_count >= 3 else [1]
+
+
+def get_default_rescale(source, band: int, dtype: str) -> Optional[list]:
+    """
+    Display range of a band when none is requested. 8-bit data is shown as is (None);
+    otherwise the stored 2nd-98th percentiles, then min/max (band statistics or terrain
+    elevation range), or [] to stretch each tile to its own range.
+    """
+    if dtype == 'uint8':
+        return None
+
+    for band_info in getattr(source, 'band_descriptions', None) or []:
+        if band_info.get('index') != band:
+            continue
+        percentiles = band_info.get('percentiles') or {}
+        if percentiles.get('p2') is not None and percentiles.get('p98') is not None \
+                and percentiles['p2'] < percentiles['p98']:
+            return [percentiles['p2'], percentiles['p98']]
+        if band_info.get('min') is not None and band_info.get('max') is not None \
+                and band_info['min'] < band_info['max']:
+            return [band_info['min'], band_info['max']]
+
+    min_elevation = getattr(source, 'min_elevation', None)
+    max_elevation = getattr(source, 'max_elevation', None)
+    if min_elevation is not None and max_elevation is not None and min_elevation < max_elevation:
+        return [min_elevation, max_elevation]
+    return []
+
+
+def _scale_to_bytes(values: np.ndarray, valid: np.ndarray, value_range: Optional[list]) -> np.ndarray:
+    """Linearly stretch one band to 0-255; value_range None keeps 8-bit data as is."""
+    if value_range is None:
+        return values.astype(np.uint8)
+    if not value_range:
+        # No stored statistics: stretch to this tile's own range
+        if not valid.any():
+            return np.zeros(values.shape, dtype=np.uint8)
+        value_range = [float(values[valid].min()), float(values[valid].max())]
+    low, high = value_range
+    span = (high - low) or 1.0
+    scaled = (values.astype(np.float32) - low) * (255.0 / span)
+    return np.clip(scaled, 0, 255).round().astype(np.uint8)
+
+
+def render_raster_tile(source, z: int, x: int, y: int, image_format: str = 'png', bands: Optional[list] = None,
+                       rescale: Optional[list] = None, colormap: Optional[str] = None,
+                       resampling: Optional[str] = None) -> bytes:
+    """
+    Render one XYZ tile of a raster or terrain model straight from its COG.
+
+    The COG is opened over /vsis3/ and warped to EPSG:3857 on a tile-sized WarpedVRT, so
+    GDAL reads only the internal tiles (from the closest overview) the tile covers.
+    Bands are stretched to 8 bits and optionally coloured, and nodata becomes transparent.
+
+    Args:
+        source (RasterLayer | TerrainModel): The raster to render
+        z, x, y (int): Tile address
+        image_format (str): 'png' or 'webp'
+        bands (list, optional): 1 or 3 band indexes (RGB or first band by default)
+        rescale (list, optional): [min, max] pairs, one for all bands or one per band
+        colormap (str, optional): Colour ramp for a single band
+        resampling (str, optional): Warp resampling (RASTER_TILE_RESAMPLING by default)
+
+    Returns:
+        bytes: The encoded tile, empty if the raster does not cover it
+    """
+    tile_size = getattr(settings, 'RASTER_TILE_SIZE', 256)
+    resampling = Resampling[resampling or getattr(settings, 'RASTER_TILE_RESAMPLING', 'bilinear')]
+    minx, miny, maxx, maxy = get_tile_bounds(z, x, y)
+    file_path = get_raster_source_path(source)
+
+    with raster_env_for(file_path), rasterio.open(file_path) as src:
+        if src.crs is None:
+            raise ValueError("Raster has no CRS and cannot be tiled.")
+
+        left, bottom, right, top = transform_bounds('EPSG:3857', src.crs, minx, miny, maxx, maxy)
+        if left >= src.bounds.right or right <= src.bounds.left or \
+                bottom >= src.bounds.top or top <= src.bounds.bottom:
+            return b''
+
+        # A colormap renders the first band unless another is selected
+        bands = bands or ([1] if colormap else get_default_bands(src.count))
+        if any(band > src.count for band in bands):
+            raise ValueError(f"Raster has {src.count} bands.")
+
+        vrt_options = {
+            'crs': 'EPSG:3857',
+            'transform': from_bounds(minx, miny, maxx, maxy, tile_size, tile_size),
+            'width': tile_size,
+            'height': tile_size,
+            'resampling': resampling,
+        }
+        # Without nodata or an alpha band, an alpha band marks the area outside the raster
+        if src.nodata is None and ColorInterp.alpha not in src.colorinterp:
+            vrt_options['add_alpha'] = True
+
+        with WarpedVRT(src, **vrt_options) as vrt:
+            data = vrt.read(indexes=bands)
+            mask = vrt.dataset_mask()
+        dtypes = [src.dtypes[band - 1] for band in bands]
+
+    valid = mask > 0
+    if not valid.any():
+        return b''
+
+    channels = []
+    for position, band in enumerate(bands):
+        if rescale:
+            value_range = rescale[position] if len(rescale) > 1 else rescale[0]
+        else:
+            value_range = get_default_rescale(source, band, dtypes[position])
+        channels.append(_scale_to_bytes(data[position], valid, value_range))
+
+    if len(channels) == 1:
+        if colormap:
+            rgb = get_colormap(colormap)[channels[0]]
+            channels = [rgb[..., 0], rgb[..., 1], rgb[..., 2]]
+        else:
+            channels = channels * 3
+
+    image = Image.fromarray(np.dstack(channels + [np.where(valid, 255, 0).astype(np.uint8)]))
+    pil_format, _ = RASTER_TILE_FORMATS[image_format]
+    buffer = io.BytesIO()
+    if pil_format == 'WEBP':
+        image.save(buffer, format=pil_format, quality=getattr(settings, 'RASTER_TILE_WEBP_QUALITY', 85))
+    else:
+        image.save(buffer, format=pil_format)
+    return buffer.getvalue()
+
+
+def get_statistics_fingerprint(source) -> list:
+    """The stored statistics default rescaling reads, so refreshed statistics change the cache key."""
+    fingerprint = [getattr(source, 'min_elevation', None), getattr(source, 'max_elevation', None)]
+    for band_info in getattr(source, 'band_descriptions', None) or []:
+        percentiles = band_info.get('percentiles') or {}
+        fingerprint.append([band_info.get('index'), percentiles.get('p2'), percentiles.get('p98'),
+                            band_info.get('min'), band_info.get('max')])
+    return fingerprint
+
+
+def get_raster_tile_cache_key(source, z: int, x: int, y: int, image_format: str, params: dict) -> str:
+    """
+    Redis key of a rendered tile. The COG, the rendering options and, when the tile is
+    rescaled from stored statistics, those statistics are hashed in.
+    """
+    variant = {
+        'file': source.cog_s3_file_key,
+        'format': image_format,
+        **params,
+    }
+    if not params.get('rescale'):
+        variant['statistics'] = get_statistics_fingerprint(source)
+    variant = json.dumps(variant, sort_keys=True)
+    digest = hashlib.md5(variant.encode('utf-8')).hexdigest()
+    return f"raster_tile:{source._meta.model_name}:{source.id.hex}:{z}:{x}:{y}:{digest}"
+
+
+def get_cached_raster_tile(source, z: int, x: int, y: int, image_format: str = 'png', **params) -> bytes:
+    """
+    Return a raster tile from Redis, rendering it with render_raster_tile only on a miss.
+    Empty tiles are cached too. Tiles above RASTER_TILE_CACHE_MAX_ZOOM are not cached.
+    """
+    if z > getattr(settings, 'RASTER_TILE_CACHE_MAX_ZOOM', 18):
+        return render_raster_tile(source, z, x, y, image_format, **params)
+
+    cache_key = get_raster_tile_cache_key(source, z, x, y, image_format, params)
+    try:
+        tile = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Raster tile cache read failed for {cache_key}: {e}")
+        tile = None
+
+    if tile is not None:
+        return tile
+
+    tile = render_raster_tile(source, z, x, y, image_format, **params)
+    try:
+        cache.set(cache_key, tile, getattr(settings, 'RASTER_TILE_CACHE_TIMEOUT', 86400))
+    except Exception as e:
+        logger.warning(f"Raster tile cache write failed for {cache_key}: {e}")
+
+    return tile
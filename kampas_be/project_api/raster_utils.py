@@ -11,6 +11,9 @@ from django.conf import settings
 from django.utils import timezone
 from kampas_be.project_api.models import RasterLayer, Project
 from kampas_be.project_api.geoserver_utils import get_geoserver_manager
+from kampas_be.project_api.raster_io_utils import (
+    prepare_cog, compute_raster_statistics, get_vsis3_path, s3_raster_env, is_cloud_optimized, VSIS3_PREFIX
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,21 +33,48 @@ class RasterDataProcessor:
     def process_uploaded_file(self, file_key: str, project: Project, file_name: str,
                             description: str = "", created_by=None) -> RasterLayer:
         """Process an uploaded GeoTIFF file from S3"""
+        # Temp files are removed in the finally block, whether or not processing succeeds
+        local_file_path = publish_file_path = None
         try:
             logger.info(f"Processing raster file from S3: {file_key}")
             
-            # Download file from S3 to temporary location for metadata extraction
-            local_file_path = self._download_from_s3(file_key)
-            if not local_file_path:
-                raise Exception(f"Failed to download file from S3: {file_key}")
+            # Validate and read the header over HTTP range requests before downloading anything
+            remote_metadata = self._extract_remote_metadata(file_key)
+            
+            if remote_metadata and remote_metadata[1]:
+                # Already a COG: GeoServer reads it from S3 ('url') or it is streamed from S3
+                # into the upload or the shared directory, so nothing is downloaded
+                metadata, already_cog = remote_metadata
+                local_file_path = None
+                publish_file_path, cog_file_key = get_vsis3_path(file_key), file_key
+            else:
+                # Download file from S3 to temporary location for COG conversion and publishing
+                local_file_path = self._download_from_s3(file_key)
+                if not local_file_path:
+                    raise Exception(f"Failed to download file from S3: {file_key}")
 
-            # Extract metadata from GeoTIFF
-            try:
-                metadata = self._extract_raster_metadata(local_file_path)
-                logger.info(f"Extracted metadata: CRS={metadata.get('crs')}, Size={metadata.get('width')}x{metadata.get('height')}")
-            except Exception as e:
-                os.remove(local_file_path)
-                raise Exception(f"Failed to extract metadata: {str(e)}")
+                # Extract metadata from GeoTIFF
+                try:
+                    if remote_metadata:
+                        metadata, already_cog = remote_metadata
+                    else:
+                        metadata = self._extract_raster_metadata(local_file_path, with_statistics=False)
+                        already_cog = is_cloud_optimized(local_file_path)
+                    logger.info(f"Extracted metadata: CRS={metadata.get('crs')}, Size={metadata.get('width')}x{metadata.get('height')}")
+                except Exception as e:
+                    raise Exception(f"Failed to extract metadata: {str(e)}")
+
+                # Rewrite the upload as a COG next to the original and publish that instead
+                if already_cog:
+                    publish_file_path, cog_file_key = local_file_path, file_key
+                else:
+                    publish_file_path, cog_file_key = prepare_cog(self.s3_client, local_file_path, file_key)
+            
+            # Band statistics stream over the blocks of the local (COG) copy. Streaming every
+            # block of a remote file would undo the skipped download, so a /vsis3/ path gets
+            # overview-based statistics now and exact ones from a background task
+            remote_statistics = publish_file_path.startswith(VSIS3_PREFIX)
+            self._add_band_statistics(metadata, publish_file_path, approximate=True if remote_statistics else None)
 
             # Create raster layer entry (store only S3 key, not the file)
             # Create raster layer with temporary name first to get the ID
@@ -53,6 +83,7 @@ class RasterDataProcessor:
                 file_name="temp_raster",  # Temporary name
                 description=description,
                 s3_file_key=file_key,
+                cog_s3_file_key=cog_file_key,
                 uploaded_by=created_by,
                 crs=metadata.get('crs'),
                 bounding_box=metadata.get('bounding_box'),
@@ -82,10 +113,11 @@ class RasterDataProcessor:
             logger.info(f"Created raster layer with unique name: {unique_name} (original: {file_name})")
 
             # Publish to GeoServer and add to layer group
-            self._create_and_publish_layer(temp_raster_layer, local_file_path)
+            self._create_and_publish_layer(temp_raster_layer, publish_file_path)
 
-            # Clean up temp file
-            os.remove(local_file_path)
+            if remote_statistics and not getattr(settings, 'RASTER_STATS_APPROXIMATE', False):
+                from kampas_be.project_api.tasks import refresh_raster_statistics_task
+                refresh_raster_statistics_task.delay(str(temp_raster_layer.id))
 
             return temp_raster_layer
 
@@ -93,6 +125,12 @@ class RasterDataProcessor:
             logger.error(f"Error processing raster file: {str(e)}")
             raise
 
+        finally:
+            # Clean up the download and the converted COG (a /vsis3/ publish path has none)
+            for temp_path in {local_file_path, publish_file_path}:
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
     def _download_from_s3(self, file_key: str) -> Optional[str]:
         """Download file from S3 to a temporary location for processing"""
         try:
@@ -115,8 +153,43 @@ class RasterDataProcessor:
                 os.remove(temp_file_path)
             return None
 
-    def _extract_raster_metadata(self, file_path: str) -> Dict[str, Any]:
-        """Extract metadata from a GeoTIFF file"""
+    def _extract_remote_metadata(self, file_key: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Read metadata from the S3 object through /vsis3/ without downloading it.
+        
+        Returns:
+            tuple: (metadata without band statistics, whether the file is already a COG),
+                or None when the object cannot be read remotely
+        """
+        remote_path = get_vsis3_path(file_key)
+        try:
+            with s3_raster_env():
+                metadata = self._extract_raster_metadata(remote_path, with_statistics=False)
+                return metadata, is_cloud_optimized(remote_path)
+        except Exception as e:
+            logger.warning(f"Could not read {file_key} through /vsis3/, falling back to a download: {e}")
+            return None
+
+    def _add_band_statistics(self, metadata: Dict[str, Any], file_path: str, approximate: Optional[bool] = None):
+        """Merge band statistics computed from file_path into the metadata's band descriptions"""
+        band_statistics = compute_raster_statistics(file_path, approximate=approximate)
+        for band_info in metadata.get('band_descriptions') or []:
+            stats = band_statistics.get(band_info['index'])
+            if stats:
+                band_info.pop('approximate', None)
+                band_info.update(stats)
+
+    def refresh_band_statistics(self, raster_layer: RasterLayer) -> RasterLayer:
+        """Replace a layer's band statistics with exact ones streamed from its COG over /vsis3/"""
+        file_path = get_vsis3_path(raster_layer.cog_s3_file_key or raster_layer.s3_file_key)
+        metadata = {'band_descriptions': raster_layer.band_descriptions or []}
+        self._add_band_statistics(metadata, file_path, approximate=False)
+        raster_layer.band_descriptions = metadata['band_descriptions']
+        raster_layer.save(update_fields=['band_descriptions'])
+        return raster_layer
+
+    def _extract_raster_metadata(self, file_path: str, with_statistics: bool = True) -> Dict[str, Any]:
+        """Extract metadata from a GeoTIFF file (local path or GDAL virtual path)"""
         with rasterio.open(file_path) as dataset:
             # Get CRS
             crs = None
@@ -145,25 +218,17 @@ class RasterDataProcessor:
 
             # Get band information
             band_count = dataset.count
+            # Streamed over block windows (or read from overviews), one thread per band
+            band_statistics = compute_raster_statistics(file_path) if with_statistics else {}
             band_descriptions = []
             for i in range(1, band_count + 1):
                 try:
-                    band = dataset.read(i, masked=True)
                     band_info = {
                         'index': i,
-                        'dtype': str(band.dtype),
+                        'dtype': dataset.dtypes[i - 1],
                         'nodata': dataset.nodata
                     }
-
-                    # Get basic statistics if possible
-                    if not band.mask.all():
-                        valid_data = band.compressed()
-                        if len(valid_data) > 0:
-                            band_info.update({
-                                'min': float(valid_data.min()),
-                                'max': float(valid_data.max()),
-                                'mean': float(valid_data.mean())
-                            })
+                    band_info.update(band_statistics.get(i, {}))
 
                     # Try to get band description
                     desc = dataset.descriptions[i-1] if dataset.descriptions and i-1 < len(dataset.descriptions) else None
@@ -209,6 +274,11 @@ class RasterDataProcessor:
             
             logger.info(f"Using consistent naming: layer={layer_name}, store={store_name}")
 
+            # Register the file where it lies instead of uploading it when a reference mode is configured
+            reference = self.geoserver_manager.get_raster_reference(
+                workspace, layer_name, file_path=local_file_path, cog_s3_file_key=raster_layer.cog_s3_file_key
+            )
+
             # Publish to GeoServer with retry logic
             max_retries = 3
             retry_count = 0
@@ -219,7 +289,8 @@ class RasterDataProcessor:
                         store_name=store_name,
                         layer_name=layer_name,
                         file_path=local_file_path,
-                        title=raster_layer.file_name
+                        title=raster_layer.file_name,
+                        reference=reference
                     )
 
                     if success:
@@ -303,7 +374,8 @@ class RasterDataProcessor:
         try:
             if raster_layer.is_published and raster_layer.geoserver_layer_name:
                 workspace = raster_layer.project.company.id
-                store_name = f"raster_store_{raster_layer.id.hex}"
+                # Layers are published with the same name for store and layer
+                store_name = raster_layer.geoserver_layer_name
 
                 success = self.geoserver_manager.delete_raster_layer(
                     workspace=workspace,
@@ -328,18 +400,26 @@ class RasterDataProcessor:
     def republish_layer(self, raster_layer: RasterLayer):
         """Republish an existing raster layer to GeoServer"""
         try:
-            if not raster_layer.s3_file_key:
+            file_key = raster_layer.cog_s3_file_key or raster_layer.s3_file_key
+            if not file_key:
                 logger.error(f"No S3 file key found for raster layer {raster_layer.id}")
                 return False
 
-            local_file_path = self._download_from_s3(raster_layer.s3_file_key)
+            if raster_layer.cog_s3_file_key:
+                # The COG is published from S3 without a download
+                self._create_and_publish_layer(raster_layer, get_vsis3_path(raster_layer.cog_s3_file_key))
+                return raster_layer.is_published
+
+            local_file_path = self._download_from_s3(file_key)
             if not local_file_path:
-                logger.error(f"Failed to download file from S3 for republishing: {raster_layer.s3_file_key}")
+                logger.error(f"Failed to download file from S3 for republishing: {file_key}")
                 return False
 
             self._create_and_publish_layer(raster_layer, local_file_path)
 
-            os.remove(local_file_path)
+            # 'external' mode moves the file into the shared directory
+            if os.path.exists(local_file_path):
+                os.remove(local_file_path)
             return raster_layer.is_published
 
         except Exception as e:
@@ -186,11 +186,11 @@ class VectorLayerSerializer(serializers.ModelSerializer):
             'created_by', 'created_by_name', 'description', 'crs',
             'geoserver_layer_name', 'geoserver_url', 'is_published',
             's3_file_key', 'feature_count', 'created_at', 'updated_at', 
-            'group_tags', 'is_active'
+            'group_tags', 'is_active', 'ingest_report'
         ]
         read_only_fields = [
             'id', 'created_at', 'updated_at', 'feature_count', 
-            'geoserver_layer_name', 'geoserver_url', 'is_published'
+            'geoserver_layer_name', 'geoserver_url', 'is_published', 'ingest_report'
         ]
 
     def get_created_by_name(self, obj):
@@ -240,10 +240,11 @@ class LayerUploadSerializer(serializers.Serializer):
     
     def validate_file_key(self, value):
         """Validate file extension"""
-        allowed_extensions = ['.geojson', '.zip']
+        allowed_extensions = ['.geojson', '.zip', '.gpkg', '.fgb', '.kml']
         if not any(value.lower().endswith(ext) for ext in allowed_extensions):
             raise serializers.ValidationError(
-                "Only GeoJSON (.geojson) and Shapefile ZIP (.zip) files are supported."
+                "Only GeoJSON (.geojson), Shapefile ZIP (.zip), GeoPackage (.gpkg), "
+                "FlatGeobuf (.fgb) and KML (.kml) files are supported."
             )
         return value
     
@@ -285,7 +286,7 @@ class VectorFeatureSerializer(GeoFeatureModelSerializer):
     class Meta:
         model = VectorFeature
         geo_field = 'geom'  # Changed from 'geometry' to 'geom' to match your model
-        fields = '__all__'
+        exclude = VectorFeature.LOD_FIELDS
 
 class RasterGroupTagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -301,7 +302,7 @@ class RasterLayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = RasterLayer
         fields = [
-            'id', 'project', 'file_name', 'description', 's3_file_key', 's3_url',
+            'id', 'project', 'file_name', 'description', 's3_file_key', 'cog_s3_file_key', 's3_url',
             'uploaded_by', 'uploaded_by_name', 'uploaded_at', 'crs', 'bounding_box',
             'pixel_size', 'width', 'height', 'band_count', 'band_descriptions',
             'geoserver_layer_name', 'geoserver_url', 'is_published', 'group_tag',
@@ -310,7 +311,7 @@ class RasterLayerSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'uploaded_at', 'crs', 'bounding_box', 'pixel_size', 'width',
             'height', 'band_count', 'band_descriptions', 'geoserver_layer_name',
-            'geoserver_url', 'is_published', 's3_url'
+            'geoserver_url', 'is_published', 's3_url', 'cog_s3_file_key'
         ]
     
     def get_uploaded_by_name(self, obj):
@@ -511,7 +512,7 @@ class TerrainModelSerializer(serializers.ModelSerializer):
         model = TerrainModel
         fields = [
             'id', 'project', 'file_name', 'terrain_type', 'file_type', 'description',
-            's3_file_key', 's3_url', 'uploaded_by', 'uploaded_by_name', 'uploaded_at',
+            's3_file_key', 'cog_s3_file_key', 's3_url', 'uploaded_by', 'uploaded_by_name', 'uploaded_at',
             'crs', 'bounding_box', 'pixel_size', 'width', 'height', 'min_elevation',
             'max_elevation', 'elevation_unit', 'geoserver_layer_name', 'geoserver_url',
             'is_published', 'group_tag', 'is_active', 'deleted_at', 'project_name',
@@ -520,7 +521,7 @@ class TerrainModelSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'uploaded_at', 'crs', 'bounding_box', 'pixel_size', 'width',
             'height', 'min_elevation', 'max_elevation', 'geoserver_layer_name',
-            'geoserver_url', 'is_published', 's3_url'
+            'geoserver_url', 'is_published', 's3_url', 'cog_s3_file_key'
         ]
 
     def get_uploaded_by_name(self, obj):
@@ -990,6 +990,7 @@ def process_vector_layer(self, file_key, project_id, layer_name, created_by_id,
                 "is_published": vector_layer.is_published,
                 "geoserver_url": vector_layer.geoserver_url,
                 "feature_count": vector_layer.feature_count,
+                "ingest_report": vector_layer.ingest_report,
                 "task_id": self.request.id
             }
         else:
@@ -1098,6 +1099,7 @@ def process_raster_layer(self, file_key, project_id, file_name, description=None
                 "is_published": raster_layer.is_published,
                 "geoserver_url": raster_layer.geoserver_url or '',
                 "s3_file_key": raster_layer.s3_file_key,
+                "cog_s3_file_key": raster_layer.cog_s3_file_key,
                 "task_id": self.request.id
             }
         else:
@@ -1388,6 +1390,7 @@ def process_terrain_layer(self, file_key, project_id, file_name, terrain_type='D
                 "is_published": terrain_model.is_published,
                 "geoserver_url": terrain_model.geoserver_url or '',
                 "s3_file_key": terrain_model.s3_file_key,
+                "cog_s3_file_key": terrain_model.cog_s3_file_key,
                 "task_id": self.request.id
             }
         else:
@@ -1505,3 +1508,379 @@ def create_terrain_model_from_task(project, user, s3_key, original_filename, sta
         })
         logger.error(f"❌ Terrain model creation error: {e}")
         return False
+
+
+@shared_task(bind=True, max_retries=3)
+def delete_stale_vector_tiles(self, layer_id, version):
+    """
+    Remove the S3 tile pyramid of a superseded layer tile version.
+    
+    Args:
+        layer_id (str): UUID of the vector layer.
+        version (int): Tile version that is no longer served.
+        
+    Returns:
+        dict: Dictionary with cleanup results.
+    """
+    from kampas_be.project_api.tile_utils import delete_tile_prefix, get_tile_s3_prefix
+    import uuid
+    
+    try:
+        deleted = delete_tile_prefix(get_tile_s3_prefix(uuid.UUID(layer_id), version))
+        logger.info(f"Deleted {deleted} stale tiles of layer {layer_id} version {version}")
+        return {
+            "status": "success",
+            "deleted_tiles": deleted,
+            "task_id": self.request.id
+        }
+    except Exception as e:
+        logger.exception(f"Error deleting stale tiles of layer {layer_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
+def _vector_layer_task_result(task, layer, message):
+    """Success payload shared by the vector layer merge/split tasks."""
+    return {
+        "status": "success",
+        "message": message,
+        "vector_layer_id": str(layer.id),
+        "layer_name": layer.name,
+        "title": layer.title,
+        "geometry_type": layer.geometry_type,
+        "is_published": layer.is_published,
+        "geoserver_url": layer.geoserver_url,
+        "feature_count": layer.feature_count,
+        "task_id": task.request.id
+    }
+
+
+@shared_task(bind=True)
+def merge_vector_layers_task(self, layer1_id, layer2_id, new_layer_name, created_by_id, description=None):
+    """
+    Celery task to merge two vector layers into a new layer inside PostgreSQL.
+    
+    Args:
+        layer1_id (str): UUID of the first layer.
+        layer2_id (str): UUID of the second layer.
+        new_layer_name (str): Display name for the merged layer.
+        created_by_id (str): ID of the user requesting the merge.
+        description (str, optional): Description for the merged layer.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    from kampas_be.project_api.vector_layer_utils import merge_vector_layers
+    
+    def report_progress(percent, message):
+        self.update_state(state='PROGRESS', meta={'progress': percent, 'message': message})
+    
+    try:
+        created_by = User.objects.get(id=created_by_id)
+        merged_layer = merge_vector_layers(
+            layer1_id=layer1_id,
+            layer2_id=layer2_id,
+            new_layer_name=new_layer_name,
+            created_by=created_by,
+            description=description,
+            progress_callback=report_progress
+        )
+        logger.info(f"Merged layers {layer1_id} and {layer2_id} into {merged_layer.id}")
+        return _vector_layer_task_result(self, merged_layer, 'Vector layers merged successfully.')
+        
+    except Exception as e:
+        logger.exception(f"Error in merge_vector_layers_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error merging layers: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def split_vector_layer_task(self, layer_id, attribute_key, attribute_value, new_layer_name, created_by_id, description=None):
+    """
+    Celery task to split features matching an attribute value into a new layer inside PostgreSQL.
+    
+    Args:
+        layer_id (str): UUID of the layer to split.
+        attribute_key (str): Attribute key to match.
+        attribute_value: Attribute value to match.
+        new_layer_name (str): Display name for the new layer.
+        created_by_id (str): ID of the user requesting the split.
+        description (str, optional): Description for the new layer.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    from kampas_be.project_api.vector_layer_utils import split_layer_by_attribute
+    
+    def report_progress(percent, message):
+        self.update_state(state='PROGRESS', meta={'progress': percent, 'message': message})
+    
+    try:
+        created_by = User.objects.get(id=created_by_id)
+        split_layer = split_layer_by_attribute(
+            layer_id=layer_id,
+            attribute_key=attribute_key,
+            attribute_value=attribute_value,
+            new_layer_name=new_layer_name,
+            created_by=created_by,
+            description=description,
+            progress_callback=report_progress
+        )
+        logger.info(f"Split layer {layer_id} on {attribute_key}={attribute_value} into {split_layer.id}")
+        return _vector_layer_task_result(self, split_layer, 'Vector layer split successfully.')
+        
+    except Exception as e:
+        logger.exception(f"Error in split_vector_layer_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error splitting layer: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def split_vector_layer_multi_task(self, layer_id, mode, created_by_id, attribute_key=None, cell_size=None,
+                                  polygon_layer_id=None, name_attribute=None, name_prefix=None, description=None):
+    """
+    Celery task to split a layer into one new layer per attribute value, grid cell or polygon.
+    
+    Args:
+        layer_id (str): UUID of the layer to split.
+        mode (str): 'distinct', 'grid' or 'polygons'.
+        created_by_id (str): ID of the user requesting the split.
+        attribute_key (str, optional): Attribute to split on ('distinct' mode).
+        cell_size (float, optional): Grid cell size in degrees ('grid' mode).
+        polygon_layer_id (str, optional): UUID of the polygon layer ('polygons' mode).
+        name_attribute (str, optional): Polygon attribute used to title the new layers.
+        name_prefix (str, optional): Prefix for the new layer titles.
+        description (str, optional): Description for the new layers.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    from kampas_be.project_api.vector_layer_utils import split_layer_into_many
+    
+    def report_progress(percent, message):
+        self.update_state(state='PROGRESS', meta={'progress': percent, 'message': message})
+    
+    try:
+        created_by = User.objects.get(id=created_by_id)
+        split_layers = split_layer_into_many(
+            layer_id=layer_id,
+            mode=mode,
+            created_by=created_by,
+            attribute_key=attribute_key,
+            cell_size=cell_size,
+            polygon_layer_id=polygon_layer_id,
+            name_attribute=name_attribute,
+            name_prefix=name_prefix,
+            description=description,
+            progress_callback=report_progress
+        )
+        logger.info(f"Split layer {layer_id} ({mode}) into {len(split_layers)} layers")
+        return {
+            "status": "success",
+            "message": f"Vector layer split into {len(split_layers)} layers.",
+            "layers": [
+                {
+                    "vector_layer_id": str(layer.id),
+                    "layer_name": layer.name,
+                    "title": layer.title,
+                    "is_published": layer.is_published,
+                    "geoserver_url": layer.geoserver_url,
+                    "feature_count": layer.feature_count
+                }
+                for layer in split_layers
+            ],
+            "task_id": self.request.id
+        }
+        
+    except Exception as e:
+        logger.exception(f"Error in split_vector_layer_multi_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error splitting layer: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def create_attribute_index_task(self, layer_id, attribute_key):
+    """
+    Celery task to build an expression index on one frequently filtered attribute of a layer.
+    
+    Args:
+        layer_id (str): UUID of the vector layer.
+        attribute_key (str): Attribute key to index.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    from kampas_be.project_api.attribute_index_utils import create_attribute_index
+    
+    try:
+        layer = VectorLayer.objects.get(id=layer_id, is_active=True)
+        index_name = create_attribute_index(layer, attribute_key)
+        return {
+            "status": "success",
+            "message": f"Index {index_name} created on attribute '{attribute_key}'.",
+            "index_name": index_name,
+            "task_id": self.request.id
+        }
+        
+    except Exception as e:
+        logger.exception(f"Error in create_attribute_index_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error creating attribute index: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def refresh_attribute_catalog_task(self, layer_id):
+    """
+    Celery task to rebuild a vector layer's attribute catalog after feature edits.
+    
+    Args:
+        layer_id (str): UUID of the vector layer.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    from kampas_be.project_api.attribute_catalog_utils import build_attribute_catalog
+    
+    try:
+        layer = VectorLayer.objects.get(id=layer_id, is_active=True)
+        catalog = build_attribute_catalog(layer)
+        return {
+            "status": "success",
+            "message": f"Attribute catalog rebuilt with {len(catalog['attributes'])} attributes.",
+            "task_id": self.request.id
+        }
+        
+    except Exception as e:
+        logger.exception(f"Error in refresh_attribute_catalog_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error rebuilding attribute catalog: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def run_spatial_analysis_task(self, operation, layer_id, created_by_id, new_layer_name=None, overlay_layer_id=None,
+                              distance=None, dissolve_key=None, predicate='intersects', keep_unmatched=True,
+                              description=None):
+    """
+    Celery task to run a buffer, clip, intersection, dissolve or spatial join inside PostGIS
+    and publish the result as a new vector layer.
+    
+    Args:
+        operation (str): Analysis operation.
+        layer_id (str): UUID of the input layer.
+        created_by_id (str): ID of the user requesting the analysis.
+        new_layer_name (str, optional): Display name for the result layer.
+        overlay_layer_id (str, optional): UUID of the overlay layer.
+        distance (float, optional): Buffer distance in metres.
+        dissolve_key (str, optional): Attribute to dissolve by.
+        predicate (str): Spatial join predicate.
+        keep_unmatched (bool): Keep input features without a spatial join match.
+        description (str, optional): Description for the result layer.
+        
+    Returns:
+        dict: Dictionary with processing results and step timings.
+    """
+    from kampas_be.project_api.analysis_utils import run_spatial_analysis
+    
+    def report_progress(percent, message):
+        self.update_state(state='PROGRESS', meta={'progress': percent, 'message': message, 'operation': operation})
+    
+    try:
+        created_by = User.objects.get(id=created_by_id)
+        result_layer, timings = run_spatial_analysis(
+            operation=operation,
+            layer_id=layer_id,
+            created_by=created_by,
+            new_layer_name=new_layer_name,
+            overlay_layer_id=overlay_layer_id,
+            distance=distance,
+            dissolve_key=dissolve_key,
+            predicate=predicate,
+            keep_unmatched=keep_unmatched,
+            description=description,
+            progress_callback=report_progress
+        )
+        logger.info(f"{operation} of layer {layer_id} finished in {timings['total']}s: {timings}")
+        result = _vector_layer_task_result(self, result_layer, f'Spatial analysis ({operation}) completed.')
+        result.update({"operation": operation, "timings": timings})
+        return result
+        
+    except Exception as e:
+        logger.exception(f"Error in run_spatial_analysis_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error running {operation}: {str(e)}",
+            "operation": operation,
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def refresh_raster_statistics_task(self, layer_id):
+    """
+    Celery task to compute exact band statistics for a raster layer published without a download.
+    
+    Args:
+        layer_id (str): UUID of the raster layer.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    try:
+        raster_layer = RasterLayer.objects.get(id=layer_id)
+        RasterDataProcessor().refresh_band_statistics(raster_layer)
+        return {
+            "status": "success",
+            "message": f"Band statistics updated for raster layer {raster_layer.file_name}.",
+            "task_id": self.request.id
+        }
+        
+    except Exception as e:
+        logger.exception(f"Error in refresh_raster_statistics_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error computing band statistics: {str(e)}",
+            "task_id": self.request.id
+        }
+
+
+@shared_task(bind=True)
+def refresh_terrain_statistics_task(self, model_id):
+    """
+    Celery task to compute the exact elevation range of a terrain model published without a download.
+    
+    Args:
+        model_id (str): UUID of the terrain model.
+        
+    Returns:
+        dict: Dictionary with processing results.
+    """
+    try:
+        terrain_model = TerrainModel.objects.get(id=model_id)
+        TerrainDataProcessor().refresh_elevation_range(terrain_model)
+        return {
+            "status": "success",
+            "message": f"Elevation range updated for terrain model {terrain_model.file_name}.",
+            "task_id": self.request.id
+        }
+        
+    except Exception as e:
+        logger.exception(f"Error in refresh_terrain_statistics_task: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error computing elevation range: {str(e)}",
+            "task_id": self.request.id
+        }
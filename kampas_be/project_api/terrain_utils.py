@@ -13,6 +13,9 @@ from django.utils import timezone
 
 from kampas_be.project_api.models import TerrainModel, Project
 from kampas_be.project_api.geoserver_utils import get_geoserver_manager
+from kampas_be.project_api.raster_io_utils import (
+    prepare_cog, compute_raster_statistics, get_vsis3_path, s3_raster_env, is_cloud_optimized, VSIS3_PREFIX
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,24 +35,50 @@ class TerrainDataProcessor:
     def process_uploaded_file(self, file_key: str, project: Project, file_name: str,
                             terrain_type: str = 'DEM', description: str = "", created_by=None) -> TerrainModel:
         """Process an uploaded terrain file from S3"""
+        # Temp files are removed in the finally block, whether or not processing succeeds
+        local_file_path = publish_file_path = None
         try:
             logger.info(f"Processing terrain file from S3: {file_key}")
 
-            # Download file from S3 to temporary location for metadata extraction
-            local_file_path = self._download_from_s3(file_key)
-            if not local_file_path:
-                raise Exception(f"Failed to download file from S3: {file_key}")
+            # Validate and read the header over HTTP range requests before downloading anything
+            remote_metadata = self._extract_remote_metadata(file_key)
 
-            # Extract metadata and validate as terrain data
-            try:
-                metadata = self._extract_terrain_metadata(local_file_path)
-                if not self._is_elevation_data(local_file_path):
-                    logger.warning(f"File {file_key} may not contain elevation data")
+            if remote_metadata and remote_metadata[1]:
+                # Already a COG: GeoServer reads it from S3 ('url') or it is streamed from S3
+                # into the upload or the shared directory, so nothing is downloaded
+                metadata, already_cog = remote_metadata
+                local_file_path = None
+                publish_file_path, cog_file_key = get_vsis3_path(file_key), file_key
+            else:
+                # Download file from S3 to temporary location for COG conversion and publishing
+                local_file_path = self._download_from_s3(file_key)
+                if not local_file_path:
+                    raise Exception(f"Failed to download file from S3: {file_key}")
+
+                # Extract metadata and validate as terrain data
+                try:
+                    if remote_metadata:
+                        metadata, already_cog = remote_metadata
+                    else:
+                        metadata = self._extract_terrain_metadata(local_file_path, with_statistics=False)
+                        if not self._is_elevation_data(local_file_path):
+                            logger.warning(f"File {file_key} may not contain elevation data")
+                        already_cog = is_cloud_optimized(local_file_path)
                 
-                logger.info(f"Extracted metadata: CRS={metadata.get('crs')}, Size={metadata.get('width')}x{metadata.get('height')}")
-            except Exception as e:
-                os.remove(local_file_path)
-                raise Exception(f"Failed to extract terrain metadata: {str(e)}")
+                    logger.info(f"Extracted metadata: CRS={metadata.get('crs')}, Size={metadata.get('width')}x{metadata.get('height')}")
+                except Exception as e:
+                    raise Exception(f"Failed to extract terrain metadata: {str(e)}")
+
+                # Rewrite the upload as a COG next to the original and publish that instead
+                if already_cog:
+                    publish_file_path, cog_file_key = local_file_path, file_key
+                else:
+                    publish_file_path, cog_file_key = prepare_cog(self.s3_client, local_file_path, file_key)
+
+            # Elevation range streams over the blocks of the local (COG) copy. A /vsis3/ path
+            # gets an overview-based range now and the exact one from a background task
+            remote_statistics = publish_file_path.startswith(VSIS3_PREFIX)
+            metadata.update(self._compute_elevation_range(publish_file_path, approximate=True if remote_statistics else None))
 
             # Determine file type from extension
             file_extension = os.path.splitext(file_key)[1].lower().lstrip('.')
@@ -64,6 +93,7 @@ class TerrainDataProcessor:
                 file_type=file_extension,
                 description=description,
                 s3_file_key=file_key,
+                cog_s3_file_key=cog_file_key,
                 uploaded_by=created_by,
                 crs=metadata.get('crs'),
                 bounding_box=metadata.get('bounding_box'),
@@ -93,10 +123,11 @@ class TerrainDataProcessor:
             logger.info(f"Created terrain model with unique name: {unique_name} (original: {file_name})")
 
             # Publish to GeoServer and add to layer group
-            self._create_and_publish_layer(temp_terrain_model, local_file_path)
+            self._create_and_publish_layer(temp_terrain_model, publish_file_path)
 
-            # Clean up temp file
-            os.remove(local_file_path)
+            if remote_statistics and not getattr(settings, 'RASTER_STATS_APPROXIMATE', False):
+                from kampas_be.project_api.tasks import refresh_terrain_statistics_task
+                refresh_terrain_statistics_task.delay(str(temp_terrain_model.id))
 
             return temp_terrain_model
 
@@ -104,6 +135,12 @@ class TerrainDataProcessor:
             logger.error(f"Error processing terrain file: {str(e)}")
             raise
 
+        finally:
+            # Clean up the download and the converted COG (a /vsis3/ publish path has none)
+            for temp_path in {local_file_path, publish_file_path}:
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
     def _download_from_s3(self, file_key: str) -> Optional[str]:
         """Download file from S3 to a temporary location for processing"""
         try:
@@ -126,8 +163,49 @@ class TerrainDataProcessor:
                 os.remove(temp_file_path)
             return None
 
-    def _extract_terrain_metadata(self, file_path: str) -> Dict[str, Any]:
-        """Extract metadata from a terrain file"""
+    def _extract_remote_metadata(self, file_key: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Read metadata and validate the S3 object through /vsis3/ without downloading it.
+        
+        Returns:
+            tuple: (metadata without elevation statistics, whether the file is already a COG),
+                or None when the object cannot be read remotely
+        """
+        remote_path = get_vsis3_path(file_key)
+        try:
+            with s3_raster_env():
+                metadata = self._extract_terrain_metadata(remote_path, with_statistics=False)
+                if not self._is_elevation_data(remote_path):
+                    logger.warning(f"File {file_key} may not contain elevation data")
+                return metadata, is_cloud_optimized(remote_path)
+        except Exception as e:
+            logger.warning(f"Could not read {file_key} through /vsis3/, falling back to a download: {e}")
+            return None
+
+    def _compute_elevation_range(self, file_path: str, approximate: Optional[bool] = None) -> Dict[str, Any]:
+        """Min and max elevation of band 1, streamed block by block (or read from overviews)"""
+        try:
+            elevation_stats = compute_raster_statistics(file_path, bands=[1], approximate=approximate).get(1, {})
+            return {
+                'min_elevation': elevation_stats.get('min'),
+                'max_elevation': elevation_stats.get('max')
+            }
+        except Exception as e:
+            logger.warning(f"Could not compute elevation statistics: {str(e)}")
+            return {}
+
+    def refresh_elevation_range(self, terrain_model: TerrainModel) -> TerrainModel:
+        """Replace a terrain model's elevation range with the exact one streamed from its COG over /vsis3/"""
+        file_path = get_vsis3_path(terrain_model.cog_s3_file_key or terrain_model.s3_file_key)
+        elevation_range = self._compute_elevation_range(file_path, approximate=False)
+        if elevation_range.get('min_elevation') is not None:
+            terrain_model.min_elevation = elevation_range['min_elevation']
+            terrain_model.max_elevation = elevation_range['max_elevation']
+            terrain_model.save(update_fields=['min_elevation', 'max_elevation'])
+        return terrain_model
+
+    def _extract_terrain_metadata(self, file_path: str, with_statistics: bool = True) -> Dict[str, Any]:
+        """Extract metadata from a terrain file (local path or GDAL virtual path)"""
         with rasterio.open(file_path) as dataset:
             # Get CRS
             crs = None
@@ -155,19 +233,9 @@ class TerrainDataProcessor:
             height = dataset.height
 
             # Get elevation statistics
-            min_elevation = None
-            max_elevation = None
-
-            try:
-                # Read the first band for elevation data
-                band = dataset.read(1, masked=True)
-                if not band.mask.all():
-                    valid_data = band.compressed()
-                    if len(valid_data) > 0:
-                        min_elevation = float(valid_data.min())
-                        max_elevation = float(valid_data.max())
-            except Exception as e:
-                logger.warning(f"Could not compute elevation statistics: {str(e)}")
+            elevation_range = self._compute_elevation_range(file_path) if with_statistics else {}
+            min_elevation = elevation_range.get('min_elevation')
+            max_elevation = elevation_range.get('max_elevation')
 
             return {
                 'crs': crs,
@@ -226,6 +294,11 @@ class TerrainDataProcessor:
 
             workspace = company_id
 
+            # Register the file where it lies instead of uploading it when a reference mode is configured
+            reference = self.geoserver_manager.get_raster_reference(
+                workspace, layer_name, file_path=local_file_path, cog_s3_file_key=terrain_model.cog_s3_file_key
+            )
+
             # Publish to GeoServer
             success, message = self.geoserver_manager.publish_terrain_layer(
                 workspace=workspace,
@@ -233,7 +306,8 @@ class TerrainDataProcessor:
                 layer_name=layer_name,
                 file_path=local_file_path,
                 terrain_type=terrain_model.terrain_type,
-                title=terrain_model.file_name
+                title=terrain_model.file_name,
+                reference=reference
             )
 
             if success:
@@ -284,3 +358,31 @@ class TerrainDataProcessor:
 
         except Exception as e:
             logger.warning(f"Error adding terrain layer to group: {e}")
+
+    def delete_layer_from_geoserver(self, terrain_model: TerrainModel):
+        """Delete terrain layer from GeoServer"""
+        try:
+            if terrain_model.is_published and terrain_model.geoserver_layer_name:
+                workspace = terrain_model.project.company.id
+                # Terrain models are published with the same name for store and layer
+                store_name = terrain_model.geoserver_layer_name
+
+                success = self.geoserver_manager.delete_terrain_layer(
+                    workspace=workspace,
+                    store_name=store_name,
+                    layer_name=terrain_model.geoserver_layer_name
+                )
+
+                if success:
+                    logger.info(f"Successfully deleted terrain layer {terrain_model.geoserver_layer_name} from GeoServer")
+                    return True
+                else:
+                    logger.error(f"Failed to delete terrain layer {terrain_model.geoserver_layer_name} from GeoServer")
+                    return False
+            else:
+                logger.info(f"Terrain model {terrain_model.file_name} is not published in GeoServer")
+                return True
+
+        except Exception as e:
+            logger.error(f"Error deleting terrain layer from GeoServer: {e}")
+            return False
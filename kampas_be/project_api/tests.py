@@ -1,3 +1,321 @@
-from django.test import TestCase
+import uuid
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.gis.geos import Point, Polygon
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from kampas_be.auth_app.models import CustomUser
+from kampas_be.company_api.models import Company, Client
+from kampas_be.project_api.layer_metadata_utils import union_extents
+from kampas_be.project_api.models import Project, VectorLayer, VectorFeature
+from kampas_be.project_api.raster_io_utils import BandStatistics
+from kampas_be.project_api.tile_utils import is_valid_tile, get_simplify_tolerance, parse_tile_fields
+from kampas_be.project_api.vector_layer_utils import apply_feature_batch
+from kampas_be.project_api.vector_utils import VectorDataProcessor
+from kampas_be.project_api.views import FeatureCursorPagination
+
+
+def square(x, y, size=1):
+    """GeoJSON polygon of an axis-aligned square."""
+    return {
+        'type': 'Polygon',
+        'coordinates': [[[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]],
+    }
+
+
+class UnionExtentsTests(SimpleTestCase):
+    def test_covers_all_extents(self):
+        self.assertEqual(union_extents([(0, 0, 1, 1), (-2, 0.5, 0.5, 3)]), (-2, 0, 1, 3))
+
+    def test_skips_missing_extents(self):
+        self.assertEqual(union_extents([None, (1, 2, 3, 4), ()]), (1, 2, 3, 4))
+
+    def test_returns_none_without_extents(self):
+        self.assertIsNone(union_extents([]))
+        self.assertIsNone(union_extents(None))
+        self.assertIsNone(union_extents([None]))
+
+
+class TileUtilsTests(SimpleTestCase):
+    def test_valid_tile_bounds(self):
+        self.assertTrue(is_valid_tile(0, 0, 0))
+        self.assertTrue(is_valid_tile(3, 7, 7))
+        self.assertFalse(is_valid_tile(3, 8, 0))
+        self.assertFalse(is_valid_tile(3, 0, -1))
+        self.assertFalse(is_valid_tile(-1, 0, 0))
+        self.assertFalse(is_valid_tile(25, 0, 0))
+
+    def test_simplify_tolerance_halves_per_zoom(self):
+        self.assertAlmostEqual(get_simplify_tolerance(10, 4096), get_simplify_tolerance(9, 4096) / 2)
+
+    def test_parse_tile_fields(self):
+        self.assertIsNone(parse_tile_fields(None))
+        self.assertEqual(parse_tile_fields(''), [])
+        self.assertEqual(parse_tile_fields('name, type,,'), ['name', 'type'])
+
+
+class FeatureCursorTests(SimpleTestCase):
+    def setUp(self):
+        self.pagination = FeatureCursorPagination()
+        self.feature = SimpleNamespace(created_at=timezone.now(), id=uuid.uuid4())
+
+    def test_cursor_round_trip(self):
+        cursor = self.pagination._encode_cursor(self.feature)
+        self.assertEqual(self.pagination._decode_cursor(cursor), (self.feature.created_at, self.feature.id, False))
+
+    def test_reverse_cursor_round_trip(self):
+        cursor = self.pagination._encode_cursor(self.feature, reverse=True)
+        self.assertEqual(self.pagination._decode_cursor(cursor), (self.feature.created_at, self.feature.id, True))
+
+    def test_missing_cursor(self):
+        self.assertIsNone(self.pagination._decode_cursor(None))
+        self.assertIsNone(self.pagination._decode_cursor(''))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-a-cursor', 'eyJjIjogIngifQ==', 'e30='):
+            with self.assertRaises(ValidationError):
+                self.pagination._decode_cursor(cursor)
+
+
+class BandStatisticsTests(SimpleTestCase):
+    def test_block_merge_matches_whole_band(self):
+        rng = np.random.default_rng(0)
+        blocks = [rng.normal(10, 3, size) for size in (1, 50, 1000)]
+        stats = BandStatistics()
+        for block in blocks:
+            stats.update(block)
+        values = np.concatenate(blocks)
+        summary = stats.as_dict()
+        self.assertEqual(summary['valid_pixels'], values.size)
+        self.assertAlmostEqual(summary['mean'], values.mean())
+        self.assertAlmostEqual(summary['std'], values.std())
+        self.assertEqual(summary['min'], values.min())
+        self.assertEqual(summary['max'], values.max())
+
+    def test_std_is_exact_far_from_zero(self):
+        blocks = [1e8 + np.array([0.1, 0.2]), 1e8 + np.array([0.3]), 1e8 + np.array([0.4, 0.5, 0.6])]
+        stats = BandStatistics()
+        for block in blocks:
+            stats.update(block)
+        self.assertAlmostEqual(stats.as_dict()['std'], np.concatenate(blocks).std(), places=6)
+
+    def test_percentiles_from_histogram(self):
+        stats = BandStatistics(hist_range=(0, 100), bins=100)
+        stats.update(np.arange(100))
+        percentiles = stats.percentiles((2, 50, 98))
+        self.assertAlmostEqual(percentiles['p2'], 2.0)
+        self.assertAlmostEqual(percentiles['p50'], 50.0)
+        self.assertAlmostEqual(percentiles['p98'], 98.0)
+
+    def test_empty_band(self):
+        stats = BandStatistics(hist_range=(0, 1))
+        stats.update(np.array([]))
+        self.assertEqual(stats.as_dict(), {})
+        self.assertEqual(stats.percentiles(), {})
+
+
+class TransformGeometriesTests(SimpleTestCase):
+    def setUp(self):
+        # Only the transformer cache is needed; skip the S3 and GeoServer clients
+        self.processor = VectorDataProcessor.__new__(VectorDataProcessor)
+        self.processor._transformers = {}
+
+    def test_strips_z_without_source_crs(self):
+        geometry = {'type': 'LineString', 'coordinates': [[1, 2, 3], [4, 5, 6]]}
+        result = self.processor._transform_geometries([geometry], None)
+        self.assertEqual(result, [{'type': 'LineString', 'coordinates': [[1.0, 2.0], [4.0, 5.0]]}])
+
+    def test_transforms_batch_to_wgs84(self):
+        geometries = [
+            {'type': 'Point', 'coordinates': [500000, 0]},
+            square(500000, 0, 1000),
+        ]
+        point, polygon = self.processor._transform_geometries(geometries, 'EPSG:32645')
+        self.assertAlmostEqual(point['coordinates'][0], 87.0)
+        self.assertAlmostEqual(point['coordinates'][1], 0.0)
+        self.assertEqual(polygon['type'], 'Polygon')
+        self.assertEqual(len(polygon['coordinates'][0]), 5)
+        self.assertEqual(polygon['coordinates'][0][0], polygon['coordinates'][0][-1])
+
+    def test_results_stay_aligned_with_failures(self):
+        collection = {'type': 'GeometryCollection', 'geometries': []}
+        geometries = [
+            {'type': 'Point', 'coordinates': [1, 2]},
+            collection,
+            {'type': 'Point', 'coordinates': [float('inf'), 0]},
+            {'type': 'MultiPoint', 'coordinates': [[3, 4]]},
+        ]
+        result = self.processor._transform_geometries(geometries, None)
+        self.assertEqual(result[0], {'type': 'Point', 'coordinates': [1.0, 2.0]})
+        self.assertIs(result[1], collection)
+        self.assertIsNone(result[2])
+        self.assertEqual(result[3], {'type': 'MultiPoint', 'coordinates': [[3.0, 4.0]]})
+
+
+@mock.patch('kampas_be.project_api.vector_layer_utils.schedule_attribute_catalog_refresh')
+class ApplyFeatureBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create skips the save() hooks that create GeoServer and S3 resources
+        company, client_company = Company.objects.bulk_create([
+            Company(company_name='Survey Co'), Company(company_name='Client Co')
+        ])
+        client = Client.objects.create(owner_company=company, client_company=client_company)
+        cls.user = CustomUser.objects.create_user(
+            'editor@example.com', 'password', first_name='Ed', last_name='Itor', company=company
+        )
+        project, = Project.objects.bulk_create([
+            Project(project_name='Roads', client=client, company=company, created_by=cls.user)
+        ])
+        cls.layer = VectorLayer.objects.create(
+            name='parcels', geometry_type='Polygon', project=project, created_by=cls.user
+        )
+        cls.feature = VectorFeature.objects.create(
+            layer=cls.layer, geom=Polygon.from_bbox((0, 0, 1, 1)), attributes={'owner': 'A', 'area': 1}
+        )
+
+    def setUp(self):
+        self.layer.refresh_from_db()
+
+    def test_applies_creates_updates_and_deletes(self, _):
+        other = VectorFeature.objects.create(layer=self.layer, geom=Polygon.from_bbox((2, 2, 3, 3)))
+        version = self.layer.tile_version
+
+        result = apply_feature_batch(
+            self.layer,
+            creates=[{'type': 'Feature', 'geometry': square(5, 5), 'properties': {'owner': 'C'}}],
+            updates=[{'id': str(self.feature.id), 'geometry': square(0, 0, 2)}],
+            deletes=[str(other.id)],
+        )
+
+        self.assertTrue(result['applied'])
+        self.assertEqual(result['summary'], {'created': 1, 'updated': 1, 'deleted': 1})
+        self.assertFalse(VectorFeature.objects.filter(id=other.id).exists())
+        self.assertTrue(VectorFeature.objects.filter(layer=self.layer, attributes__owner='C').exists())
+        self.feature.refresh_from_db()
+        self.assertEqual(self.feature.geom.extent, (0, 0, 2, 2))
+        self.assertGreater(self.layer.tile_version, version)
+
+    def test_update_merges_attributes(self, _):
+        result = apply_feature_batch(
+            self.layer, updates=[{'id': str(self.feature.id), 'properties': {'owner': 'B', 'status': 'done'}}]
+        )
+
+        self.assertTrue(result['applied'])
+        self.feature.refresh_from_db()
+        self.assertEqual(self.feature.attributes, {'owner': 'B', 'area': 1, 'status': 'done'})
+        self.assertEqual(self.feature.geom.extent, (0, 0, 1, 1))
+
+    def test_one_failure_writes_nothing(self, _):
+        version = self.layer.tile_version
+
+        result = apply_feature_batch(
+            self.layer,
+            creates=[{'geometry': square(5, 5)}],
+            updates=[{'id': str(self.feature.id), 'properties': {'owner': 'B'}}],
+            deletes=[str(uuid.uuid4())],
+        )
+
+        self.assertFalse(result['applied'])
+        statuses = {(item['op'], item['index']): item['status'] for item in result['results']}
+        self.assertEqual(statuses, {('create', 0): 'skipped', ('update', 0): 'skipped', ('delete', 0): 'error'})
+        self.assertEqual(VectorFeature.objects.filter(layer=self.layer).count(), 1)
+        self.feature.refresh_from_db()
+        self.assertEqual(self.feature.attributes['owner'], 'A')
+        self.layer.refresh_from_db()
+        self.assertEqual(self.layer.tile_version, version)
+
+    def test_geometry_type_must_match_exactly(self, _):
+        multi = {'type': 'MultiPolygon', 'coordinates': [square(5, 5)['coordinates']]}
+
+        result = apply_feature_batch(
+            self.layer,
+            creates=[{'geometry': multi}, {'geometry': {'type': 'Point', 'coordinates': [5, 5]}}],
+        )
+
+        self.assertFalse(result['applied'])
+        self.assertTrue(all(item['status'] == 'error' for item in result['results']))
+        self.assertIn('does not match layer type', result['results'][0]['error'])
+        self.assertEqual(VectorFeature.objects.filter(layer=self.layer).count(), 1)
+
+    def test_invalid_geometry_is_rejected(self, _):
+        bowtie = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+
+        result = apply_feature_batch(
+            self.layer,
+            creates=[{'geometry': square(5, 5)}],
+            updates=[{'id': str(self.feature.id), 'geometry': bowtie}],
+        )
+
+        self.assertFalse(result['applied'])
+        update_result = next(item for item in result['results'] if item['op'] == 'update')
+        self.assertEqual(update_result['status'], 'error')
+        self.assertTrue(update_result['error'].startswith('Invalid geometry'))
+        self.feature.refresh_from_db()
+        self.assertEqual(self.feature.geom.extent, (0, 0, 1, 1))
+
+    def test_duplicate_ids_are_rejected(self, _):
+        result = apply_feature_batch(
+            self.layer,
+            updates=[{'id': str(self.feature.id), 'properties': {'owner': 'B'}}],
+            deletes=[str(self.feature.id)],
+        )
+
+        self.assertFalse(result['applied'])
+        self.assertTrue(VectorFeature.objects.filter(id=self.feature.id).exists())
+
+
+class FeatureCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company, client_company = Company.objects.bulk_create([
+            Company(company_name='Survey Co'), Company(company_name='Client Co')
+        ])
+        client = Client.objects.create(owner_company=company, client_company=client_company)
+        user = CustomUser.objects.create_user('viewer@example.com', 'password', first_name='Vi', last_name='Ewer')
+        project, = Project.objects.bulk_create([Project(project_name='Roads', client=client, company=company)])
+        cls.layer = VectorLayer.objects.create(name='points', geometry_type='Point', project=project, created_by=user)
+        # Same created_at for every feature, as after a bulk upload
+        created_at = timezone.now()
+        cls.features = VectorFeature.objects.bulk_create([
+            VectorFeature(layer=cls.layer, geom=Point(i, i, srid=4326), created_at=created_at) for i in range(5)
+        ])
+        VectorFeature.objects.filter(layer=cls.layer).update(created_at=created_at)
+
+    def paginate(self, params):
+        pagination = FeatureCursorPagination()
+        request = Request(APIRequestFactory().get('/features/', params))
+        rows = pagination.paginate_queryset(VectorFeature.objects.filter(layer=self.layer), request)
+        return pagination, rows
+
+    def test_pages_through_tied_timestamps(self):
+        seen = []
+        params = {'page_size': 2}
+        while True:
+            pagination, rows = self.paginate(params)
+            seen.extend(row.id for row in rows)
+            if not pagination.next_cursor:
+                break
+            params = {'page_size': 2, 'cursor': pagination.next_cursor}
+        self.assertEqual(seen, sorted(feature.id for feature in self.features))
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        first_pagination, first_page = self.paginate({'page_size': 2})
+        second_pagination, _ = self.paginate({'page_size': 2, 'cursor': first_pagination.next_cursor})
+        _, previous_page = self.paginate({'page_size': 2, 'cursor': second_pagination.previous_cursor})
+        self.assertEqual([row.id for row in previous_page], [row.id for row in first_page])
+
+    def test_page_parameter_serves_first_page_with_warning(self):
+        pagination, rows = self.paginate({'page': 3, 'page_size': 2})
+        response = pagination.get_paginated_response([])
+
+        self.assertEqual([row.id for row in rows], sorted(feature.id for feature in self.features)[:2])
+        self.assertIn('warning', response.data)
+        self.assertNotIn('page=', response.data['next'])
+        self.assertEqual(response.data['count'], 5)
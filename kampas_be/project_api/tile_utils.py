@@ -0,0 +1,291 @@
+import json
+import logging
+from functools import lru_cache
+import boto3
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from rest_framework.renderers import BaseRenderer
+from .models import VectorLayer, VectorFeature
+from .lod_utils import get_lod_field_for_zoom
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator world width in metres, used to size one tile pixel at a zoom level
+WEB_MERCATOR_WORLD_SIZE = 40075016.68557849
+MAX_TILE_ZOOM = 24
+# Latitude limit of the Web Mercator tile grid
+MAX_MERCATOR_LATITUDE = 85.0511287798066
+# Cache variant for tiles that carry every attribute
+ALL_FIELDS_VARIANT = '*'
+
+
+class VectorTileRenderer(BaseRenderer):
+    """
+    Lets tile views pass DRF content negotiation for clients that ask for MVT explicitly.
+    Error payloads are still encoded as JSON.
+    """
+    media_type = 'application/vnd.mapbox-vector-tile'
+    format = 'mvt'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or isinstance(data, bytes):
+            return data or b''
+        return json.dumps(data).encode('utf-8')
+
+
+def is_valid_tile(z, x, y):
+    """Check that z/x/y addresses an existing tile in the XYZ scheme."""
+    if z < 0 or z > MAX_TILE_ZOOM:
+        return False
+    tile_count = 2 ** z
+    return 0 <= x < tile_count and 0 <= y < tile_count
+
+
+def get_simplify_tolerance(z, extent):
+    """Simplification tolerance (in EPSG:3857 metres) of one tile pixel at zoom z."""
+    return WEB_MERCATOR_WORLD_SIZE / (2 ** z * extent)
+
+
+def parse_tile_fields(fields_param):
+    """
+    Parse the 'fields' query parameter into a list of attribute keys.
+    None means all attributes, an empty list means geometry and id only.
+    """
+    if fields_param is None:
+        return None
+    return [field.strip() for field in fields_param.split(',') if field.strip()]
+
+
+def build_vector_tile(layer, z, x, y, fields=None):
+    """
+    Build a Mapbox Vector Tile for one layer with ST_AsMVT.
+    Geometries are read from the coarsest pre-simplified LOD column that is still exact at
+    the zoom level, simplified to the tile pixel size and clipped to the tile, and only the
+    requested attribute keys are encoded. At most VECTOR_TILE_MAX_FEATURES features are
+    encoded, lowest id first, so a capped tile always holds the same subset.
+    Returns (tile bytes, truncated); the bytes are empty if no features.
+    """
+    extent = getattr(settings, 'VECTOR_TILE_EXTENT', 4096)
+    buffer = getattr(settings, 'VECTOR_TILE_BUFFER', 64)
+    max_features = getattr(settings, 'VECTOR_TILE_MAX_FEATURES', 50000)
+
+    if fields is None:
+        attributes_sql = "f.attributes"
+    elif fields:
+        attributes_sql = """(
+            SELECT COALESCE(jsonb_object_agg(a.key, a.value), '{}'::jsonb)
+            FROM jsonb_each(f.attributes) a
+            WHERE a.key = ANY(%(fields)s)
+        )"""
+    else:
+        attributes_sql = "'{}'::jsonb"
+
+    lod_field = get_lod_field_for_zoom(z)
+    geom_sql = "f.geom" if lod_field == 'geom' else f"COALESCE(f.{lod_field}, f.geom)"
+
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS tile_geom,
+                   ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326) AS query_geom
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(
+                       ST_SimplifyPreserveTopology(ST_Transform({geom_sql}, 3857), %(tolerance)s),
+                       bounds.tile_geom, %(extent)s, %(buffer)s, true
+                   ) AS geom,
+                   f.id::text AS id,
+                   {attributes_sql} AS attributes
+            FROM {VectorFeature._meta.db_table} f, bounds
+            WHERE f.layer_id = %(layer_id)s
+              AND f.geom && bounds.query_geom
+            ORDER BY f.id
+            LIMIT %(max_features)s + 1
+        )
+        SELECT (
+                   SELECT ST_AsMVT(t.*, %(layer_name)s, %(extent)s, 'geom')
+                   FROM (
+                       SELECT geom, id, attributes
+                       FROM mvtgeom
+                       ORDER BY id
+                       LIMIT %(max_features)s
+                   ) t
+                   WHERE t.geom IS NOT NULL
+               ),
+               (SELECT COUNT(*) FROM mvtgeom) > %(max_features)s;
+    """
+
+    params = {
+        'z': z,
+        'x': x,
+        'y': y,
+        'margin': buffer / extent,
+        'tolerance': get_simplify_tolerance(z, extent),
+        'extent': extent,
+        'buffer': buffer,
+        'layer_id': str(layer.id),
+        'max_features': max_features,
+        'layer_name': layer.name,
+        'fields': fields or [],
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    tile = bytes(row[0]) if row and row[0] is not None else b''
+    truncated = bool(row and row[1])
+    if truncated:
+        logger.info(f"Tile {z}/{x}/{y} for layer {layer.id} capped at {max_features} features")
+    logger.debug(f"Built tile {z}/{x}/{y} for layer {layer.id}: {len(tile)} bytes")
+    return tile, truncated
+
+
+# ----------------------------------------------------------------------------
+# Tile cache
+# Hot tiles live in Redis under one key per layer/version/z/x/y holding every
+# 'fields' variant of the tile. Full-attribute tiles are also written to an S3
+# pyramid (tiles/vector_layers/<layer>/v<version>/z/x/y.mvt) so cold tiles can
+# be served without PostGIS once Redis has evicted them. Feature edits bump the
+# layer tile version, so cached tiles are never invalidated in place.
+# ----------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _get_s3_client():
+    """S3 client shared by tile cache reads and writes."""
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME
+    )
+
+
+def get_tile_cache_key(layer_id, version, z, x, y):
+    """Redis key of a cached tile."""
+    return f"vtile:{layer_id.hex}:v{version}:{z}:{x}:{y}"
+
+
+def get_tile_s3_prefix(layer_id, version=None):
+    """S3 prefix of a layer's tile pyramid, optionally for a single version."""
+    prefix = f"{getattr(settings, 'VECTOR_TILE_S3_PREFIX', 'tiles/vector_layers')}/{layer_id.hex}/"
+    return f"{prefix}v{version}/" if version is not None else prefix
+
+
+def get_tile_s3_key(layer_id, version, z, x, y):
+    """S3 key of a tile in the cold pyramid."""
+    return f"{get_tile_s3_prefix(layer_id, version)}{z}/{x}/{y}.mvt"
+
+
+def _get_fields_variant(fields):
+    return ALL_FIELDS_VARIANT if fields is None else ','.join(sorted(fields))
+
+
+def _read_s3_tile(s3_key):
+    """Return (tile, truncated) from the S3 pyramid, or None if the tile is not stored."""
+    try:
+        response = _get_s3_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
+        truncated = response.get('Metadata', {}).get('truncated') == '1'
+        return response['Body'].read(), truncated
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            logger.warning(f"Error reading tile {s3_key} from S3: {e}")
+        return None
+
+
+def _write_s3_tile(s3_key, tile, truncated):
+    try:
+        _get_s3_client().put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            Body=tile,
+            ContentType=VectorTileRenderer.media_type,
+            Metadata={'truncated': '1' if truncated else '0'}
+        )
+    except ClientError as e:
+        logger.warning(f"Error writing tile {s3_key} to S3: {e}")
+
+
+def get_cached_vector_tile(layer, z, x, y, fields=None):
+    """
+    Return a vector tile from Redis, then the S3 pyramid, building it with
+    build_vector_tile only on a miss. Tiles above VECTOR_TILE_CACHE_MAX_ZOOM are not cached.
+    Returns (tile bytes, truncated) like build_vector_tile.
+    """
+    if z > getattr(settings, 'VECTOR_TILE_CACHE_MAX_ZOOM', 16):
+        return build_vector_tile(layer, z, x, y, fields=fields)
+    
+    cache_key = get_tile_cache_key(layer.id, layer.tile_version, z, x, y)
+    variant = _get_fields_variant(fields)
+    
+    try:
+        variants = cache.get(cache_key) or {}
+    except Exception as e:
+        logger.warning(f"Tile cache read failed for {cache_key}: {e}")
+        variants = {}
+    
+    if variant in variants:
+        cached = variants[variant]
+        # Entries written before truncation was tracked hold bare tile bytes
+        return (cached, False) if isinstance(cached, bytes) else cached
+    
+    result = None
+    s3_key = get_tile_s3_key(layer.id, layer.tile_version, z, x, y)
+    if variant == ALL_FIELDS_VARIANT:
+        result = _read_s3_tile(s3_key)
+    
+    if result is None:
+        result = build_vector_tile(layer, z, x, y, fields=fields)
+        if variant == ALL_FIELDS_VARIANT:
+            _write_s3_tile(s3_key, *result)
+    
+    variants[variant] = result
+    try:
+        cache.set(cache_key, variants, getattr(settings, 'VECTOR_TILE_CACHE_TIMEOUT', 86400))
+    except Exception as e:
+        logger.warning(f"Tile cache write failed for {cache_key}: {e}")
+    
+    return result
+
+
+def bump_tile_version(layer):
+    """
+    Invalidate every cached tile of a layer by moving it to a new tile version.
+    Call it after the feature change is written: a request that read the old version
+    can only write its tile back under that version, which is never served again.
+    Tiles of the old version are removed from S3 in the background once the change
+    commits, after VECTOR_TILE_STALE_DELETE_DELAY so in-flight renders finish first.
+    """
+    old_version = layer.tile_version
+    VectorLayer.objects.filter(id=layer.id).update(tile_version=F('tile_version') + 1)
+    layer.refresh_from_db(fields=['tile_version'])
+    
+    from .tasks import delete_stale_vector_tiles
+    layer_id = str(layer.id)
+    countdown = getattr(settings, 'VECTOR_TILE_STALE_DELETE_DELAY', 300)
+    transaction.on_commit(
+        lambda: delete_stale_vector_tiles.apply_async((layer_id, old_version), countdown=countdown)
+    )
+    
+    logger.info(f"Bumped tile version of layer {layer.id} to {layer.tile_version}")
+
+
+def delete_tile_prefix(prefix):
+    """Delete every S3 object under a tile pyramid prefix. Returns the number of objects deleted."""
+    s3_client = _get_s3_client()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    deleted = 0
+    
+    for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix):
+        objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if objects:
+            s3_client.delete_objects(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Delete={'Objects': objects, 'Quiet': True}
+            )
+            deleted += len(objects)
+    
+    return deleted
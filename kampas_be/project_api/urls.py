@@ -14,20 +14,29 @@ from .views import (
     VectorLayerSplitAPIView,
     VectorFeatureListAPIView,
     VectorFeatureDetailAPIView,
+    VectorFeatureBatchAPIView,
     VectorFeatureFilterAPIView,
+    VectorLayerTileAPIView,
+    VectorLayerExportAPIView,
     RasterGroupTagAPIView,
     RasterLayerUploadAPIView,
     RasterLayerListAPIView,
     RasterLayerDetailAPIView,
+    RasterLayerTileAPIView,
     BulkFileUploadAPIView,
     StreetImageUploadAPIView,
     StreetImageListAPIView,
     StreetImageDetailAPIView,
     StreetImageGeoAPIView,
+    StreetImageClusterAPIView,
+    VectorLayerClusterAPIView,
+    VectorLayerAnalysisAPIView,
+    VectorLayerAttributesAPIView,
     StreetImageryLayerAPIView,
     TerrainModelListAPIView,
     TerrainModelUploadAPIView,
     TerrainModelDetailAPIView,
+    TerrainModelTileAPIView,
 )
 
 urlpatterns = [
@@ -63,9 +72,15 @@ urlpatterns = [
     path('<str:project_id>/vector-layers/empty/', VectorLayerEmptyCreateAPIView.as_view(), name='vector-layer-empty-create'),
     path('<str:project_id>/vector-layers/merge/', VectorLayerMergeAPIView.as_view(), name='vector-layer-merge'),
     path('<str:project_id>/vector-layers/split/', VectorLayerSplitAPIView.as_view(), name='vector-layer-split'),
+    path('<str:project_id>/vector-layers/analysis/', VectorLayerAnalysisAPIView.as_view(), name='vector-layer-analysis'),
     path('<str:project_id>/vector-layers/<uuid:layer_id>/features/', VectorFeatureListAPIView.as_view(), name='vector-feature-list'),
+    path('<str:project_id>/vector-layers/<uuid:layer_id>/clusters/', VectorLayerClusterAPIView.as_view(), name='vector-layer-clusters'),
+    path('<str:project_id>/vector-layers/<uuid:layer_id>/attributes/', VectorLayerAttributesAPIView.as_view(), name='vector-layer-attributes'),
+    path('<str:project_id>/vector-layers/<uuid:layer_id>/features/batch/', VectorFeatureBatchAPIView.as_view(), name='vector-feature-batch'),
     path('<str:project_id>/vector-layers/<uuid:layer_id>/features/<uuid:feature_id>/', VectorFeatureDetailAPIView.as_view(), name='vector-feature-detail'),
     path('<str:project_id>/features/filter/', VectorFeatureFilterAPIView.as_view(), name='vector-features-filter'),
+    path('<str:project_id>/vector-layers/<uuid:layer_id>/export/', VectorLayerExportAPIView.as_view(), name='vector-layer-export'),
+    path('<str:project_id>/vector-layers/<uuid:layer_id>/tiles/<int:z>/<int:x>/<int:y>.mvt', VectorLayerTileAPIView.as_view(), name='vector-layer-tile'),
 
     # Raster Layer URLs
     path('<str:project_id>/raster-group-tags/', RasterGroupTagAPIView.as_view(), name='raster-group-tag-list-create'),
@@ -73,12 +88,14 @@ urlpatterns = [
     path('<str:project_id>/raster-layers/', RasterLayerListAPIView.as_view(), name='raster-layer-list'),
     path('<str:project_id>/raster-layers/upload/', RasterLayerUploadAPIView.as_view(), name='raster-layer-upload'),
     path('<str:project_id>/raster-layers/<uuid:layer_id>/', RasterLayerDetailAPIView.as_view(), name='raster-layer-detail'),
+    path('<str:project_id>/raster-layers/<uuid:layer_id>/tiles/<int:z>/<int:x>/<int:y>.<str:image_format>', RasterLayerTileAPIView.as_view(), name='raster-layer-tile'),
 
      # Street Images
     path('<str:project_id>/street-images/upload/', StreetImageUploadAPIView.as_view(), name='street-image-upload'),
     path('<str:project_id>/street-images/', StreetImageListAPIView.as_view(), name='street-image-list'),
     path('<str:project_id>/street-images/<uuid:image_id>/', StreetImageDetailAPIView.as_view(), name='street-image-detail'),
     path('<str:project_id>/street-images/geo/', StreetImageGeoAPIView.as_view(), name='street-image-geo'),
+    path('<str:project_id>/street-images/clusters/', StreetImageClusterAPIView.as_view(), name='street-image-clusters'),
     path('<str:project_id>/street-images/layer/', StreetImageryLayerAPIView.as_view(), name='street-imagery-layer'),
     path('projects/<str:project_id>/street-images/<str:image_id>/', StreetImageDetailAPIView.as_view(), name='street-image-detail'),
 
@@ -86,4 +103,5 @@ urlpatterns = [
     path('<str:project_id>/terrain-models/', TerrainModelListAPIView.as_view(), name='terrain-model-list'),
     path('<str:project_id>/terrain-models/upload/', TerrainModelUploadAPIView.as_view(), name='terrain-model-upload'),
     path('<str:project_id>/terrain-models/<uuid:model_id>/', TerrainModelDetailAPIView.as_view(), name='terrain-model-detail'),
+    path('<str:project_id>/terrain-models/<uuid:model_id>/tiles/<int:z>/<int:x>/<int:y>.<str:image_format>', TerrainModelTileAPIView.as_view(), name='terrain-model-tile'),
 ]
\ No newline at end of file
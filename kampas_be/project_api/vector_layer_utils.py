@@ -1,8 +1,20 @@
+import json
 import logging
-from django.contrib.gis.geos import GEOSGeometry
-from django.db import connection
+import uuid
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.contrib.gis.geos import GEOSGeometry, WKBWriter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import TextField
+from django.db.models.functions import Cast, Coalesce
 from .models import VectorLayer, VectorFeature, Project
 from .vector_utils import VectorDataProcessor
+from .partition_utils import get_feature_table_for_layer
+from .tile_utils import bump_tile_version
+from .layer_metadata_utils import recalculate_layer_stats, recalculate_layers_stats, update_layer_metadata
+from .lod_utils import refresh_feature_lods
+from .attribute_index_utils import filter_by_attributes, record_attribute_filters
+from .attribute_catalog_utils import refresh_attribute_catalog, schedule_attribute_catalog_refresh
 
 logger = logging.getLogger(__name__)
 
@@ -97,95 +109,100 @@ def update_feature_geometry(feature_id, new_geom, new_attributes=None):
         attributes.update(new_attributes)
         feature.attributes = attributes
     
+    # The layer's GeoServer view reads this row directly, so nothing else needs updating
     feature.save()
     
-    # If this is part of a published layer, update the PostGIS table
-    if feature.layer.is_published:
-        table_name = f"vector_layer_{feature.layer.id.hex}"
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(f"""
-                    UPDATE {table_name} 
-                    SET geom = ST_Force2D(ST_GeomFromText(%s, 4326)), 
-                        attributes = %s
-                    WHERE id = %s;
-                """, [feature.geom.wkt, feature.attributes, feature.id.hex])
-        except Exception as e:
-            logger.error(f"Error updating feature in PostGIS table: {e}")
-    
     return feature
 
-def merge_vector_layers(layer1_id, layer2_id, new_layer_name, created_by):
+def copy_features_sql(target_layer, source_layer_ids, attribute_filter=None):
+    """
+    Copy features from source layers into a target layer with a single INSERT ... SELECT.
+    
+    Args:
+        target_layer (VectorLayer): The layer receiving the copies
+        source_layer_ids (list): IDs of the layers to copy from
+        attribute_filter (dict, optional): Only copy features whose attributes contain these
+            key/value pairs (JSONB @> predicate)
+        
+    Returns:
+        int: Number of features copied
+    """
+    feature_table = VectorFeature._meta.db_table
+    target_table = get_feature_table_for_layer(target_layer.id)
+    params = [str(target_layer.id), [str(layer_id) for layer_id in source_layer_ids]]
+    
+    attribute_sql = ""
+    if attribute_filter:
+        attribute_sql = "AND attributes @> %s::jsonb"
+        params.append(json.dumps(attribute_filter))
+    
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {target_table} (id, layer_id, geom, geom_lod1, geom_lod2, geom_lod3, attributes, created_at, updated_at)
+            SELECT gen_random_uuid(), %s, geom, geom_lod1, geom_lod2, geom_lod3, attributes, now(), now()
+            FROM {feature_table}
+            WHERE layer_id = ANY(%s::uuid[]) {attribute_sql};
+        """, params)
+        return cursor.rowcount
+
+def merge_vector_layers(layer1_id, layer2_id, new_layer_name, created_by, description=None, progress_callback=None):
     """
     Merge two vector layers into a new layer.
+    Features are copied inside PostgreSQL with INSERT ... SELECT.
     
     Args:
         layer1_id (UUID): The ID of the first layer
         layer2_id (UUID): The ID of the second layer
         new_layer_name (str): The name for the new merged layer
         created_by (CustomUser): The user creating the merged layer
+        description (str, optional): Description for the new layer
+        progress_callback (callable, optional): Called with (percent, message) as work proceeds
         
     Returns:
         VectorLayer: The new merged layer
     """
+    report = progress_callback or (lambda percent, message: None)
+    
     layer1 = VectorLayer.objects.get(id=layer1_id)
     layer2 = VectorLayer.objects.get(id=layer2_id)
 
     if layer1.geometry_type != layer2.geometry_type:
         raise ValueError("Geometry types do not match for merging.")
 
-    # Create new layer
-    temp_layer = VectorLayer.objects.create(
-        name="temp_layer",  # Temporary name
-        title=f"Merged: {layer1.name} + {layer2.name}",
-        geometry_type=layer1.geometry_type,
-        project=layer1.project,
-        created_by=created_by,
-        description=f"Merged layer from {layer1.name} and {layer2.name}"
-    )
-    
-    # Generate unique name using the ID to avoid conflicts
-    unique_name = f"vector_layer_{temp_layer.id.hex}"
-    
-    # Ensure it fits database field constraints (database column is 200 chars)
-    # Django model says 255 but actual DB column is 200
-    db_max_length = 200  # Actual database column limit
-    if len(unique_name) > db_max_length:
-        unique_name = unique_name[:db_max_length]
-        logger.warning(f"Truncated layer name to fit database column: {unique_name}")
-    
-    # Update with the unique name
-    temp_layer.name = unique_name
-    temp_layer.save()
-    
-    logger.info(f"Created merged vector layer with unique name: {unique_name} (original: {new_layer_name})")
-    
-    # Copy features from both layers
-    features_to_create = []
-    for feature in VectorFeature.objects.filter(layer__in=[layer1, layer2]):
-        features_to_create.append(
-            VectorFeature(
-                layer=temp_layer,
-                geom=feature.geom,
-                attributes=feature.attributes
-            )
+    with transaction.atomic():
+        # Create new layer
+        merged_layer = create_vector_layer(
+            new_layer_name,
+            layer1.geometry_type,
+            layer1.project,
+            created_by,
+            description or f"Merged layer from {layer1.name} and {layer2.name}"
         )
+        merged_layer.title = new_layer_name or f"Merged: {layer1.name} + {layer2.name}"
+        merged_layer.save(update_fields=['title'])
+        
+        logger.info(f"Created merged vector layer with unique name: {merged_layer.name} (original: {new_layer_name})")
+        report(10, "Copying features")
+        
+        copied = copy_features_sql(merged_layer, [layer1.id, layer2.id])
+        logger.info(f"Copied {copied} features into merged layer {merged_layer.name}")
+        report(70, "Updating layer statistics")
+        
+        recalculate_layer_stats(merged_layer)
+        refresh_attribute_catalog(merged_layer)
 
-    # Bulk create features
-    if features_to_create:
-        VectorFeature.objects.bulk_create(features_to_create, batch_size=1000)
-        temp_layer.feature_count = len(features_to_create)
-        temp_layer.save()
-
-    # Create PostGIS table and publish to GeoServer
+    # Create PostGIS view and publish to GeoServer
+    report(85, "Publishing layer")
     processor = VectorDataProcessor()
-    processor._create_and_publish_layer(temp_layer)
+    processor._create_and_publish_layer(merged_layer)
 
-    return temp_layer
+    return merged_layer
 
-def split_layer_by_attribute(layer_id, attribute_key, attribute_value, new_layer_name, created_by):
+def split_layer_by_attribute(layer_id, attribute_key, attribute_value, new_layer_name, created_by,
+                             description=None, progress_callback=None):
     """
     Split a layer by creating a new layer with features matching an attribute value.
+    Matching is a JSONB containment predicate evaluated inside PostgreSQL.
     
     Args:
         layer_id (UUID): The ID of the layer to split
@@ -193,63 +210,382 @@ def split_layer_by_attribute(layer_id, attribute_key, attribute_value, new_layer
         attribute_value: The attribute value to match
         new_layer_name (str): The name for the new layer
         created_by (CustomUser): The user creating the new layer
+        description (str, optional): Description for the new layer
+        progress_callback (callable, optional): Called with (percent, message) as work proceeds
         
     Returns:
         VectorLayer: The new layer containing the filtered features
     """
+    report = progress_callback or (lambda percent, message: None)
+    
     original = VectorLayer.objects.get(id=layer_id)
     
-    # Create new layer
-    temp_layer = VectorLayer.objects.create(
-        name="temp_layer",  # Temporary name
-        title=f"Split from {original.name}",
-        geometry_type=original.geometry_type,
-        project=original.project,
-        created_by=created_by,
-        description=f"Split from {original.name} where {attribute_key}={attribute_value}"
-    )
+    with transaction.atomic():
+        # Create new layer
+        split_layer = create_vector_layer(
+            new_layer_name,
+            original.geometry_type,
+            original.project,
+            created_by,
+            description or f"Split from {original.name} where {attribute_key}={attribute_value}"
+        )
+        split_layer.title = new_layer_name or f"Split from {original.name}"
+        split_layer.save(update_fields=['title'])
+        
+        logger.info(f"Created split vector layer with unique name: {split_layer.name} (original: {new_layer_name})")
+        report(10, "Copying matching features")
+        
+        copied = copy_features_sql(split_layer, [original.id], attribute_filter={attribute_key: attribute_value})
+        if not copied:
+            logger.warning(f"No features matched the attribute filter {attribute_key}={attribute_value}")
+        report(70, "Updating layer statistics")
+        
+        recalculate_layer_stats(split_layer)
+        refresh_attribute_catalog(split_layer)
+
+    # Create PostGIS view and publish to GeoServer
+    report(85, "Publishing layer")
+    processor = VectorDataProcessor()
+    processor._create_and_publish_layer(split_layer)
+
+    return split_layer
+
+SPLIT_MODES = ('distinct', 'grid', 'polygons')
+
+def _split_key_sql(mode, feature_table, attribute_key=None, cell_size=None,
+                   polygon_layer_id=None, name_attribute=None):
+    """
+    Build the per-feature split key for a multi-output split.
     
-    # Generate unique name using the ID to avoid conflicts
-    unique_name = f"vector_layer_{temp_layer.id.hex}"
+    Returns:
+        tuple: (key_sql, key_params, label_sql, label_params, join_sql, join_params)
+    """
+    if mode == 'distinct':
+        return "f.attributes->>%s", [attribute_key], "f.attributes->>%s", [attribute_key], "", []
     
-    # Ensure it fits database field constraints (database column is 200 chars)
-    # Django model says 255 but actual DB column is 200
-    db_max_length = 200  # Actual database column limit
-    if len(unique_name) > db_max_length:
-        unique_name = unique_name[:db_max_length]
-        logger.warning(f"Truncated layer name to fit database column: {unique_name}")
+    if mode == 'grid':
+        # Each feature belongs to the cell containing its point on surface, so a feature
+        # spanning several cells is written once
+        key_sql = ("concat_ws('_', floor(ST_X(ST_PointOnSurface(f.geom)) / %s)::bigint, "
+                   "floor(ST_Y(ST_PointOnSurface(f.geom)) / %s)::bigint)")
+        return key_sql, [cell_size, cell_size], key_sql, [cell_size, cell_size], "", []
     
-    # Update with the unique name
-    temp_layer.name = unique_name
-    temp_layer.save()
+    if mode == 'polygons':
+        label_sql, label_params = "p.id::text", []
+        if name_attribute:
+            label_sql, label_params = "COALESCE(p.attributes->>%s, p.id::text)", [name_attribute]
+        join_sql = f"""
+            CROSS JOIN LATERAL (
+                SELECT p.id, p.attributes FROM {feature_table} p
+                WHERE p.layer_id = %s AND ST_Intersects(p.geom, ST_PointOnSurface(f.geom))
+                ORDER BY p.created_at, p.id
+                LIMIT 1
+            ) p
+        """
+        return "p.id::text", [], label_sql, label_params, join_sql, [str(polygon_layer_id)]
+    
+    raise ValueError(f"Unsupported split mode: {mode}")
+
+def split_layer_into_many(layer_id, mode, created_by, attribute_key=None, cell_size=None,
+                          polygon_layer_id=None, name_attribute=None, name_prefix=None,
+                          description=None, progress_callback=None):
+    """
+    Split a layer into one new layer per group in a single pass over its features.
     
-    logger.info(f"Created split vector layer with unique name: {unique_name} (original: {new_layer_name})")
-    
-    # Find features with matching attribute
-    matching_features = []
-    for feature in original.features.all():
-        if attribute_key in feature.attributes and feature.attributes[attribute_key] == attribute_value:
-            matching_features.append(
-                VectorFeature(
-                    layer=temp_layer,
-                    geom=feature.geom,
-                    attributes=feature.attributes
-                )
+    Groups are every distinct value of an attribute ('distinct'), the cells of a square
+    grid in layer units ('grid'), or the polygons of another layer ('polygons'). All
+    output rows are written by one INSERT ... SELECT that routes each feature to its
+    layer through a key -> layer_id mapping, then the layers are published as a batch.
+    
+    Args:
+        layer_id (UUID): The ID of the layer to split
+        mode (str): 'distinct', 'grid' or 'polygons'
+        created_by (CustomUser): The user creating the new layers
+        attribute_key (str, optional): Attribute to split on ('distinct' mode)
+        cell_size (float, optional): Grid cell size in degrees ('grid' mode)
+        polygon_layer_id (UUID, optional): Polygon layer to split by ('polygons' mode)
+        name_attribute (str, optional): Polygon attribute used to title the outputs
+        name_prefix (str, optional): Prefix for the output layer titles
+        description (str, optional): Description for the new layers
+        progress_callback (callable, optional): Called with (percent, message) as work proceeds
+        
+    Returns:
+        list: The new VectorLayer instances
+    """
+    report = progress_callback or (lambda percent, message: None)
+    max_outputs = getattr(settings, 'VECTOR_SPLIT_MAX_OUTPUTS', 500)
+    
+    original = VectorLayer.objects.select_related('project__company').get(id=layer_id)
+    feature_table = VectorFeature._meta.db_table
+    key_sql, key_params, label_sql, label_params, join_sql, join_params = _split_key_sql(
+        mode, feature_table, attribute_key=attribute_key, cell_size=cell_size,
+        polygon_layer_id=polygon_layer_id, name_attribute=name_attribute
+    )
+    
+    report(5, "Finding split groups")
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT split_key, MIN(split_label), COUNT(*)
+            FROM (
+                SELECT {key_sql} AS split_key, {label_sql} AS split_label
+                FROM {feature_table} f {join_sql}
+                WHERE f.layer_id = %s
+            ) s
+            WHERE split_key IS NOT NULL
+            GROUP BY split_key
+            ORDER BY split_key
+            LIMIT %s;
+        """, key_params + label_params + join_params + [str(original.id), max_outputs + 1])
+        groups = cursor.fetchall()
+    
+    if not groups:
+        raise ValueError("No features fall into any split group.")
+    if len(groups) > max_outputs:
+        raise ValueError(f"Split would create more than {max_outputs} layers.")
+    
+    prefix = name_prefix or original.title or original.name
+    with transaction.atomic():
+        report(15, f"Creating {len(groups)} layers")
+        layers_by_key = {}
+        for split_key, split_label, _ in groups:
+            layer = create_vector_layer(
+                f"{prefix} - {split_label}",
+                original.geometry_type,
+                original.project,
+                created_by,
+                description or f"Split from {original.name} ({mode}: {split_label})"
             )
+            layer.title = f"{prefix} - {split_label}"[:255]
+            layer.save(update_fields=['title'])
+            layers_by_key[split_key] = layer
+        
+        report(30, "Copying features")
+        keys = list(layers_by_key)
+        # Inserting through the parent table lets PostgreSQL route rows to the layer partitions
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {feature_table} (id, layer_id, geom, geom_lod1, geom_lod2, geom_lod3, attributes, created_at, updated_at)
+                SELECT gen_random_uuid(), m.layer_id, s.geom, s.geom_lod1, s.geom_lod2, s.geom_lod3, s.attributes, now(), now()
+                FROM (
+                    SELECT {key_sql} AS split_key, f.geom, f.geom_lod1, f.geom_lod2, f.geom_lod3, f.attributes
+                    FROM {feature_table} f {join_sql}
+                    WHERE f.layer_id = %s
+                ) s
+                JOIN unnest(%s::text[], %s::uuid[]) AS m(split_key, layer_id)
+                    ON m.split_key = s.split_key;
+            """, key_params + join_params + [
+                str(original.id), keys, [str(layers_by_key[key].id) for key in keys]
+            ])
+            copied = cursor.rowcount
+        logger.info(f"Split {copied} features of layer {original.id} into {len(keys)} layers ({mode})")
+        
+        report(70, "Updating layer statistics")
+        split_layers = list(layers_by_key.values())
+        recalculate_layers_stats(split_layers)
+        for split_layer in split_layers:
+            refresh_attribute_catalog(split_layer)
+    
+    report(85, "Publishing layers")
+    processor = VectorDataProcessor()
+    processor._create_and_publish_layers(split_layers)
+    
+    return split_layers
 
-    # Bulk create features
-    if matching_features:
-        VectorFeature.objects.bulk_create(matching_features, batch_size=1000)
-        temp_layer.feature_count = len(matching_features)
-        temp_layer.save()
+def _parse_batch_geometry(geometry_data, layer):
+    """Parse a GeoJSON geometry from a batch item and check it matches the layer type."""
+    if not geometry_data:
+        raise ValueError("Missing geometry.")
+    if isinstance(geometry_data, str):
+        geometry = GEOSGeometry(geometry_data, srid=4326)
     else:
-        logger.warning(f"No features matched the attribute filter {attribute_key}={attribute_value}")
+        geometry = GEOSGeometry(json.dumps(geometry_data), srid=4326)
+    
+    if geometry.geom_type != layer.geometry_type:
+        raise ValueError(f"Geometry type {geometry.geom_type} does not match layer type {layer.geometry_type}")
+    return geometry
 
-    # Create PostGIS table and publish to GeoServer
-    processor = VectorDataProcessor()
-    processor._create_and_publish_layer(temp_layer)
+def _parse_batch_attributes(feature):
+    """Attributes of a batch item, from GeoJSON 'properties' or the API's 'attributes'."""
+    attributes = feature.get('properties', feature.get('attributes'))
+    if attributes is not None and not isinstance(attributes, dict):
+        raise ValueError("Attributes must be an object.")
+    return attributes
 
-    return temp_layer
+def apply_feature_batch(layer, creates=None, updates=None, deletes=None):
+    """
+    Validate and apply a batch of feature edits to a layer in one transaction.
+    
+    Geometries are parsed once and checked for validity with a single ST_IsValid query;
+    if any item fails, nothing is written. Inserts, updates and deletes are then each one
+    SQL statement over unnest()ed arrays, the layer count and bbox are adjusted
+    incrementally and the affected vector tiles are invalidated.
+    
+    Args:
+        layer (VectorLayer): The layer being edited
+        creates (list): GeoJSON features to insert
+        updates (list): GeoJSON features with an 'id' and a geometry and/or properties
+            (properties are merged into the existing attributes)
+        deletes (list): IDs of features to delete
+        
+    Returns:
+        dict: {'applied': bool, 'summary': {...}, 'results': [per-item results]}
+    """
+    creates, updates, deletes = creates or [], updates or [], deletes or []
+    results = {op: [None] * len(items) for op, items in
+               (('create', creates), ('update', updates), ('delete', deletes))}
+    
+    def fail(op, index, message, feature_id=None):
+        results[op][index] = {'op': op, 'index': index, 'id': feature_id, 'status': 'error', 'error': message}
+    
+    # Parse every item before touching the database
+    create_rows, update_rows, delete_rows = [], [], []
+    for index, feature in enumerate(creates):
+        try:
+            if not isinstance(feature, dict):
+                raise ValueError("Feature must be an object.")
+            create_rows.append((index, str(uuid.uuid4()), _parse_batch_geometry(feature.get('geometry'), layer),
+                                _parse_batch_attributes(feature) or {}))
+        except Exception as e:
+            fail('create', index, str(e))
+    
+    seen_ids = set()
+    for op, items in (('update', updates), ('delete', deletes)):
+        for index, item in enumerate(items):
+            raw_id = item.get('id') if isinstance(item, dict) else item
+            try:
+                feature_id = str(uuid.UUID(str(raw_id)))
+            except (TypeError, ValueError):
+                fail(op, index, "Invalid feature id.", raw_id)
+                continue
+            if feature_id in seen_ids:
+                fail(op, index, "Feature appears more than once in the batch.", feature_id)
+                continue
+            seen_ids.add(feature_id)
+            
+            if op == 'delete':
+                delete_rows.append((index, feature_id))
+                continue
+            try:
+                geometry = None
+                if item.get('geometry') is not None:
+                    geometry = _parse_batch_geometry(item['geometry'], layer)
+                attributes = _parse_batch_attributes(item)
+                if geometry is None and attributes is None:
+                    raise ValueError("Nothing to update: provide geometry and/or properties.")
+                update_rows.append((index, feature_id, geometry, attributes))
+            except Exception as e:
+                fail('update', index, str(e), feature_id)
+    
+    wkb_writer = WKBWriter()
+    wkb_writer.outdim = 2
+    wkb_writer.srid = True
+    to_hex = lambda geometry: wkb_writer.write_hex(geometry).decode('ascii') if geometry is not None else None
+    feature_table = get_feature_table_for_layer(layer.id)
+    
+    with connection.cursor() as cursor:
+        # Geometry validity for the whole batch in one round trip
+        geometries = [('create', index, to_hex(geom)) for index, _, geom, _ in create_rows]
+        geometries += [('update', index, to_hex(geom)) for index, _, geom, _ in update_rows if geom is not None]
+        if geometries:
+            cursor.execute("""
+                SELECT n, ST_IsValidReason(g::geometry)
+                FROM unnest(%s::int[], %s::text[]) AS t(n, g)
+                WHERE NOT ST_IsValid(g::geometry);
+            """, [list(range(len(geometries))), [geom for _, _, geom in geometries]])
+            for position, reason in cursor.fetchall():
+                op, index, _ = geometries[position]
+                fail(op, index, f"Invalid geometry: {reason}")
+        
+        # Updated and deleted features must exist in this layer
+        existing_ids = [feature_id for _, feature_id, _, _ in update_rows] + [feature_id for _, feature_id in delete_rows]
+        if existing_ids:
+            cursor.execute(f"SELECT id FROM {feature_table} WHERE layer_id = %s AND id = ANY(%s::uuid[]);",
+                           [str(layer.id), existing_ids])
+            found = {str(row[0]) for row in cursor.fetchall()}
+            for index, feature_id, _, _ in update_rows:
+                if feature_id not in found:
+                    fail('update', index, "Feature not found in this layer.", feature_id)
+            for index, feature_id in delete_rows:
+                if feature_id not in found:
+                    fail('delete', index, "Feature not found in this layer.", feature_id)
+    
+    if any(result for op_results in results.values() for result in op_results):
+        for op, op_results in results.items():
+            for index, result in enumerate(op_results):
+                if result is None:
+                    op_results[index] = {'op': op, 'index': index, 'status': 'skipped'}
+        return {'applied': False, 'summary': {}, 'results': [r for op in results.values() for r in op]}
+    
+    added_extents, removed_extents = [], []
+    reshaped_ids = [feature_id for _, feature_id, _, _ in create_rows]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if delete_rows:
+            cursor.execute(f"""
+                DELETE FROM {feature_table}
+                WHERE layer_id = %s AND id = ANY(%s::uuid[])
+                RETURNING ST_XMin(geom), ST_YMin(geom), ST_XMax(geom), ST_YMax(geom);
+            """, [str(layer.id), [feature_id for _, feature_id in delete_rows]])
+            removed_extents.extend(cursor.fetchall())
+        
+        if update_rows:
+            # Joining the table to itself exposes the pre-update geometry in RETURNING
+            cursor.execute(f"""
+                UPDATE {feature_table} f
+                SET geom = COALESCE(u.geom::geometry, f.geom),
+                    attributes = f.attributes || COALESCE(u.attributes::jsonb, '{{}}'::jsonb),
+                    updated_at = now()
+                FROM unnest(%s::uuid[], %s::text[], %s::text[]) AS u(id, geom, attributes), {feature_table} o
+                WHERE f.layer_id = %s AND f.id = u.id AND o.id = u.id AND o.layer_id = f.layer_id
+                RETURNING f.id, u.geom IS NOT NULL,
+                    ST_XMin(o.geom), ST_YMin(o.geom), ST_XMax(o.geom), ST_YMax(o.geom),
+                    ST_XMin(f.geom), ST_YMin(f.geom), ST_XMax(f.geom), ST_YMax(f.geom);
+            """, [
+                [feature_id for _, feature_id, _, _ in update_rows],
+                [to_hex(geom) for _, _, geom, _ in update_rows],
+                [json.dumps(attributes) if attributes is not None else None for _, _, _, attributes in update_rows],
+                str(layer.id)
+            ])
+            for row in cursor.fetchall():
+                if row[1]:
+                    reshaped_ids.append(row[0])
+                    removed_extents.append(row[2:6])
+                    added_extents.append(row[6:10])
+        
+        if create_rows:
+            cursor.execute(f"""
+                INSERT INTO {feature_table} (id, layer_id, geom, attributes, created_at, updated_at)
+                SELECT u.id, %s, u.geom::geometry, u.attributes::jsonb, now(), now()
+                FROM unnest(%s::uuid[], %s::text[], %s::text[]) AS u(id, geom, attributes)
+                RETURNING ST_XMin(geom), ST_YMin(geom), ST_XMax(geom), ST_YMax(geom);
+            """, [
+                str(layer.id),
+                [feature_id for _, feature_id, _, _ in create_rows],
+                [to_hex(geom) for _, _, geom, _ in create_rows],
+                [json.dumps(attributes) for _, _, _, attributes in create_rows]
+            ])
+            added_extents.extend(cursor.fetchall())
+        
+        refresh_feature_lods(layer, reshaped_ids)
+        update_layer_metadata(layer, added=len(create_rows), removed=len(delete_rows),
+                              added_extents=added_extents, removed_extents=removed_extents)
+    
+    bump_tile_version(layer)
+    schedule_attribute_catalog_refresh(layer)
+    
+    for index, feature_id, _, _ in create_rows:
+        results['create'][index] = {'op': 'create', 'index': index, 'id': feature_id, 'status': 'created'}
+    for index, feature_id, _, _ in update_rows:
+        results['update'][index] = {'op': 'update', 'index': index, 'id': feature_id, 'status': 'updated'}
+    for index, feature_id in delete_rows:
+        results['delete'][index] = {'op': 'delete', 'index': index, 'id': feature_id, 'status': 'deleted'}
+    
+    logger.info(f"Applied feature batch to layer {layer.id}: {len(create_rows)} created, "
+                f"{len(update_rows)} updated, {len(delete_rows)} deleted")
+    return {
+        'applied': True,
+        'summary': {'created': len(create_rows), 'updated': len(update_rows), 'deleted': len(delete_rows)},
+        'results': [r for op in results.values() for r in op]
+    }
 
 def create_empty_layer(name, geometry_type, project, created_by, description=None):
     """
@@ -267,33 +603,12 @@ def create_empty_layer(name, geometry_type, project, created_by, description=Non
     """
     layer = create_vector_layer(name, geometry_type, project, created_by, description)
     
-    # Create empty PostGIS table
+    # Create the (initially empty) PostGIS view over the layer's features
     processor = VectorDataProcessor()
-    table_name = f"vector_layer_{layer.id.hex}"
     
     try:
-        with connection.cursor() as cursor:
-            # Create table with proper geometry column
-            cursor.execute(f"""
-                CREATE TABLE {table_name} (
-                    id SERIAL PRIMARY KEY,
-                    geom GEOMETRY({geometry_type}, 4326),
-                    attributes JSONB
-                );
-            """)
-            
-            # Create spatial index
-            cursor.execute(f"""
-                CREATE INDEX {table_name}_geom_idx 
-                ON {table_name} USING GIST (geom);
-            """)
-            
-            # Create index on attributes
-            cursor.execute(f"""
-                CREATE INDEX {table_name}_attributes_idx 
-                ON {table_name} USING GIN (attributes);
-            """)
-            
+        table_name = processor._create_layer_view(layer)
+        
         # Publish to GeoServer
         success, geoserver_url = processor.geoserver_manager.publish_layer_to_group(
             company_id=layer.project.company.id,
@@ -350,9 +665,17 @@ def filter_features(layer_name=None, geom_bbox=None, attributes=None, project_id
         if project_id:
             qs = qs.filter(layer__project_id=project_id)
         
-        # Filter by layer name if provided
+        # Filter by layer name if provided. The name is resolved to layer ids first: comparing
+        # layer_id with a literal lets the planner use a layer's partial expression indexes
+        layers = []
         if layer_name:
-            qs = qs.filter(layer__name=layer_name)
+            layers = VectorLayer.objects.filter(name=layer_name, is_active=True, deleted_at__isnull=True)
+            if company_id:
+                layers = layers.filter(project__company_id=company_id)
+            if project_id:
+                layers = layers.filter(project_id=project_id)
+            layers = list(layers)
+            qs = qs.filter(layer_id__in=[layer.id for layer in layers])
         
         # Filter by bounding box if provided
         if geom_bbox and len(geom_bbox) == 4:
@@ -366,13 +689,13 @@ def filter_features(layer_name=None, geom_bbox=None, attributes=None, project_id
         
         # Filter by attributes if provided
         if attributes and isinstance(attributes, dict):
-            for key, val in attributes.items():
-                # Use the contains operator for JSONB fields
-                filter_dict = {f"attributes__{key}": val}
-                qs = qs.filter(**filter_dict)
+            # attributes->>'key' predicates can use the per-layer expression indexes
+            qs = filter_by_attributes(qs, attributes)
+            if len(layers) == 1:
+                record_attribute_filters(layers[0], attributes.keys())
         
-        # Order by creation date for consistent results
-        qs = qs.order_by('-created_at')
+        # Order by creation date for consistent results; layer is joined for serialization
+        qs = qs.select_related('layer').order_by('-created_at', '-id')
         
         return qs
         
@@ -383,6 +706,7 @@ def filter_features(layer_name=None, geom_bbox=None, attributes=None, project_id
 def get_feature_geojson(features_qs):
     """
     Convert features queryset to GeoJSON format.
+    Features annotated by lod_utils.with_lod_geometry emit their simplified geometry.
     
     Args:
         features_qs: VectorFeature queryset
@@ -397,11 +721,11 @@ def get_feature_geojson(features_qs):
             feature_dict = {
                 "type": "Feature",
                 "id": str(feature.id),
-                "geometry": feature.geom.geojson if feature.geom else None,
+                "geometry": (getattr(feature, 'lod_geom', None) or feature.geom).geojson if feature.geom else None,
                 "properties": {
                     "layer_name": feature.layer.name,
                     "layer_id": str(feature.layer.id),
-                    "project_id": feature.layer.project.id,
+                    "project_id": feature.layer.project_id,
                     "created_at": feature.created_at.isoformat(),
                     **feature.attributes  # Include all custom attributes
                 }
@@ -421,4 +745,50 @@ def get_feature_geojson(features_qs):
             "features": [],
             "count": 0,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+def stream_features_geojson(features_qs, ndjson=False, chunk_size=2000, lod_field='geom'):
+    """
+    Yield a feature queryset as GeoJSON text without building it in memory.
+    Geometry and attributes are serialized by PostgreSQL (ST_AsGeoJSON, jsonb::text) and read
+    through a server-side cursor, so memory use stays constant regardless of the row count.
+    
+    Args:
+        features_qs: VectorFeature queryset
+        ndjson (bool): Emit newline-delimited GeoJSON features instead of a FeatureCollection
+        chunk_size (int): Rows fetched per cursor round trip and features per yielded chunk
+        lod_field (str): Geometry column to emit ('geom' or a pre-simplified LOD column)
+        
+    Yields:
+        str: Chunks of GeoJSON text
+    """
+    rows = features_qs.order_by().annotate(
+        geometry_json=AsGeoJSON('geom' if lod_field == 'geom' else Coalesce(lod_field, 'geom')),
+        attributes_json=Cast('attributes', output_field=TextField())
+    ).values_list('id', 'geometry_json', 'attributes_json').iterator(chunk_size=chunk_size)
+    
+    separator = '\n' if ndjson else ','
+    if not ndjson:
+        yield '{"type":"FeatureCollection","features":['
+    
+    buffer = []
+    first_chunk = True
+    for feature_id, geometry_json, attributes_json in rows:
+        buffer.append(
+            f'{{"type":"Feature","id":"{feature_id}","geometry":{geometry_json or "null"},'
+            f'"properties":{attributes_json or "{}"}}}'
+        )
+        if len(buffer) >= chunk_size:
+            yield ('' if first_chunk else separator) + separator.join(buffer)
+            first_chunk = False
+            buffer = []
+    
+    if buffer:
+        yield ('' if first_chunk else separator) + separator.join(buffer)
+        first_chunk = False
+    
+    if ndjson:
+        if not first_chunk:
+            yield '\n'
+    else:
+        yield ']}'
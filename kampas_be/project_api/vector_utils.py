@@ -1,23 +1,88 @@
 import tempfile
 import os
+import io
+import csv
 import json
+import time
 import logging
-from django.contrib.gis.geos import GEOSGeometry, Polygon
-from django.db import connection
+from django.contrib.gis.geos import Polygon
+from django.db import connection, transaction, DatabaseError
+import zipfile
+import fiona
+import ijson
+import numpy as np
 import pyproj
 from .models import VectorLayer, VectorFeature
 from .geoserver_utils import get_geoserver_manager
+from .partition_utils import get_feature_table_for_layer
+from .tile_utils import bump_tile_version
+from .layer_metadata_utils import recalculate_layer_stats
+from .attribute_catalog_utils import refresh_attribute_catalog
+from .lod_utils import get_lod_insert_sql
 import boto3
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+
+def get_layer_view_name(vector_layer):
+    """Name of the PostGIS view (and GeoServer feature type) that exposes a layer's features."""
+    return f"vector_layer_{vector_layer.id.hex}"
+
+
+def get_relation_kind(cursor, relation_name):
+    """Return the pg_class relkind of a relation in the current schema ('r' table, 'v' view), or None."""
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema();
+    """, [relation_name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def drop_layer_relation(cursor, relation_name):
+    """Drop a layer's PostGIS view, or the per-layer table that older layers were published from."""
+    relation_kind = get_relation_kind(cursor, relation_name)
+    if relation_kind is None:
+        return
+    if relation_kind == 'v':
+        cursor.execute(f"DROP VIEW IF EXISTS {relation_name};")
+    else:
+        cursor.execute(f"DROP TABLE IF EXISTS {relation_name};")
+
+
+# KML read support is disabled in Fiona by default
+fiona.drvsupport.supported_drivers['KML'] = 'r'
+fiona.drvsupport.supported_drivers['LIBKML'] = 'r'
+
+# Nesting depth of the coordinate arrays for each GeoJSON geometry type
+GEOMETRY_COORD_DEPTH = {
+    'Point': 0,
+    'LineString': 1,
+    'MultiPoint': 1,
+    'Polygon': 2,
+    'MultiLineString': 2,
+    'MultiPolygon': 3,
+}
+
 class VectorDataProcessor:
     """
     Handles the processing of uploaded vector data files (GeoJSON, Shapefile ZIP).
     It manages downloading from S3, parsing, creating database entries for vector layers and features,
     and publishing layers to GeoServer.
     """
+    # Number of rows sent per COPY statement when loading features
+    COPY_BATCH_SIZE = 10000
+    # Rejected rows kept inline in VectorLayer.ingest_report (the full list goes to S3)
+    INGEST_REPORT_SAMPLE_SIZE = 50
+    # Number of features transformed and written together during streaming ingest
+    INGEST_BATCH_SIZE = 5000
+    # Number of leading features used to guess the source CRS
+    CRS_SAMPLE_SIZE = 5
+    # Single-file formats read through Fiona (zipped Shapefiles are extracted first)
+    FIONA_EXTENSIONS = ('.gpkg', '.fgb', '.kml')
+
     def __init__(self):
         """
         Initializes the VectorDataProcessor with an S3 client and a GeoServerManager instance.
@@ -29,11 +94,15 @@ class VectorDataProcessor:
             region_name=settings.AWS_S3_REGION_NAME
         )
         self.geoserver_manager = get_geoserver_manager()
+        # Transformers are expensive to build, keep one per source CRS for the life of the processor
+        self._transformers = {}
+        # Repair invalid geometries with ST_MakeValid instead of rejecting them
+        self.repair_invalid = getattr(settings, 'VECTOR_INGEST_REPAIR_INVALID', True)
     
     def process_uploaded_file(self, file_key, project, layer_name, created_by, title=None):
         """
         Processes an uploaded vector file from S3 based on its file type.
-        Supports GeoJSON and Shapefile ZIP formats.
+        Supports GeoJSON, Shapefile ZIP, GeoPackage, FlatGeobuf and KML formats.
         """
         try:
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -43,8 +112,12 @@ class VectorDataProcessor:
                     return self._process_geojson(local_file_path, project, layer_name, created_by, file_key, title)
                 elif file_key.lower().endswith('.zip'):
                     return self._process_shapefile_zip(local_file_path, project, layer_name, created_by, file_key, title)
+                elif file_key.lower().endswith(self.FIONA_EXTENSIONS):
+                    return self._process_fiona_file(local_file_path, project, layer_name, created_by, file_key, title)
                 else:
-                    raise ValueError("Unsupported file format. Only GeoJSON and Shapefile ZIP are supported.")
+                    raise ValueError(
+                        "Unsupported file format. Only GeoJSON, Shapefile ZIP, GeoPackage, FlatGeobuf and KML are supported."
+                    )
                     
         except Exception as e:
             logger.error(f"Error processing uploaded file {file_key}: {e}")
@@ -126,154 +199,157 @@ class VectorDataProcessor:
         logger.warning("Could not automatically detect coordinate system, assuming UTM 45N")
         return "EPSG:32645"
     
+    def _get_transformer(self, source_crs):
+        """Return a cached pyproj Transformer from source_crs to WGS84."""
+        transformer = self._transformers.get(source_crs)
+        if transformer is None:
+            transformer = pyproj.Transformer.from_crs(source_crs, "EPSG:4326", always_xy=True)
+            self._transformers[source_crs] = transformer
+        return transformer
+    
     def _transform_geometry(self, geometry, source_crs):
         """
         Transform geometry from source CRS to WGS84 and remove Z dimension.
         """
-        if source_crs == "EPSG:4326":
-            # Just remove Z dimension
-            return self._remove_z_dimension(geometry)
-        
-        try:
-            # Create transformer
-            transformer = pyproj.Transformer.from_crs(source_crs, "EPSG:4326", always_xy=True)
-            
-            def transform_coords(coords, depth=0):
-                if depth == 0:  # Single coordinate pair
-                    if len(coords) >= 2:
-                        x, y = transformer.transform(coords[0], coords[1])
-                        return [x, y]  # Remove Z dimension
-                    return coords
-                elif depth == 1:  # Array of coordinate pairs
-                    return [transform_coords(coord, depth-1) for coord in coords]
-                elif depth == 2:  # Array of arrays (rings)
-                    return [transform_coords(ring, depth-1) for ring in coords]
-                elif depth == 3:  # Array of arrays of arrays (multipolygon)
-                    return [transform_coords(polygon, depth-1) for polygon in coords]
-            
-            geom_type = geometry['type']
-            coords = geometry['coordinates']
-            
-            if geom_type == 'Point':
-                geometry['coordinates'] = transform_coords(coords, 0)
-            elif geom_type in ['LineString', 'MultiPoint']:
-                geometry['coordinates'] = transform_coords(coords, 1)
-            elif geom_type in ['Polygon', 'MultiLineString']:
-                geometry['coordinates'] = transform_coords(coords, 2)
-            elif geom_type == 'MultiPolygon':
-                geometry['coordinates'] = transform_coords(coords, 3)
-            
-            return geometry
-            
-        except Exception as e:
-            logger.error(f"Error transforming coordinates: {e}")
-            # Fallback: just remove Z dimension
-            return self._remove_z_dimension(geometry)
+        transformed = self._transform_geometries([geometry], source_crs)[0]
+        if transformed is None:
+            raise ValueError("Coordinates could not be transformed to EPSG:4326")
+        return transformed
     
     def _remove_z_dimension(self, geometry):
         """
         Remove Z dimension from geometry coordinates.
         """
-        def remove_z_coords(coords, depth=0):
-            if depth == 0:  # Single coordinate pair
-                return coords[:2] if len(coords) > 2 else coords
-            elif depth == 1:  # Array of coordinate pairs
-                return [remove_z_coords(coord, depth-1) for coord in coords]
-            elif depth == 2:  # Array of arrays (rings)
-                return [remove_z_coords(ring, depth-1) for ring in coords]
-            elif depth == 3:  # Array of arrays of arrays (multipolygon)
-                return [remove_z_coords(polygon, depth-1) for polygon in coords]
+        return self._transform_geometries([geometry], None)[0]
+    
+    def _transform_geometries(self, geometries, source_crs):
+        """
+        Transform a batch of GeoJSON geometries to 2D WGS84 in one vectorized call.
+        Coordinates of all geometries are flattened into NumPy x/y arrays, transformed once
+        with the cached transformer and rebuilt from per-geometry offsets. With no source CRS
+        (or EPSG:4326) the same path only strips the Z dimension.
+        Returns a list aligned with the input, holding None for geometries that failed.
+        """
+        xs = []
+        ys = []
+        layouts = []
         
-        geom_type = geometry['type']
-        coords = geometry['coordinates']
+        for geometry in geometries:
+            try:
+                depth = GEOMETRY_COORD_DEPTH[geometry['type']]
+                start = len(xs)
+                shape = self._flatten_coords(geometry['coordinates'], depth, xs, ys)
+                layouts.append((depth, shape, start, len(xs)))
+            except (KeyError, TypeError, IndexError):
+                # Unsupported type (e.g. GeometryCollection) or malformed coordinates: pass through
+                layouts.append(None)
         
-        if geom_type == 'Point':
-            geometry['coordinates'] = remove_z_coords(coords, 0)
-        elif geom_type in ['LineString', 'MultiPoint']:
-            geometry['coordinates'] = remove_z_coords(coords, 1)
-        elif geom_type in ['Polygon', 'MultiLineString']:
-            geometry['coordinates'] = remove_z_coords(coords, 2)
-        elif geom_type == 'MultiPolygon':
-            geometry['coordinates'] = remove_z_coords(coords, 3)
+        if not xs:
+            return [geometry if layout is None else None for geometry, layout in zip(geometries, layouts)]
+        
+        x_array = np.asarray(xs, dtype=float)
+        y_array = np.asarray(ys, dtype=float)
+        
+        if source_crs and source_crs != "EPSG:4326":
+            try:
+                x_array, y_array = self._get_transformer(source_crs).transform(x_array, y_array)
+            except Exception as e:
+                logger.error(f"Error transforming coordinates: {e}")
+                return [None] * len(geometries)
         
-        return geometry
+        finite = np.isfinite(x_array) & np.isfinite(y_array)
+        points = np.column_stack((x_array, y_array))
+        
+        results = []
+        for geometry, layout in zip(geometries, layouts):
+            if layout is None:
+                results.append(geometry)
+                continue
+            
+            depth, shape, start, end = layout
+            if start == end or not finite[start:end].all():
+                results.append(None)
+                continue
+            
+            coordinates, _ = self._rebuild_coords(shape, depth, points, start)
+            results.append({'type': geometry['type'], 'coordinates': coordinates})
+        
+        return results
+    
+    def _flatten_coords(self, coords, depth, xs, ys):
+        """
+        Append the x/y values of nested coordinates to xs/ys and return the nesting shape:
+        None for a single position, a vertex count for a position list, or a list of sub-shapes.
+        """
+        if depth == 0:
+            xs.append(coords[0])
+            ys.append(coords[1])
+            return None
+        if depth == 1:
+            xs.extend(coord[0] for coord in coords)
+            ys.extend(coord[1] for coord in coords)
+            return len(coords)
+        return [self._flatten_coords(part, depth - 1, xs, ys) for part in coords]
+    
+    def _rebuild_coords(self, shape, depth, points, offset):
+        """Rebuild nested coordinate lists from a flattened point array. Returns (coords, next_offset)."""
+        if depth == 0:
+            return points[offset].tolist(), offset + 1
+        if depth == 1:
+            return points[offset:offset + shape].tolist(), offset + shape
+        
+        parts = []
+        for sub_shape in shape:
+            part, offset = self._rebuild_coords(sub_shape, depth - 1, points, offset)
+            parts.append(part)
+        return parts, offset
     
     def _process_geojson(self, file_path, project, layer_name, created_by, s3_file_key, title):
         """
         Processes a GeoJSON file: reads its features, creates a VectorLayer and VectorFeature entries
         in the database, and publishes the layer to GeoServer.
+        The file is streamed twice (a scan pass and a load pass) so memory use does not grow with its size.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                geojson_data = json.load(f)
-            
-            features = geojson_data.get('features', [])
-            if not features:
+            # First pass: count, geometry type, raw bounds and a small sample for CRS detection
+            scan = self._scan_geojson(file_path)
+            if not scan['feature_count']:
                 raise ValueError("The uploaded GeoJSON file contains no features")
             
-            logger.info(f"Processing {len(features)} features")
+            logger.info(f"Processing {scan['feature_count']} features")
             
             # Detect coordinate system
-            source_crs = self._detect_coordinate_system(features)
+            source_crs = self._detect_coordinate_system(scan['sample_features'])
             logger.info(f"Detected coordinate system: {source_crs}")
             
-            # Transform features to WGS84 and remove Z dimension
-            transformed_features = []
-            for i, feature in enumerate(features):
-                try:
-                    geometry = feature['geometry'].copy()
-                    transformed_geometry = self._transform_geometry(geometry, source_crs)
-                    
-                    transformed_feature = feature.copy()
-                    transformed_feature['geometry'] = transformed_geometry
-                    transformed_features.append(transformed_feature)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to transform feature {i}: {e}")
-                    continue
-            
-            if not transformed_features:
+            geometry_type = self._resolve_geometry_type(scan['geometry_types'])
+            if not geometry_type:
                 raise ValueError("No valid features after coordinate transformation")
             
-            logger.info(f"Successfully transformed {len(transformed_features)} features")
-            
-            # Determine geometry type from first feature
-            first_geom = transformed_features[0]['geometry']
-            geometry_type = first_geom['type']
-            
-            # Calculate bounding box from transformed features
-            bbox = self._calculate_bbox_from_features(transformed_features)
-            
-            # Create vector layer with temporary name first to get the ID
-            temp_layer = VectorLayer.objects.create(
-                name="temp_layer",  # Temporary name
-                title=title or layer_name,  # Store original name in title
-                geometry_type=geometry_type,
-                project=project,
-                created_by=created_by,
-                s3_file_key=s3_file_key,
-                feature_count=len(transformed_features),
-                bbox=bbox
-            )
-            
-            # Generate unique name using the ID to avoid conflicts
-            unique_name = f"vector_layer_{temp_layer.id.hex}"
+            # Calculate bounding box from the scanned source bounds
+            bbox = self._transform_bounds_to_bbox(scan['bounds'], source_crs)
             
-            # Ensure it fits database field constraints (database column is 200 chars)
-            # Django model says 255 but actual DB column is 200
-            db_max_length = 200  # Actual database column limit
-            if len(unique_name) > db_max_length:
-                unique_name = unique_name[:db_max_length]
-                logger.warning(f"Truncated layer name to fit database column: {unique_name}")
+            temp_layer = self._create_layer_record(
+                project, layer_name, created_by, s3_file_key, title,
+                geometry_type, scan['feature_count'], bbox
+            )
             
-            # Update with the unique name
-            temp_layer.name = unique_name
-            temp_layer.save()
+            # Second pass: transform features in fixed-size batches into a staging table,
+            # then validate and load them set-wise in PostGIS
+            self._create_staging_table(temp_layer)
+            try:
+                self._load_geojson_features(file_path, source_crs, temp_layer)
+                created_count = self._load_staged_features(temp_layer)
+            finally:
+                self._drop_staging_table(temp_layer)
             
-            logger.info(f"Created vector layer with unique name: {unique_name} (original: {layer_name})")
+            if not created_count:
+                temp_layer.delete()
+                raise ValueError("No valid features found in the uploaded file after transformation")
             
-            # Create features in database
-            self._create_features_from_geojson(transformed_features, temp_layer)
+            # Exact count and extent of what was actually stored, computed by PostGIS
+            recalculate_layer_stats(temp_layer)
+            refresh_attribute_catalog(temp_layer)
             
             # Create database table for GeoServer and publish
             self._create_and_publish_layer(temp_layer)
@@ -284,71 +360,562 @@ class VectorDataProcessor:
             logger.error(f"Error processing GeoJSON: {e}")
             raise
     
-    def _create_features_from_geojson(self, features, vector_layer):
+    def _process_shapefile_zip(self, file_path, project, layer_name, created_by, s3_file_key, title):
         """
-        Creates VectorFeature objects from a list of GeoJSON features and associates them with a VectorLayer.
+        Extracts a zipped Shapefile next to the download and ingests it through Fiona.
         """
-        features_to_create = []
-        skipped_features = 0
+        extract_dir = os.path.join(os.path.dirname(file_path), 'extracted')
         
-        # Log a sample of coordinates to understand the data format
-        if features:
-            sample_feature = features[0]
-            logger.info(f"Sample transformed feature geometry: {sample_feature.get('geometry', {})}")
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                archive.extractall(extract_dir)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"The uploaded ZIP archive could not be read: {e}")
         
-        for i, feature in enumerate(features):
-            try:
-                geometry_data = feature['geometry']
+        shapefiles = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(extract_dir)
+            for name in names
+            if name.lower().endswith('.shp') and not name.startswith('._')
+        )
+        if not shapefiles:
+            raise ValueError("The uploaded ZIP archive does not contain a Shapefile (.shp)")
+        if len(shapefiles) > 1:
+            logger.warning(f"ZIP archive contains {len(shapefiles)} Shapefiles, using {os.path.basename(shapefiles[0])}")
+        
+        return self._process_fiona_file(shapefiles[0], project, layer_name, created_by, s3_file_key, title)
+    
+    def _process_fiona_file(self, file_path, project, layer_name, created_by, s3_file_key, title):
+        """
+        Processes any OGR dataset Fiona can read (Shapefile, GeoPackage, FlatGeobuf, KML):
+        takes the CRS from the dataset metadata, streams records in batches through the same
+        writer as GeoJSON uploads and publishes the layer to GeoServer.
+        """
+        try:
+            layers = fiona.listlayers(file_path)
+            if len(layers) > 1:
+                logger.warning(f"Dataset contains {len(layers)} layers, using '{layers[0]}'")
+            
+            with fiona.open(file_path, layer=layers[0] if layers else None) as src:
+                feature_count = len(src)
+                if not feature_count:
+                    raise ValueError("The uploaded file contains no features")
                 
-                # Try to create geometry
-                try:
-                    geom = GEOSGeometry(json.dumps(geometry_data), srid=4326)
-                    
-                    # Check if geometry is valid
-                    if not geom.valid:
-                        logger.warning(f"Feature {i}: Invalid geometry - {geom.valid_reason}")
-                        skipped_features += 1
-                        continue
-                        
-                except Exception as geom_error:
-                    logger.warning(f"Feature {i}: Failed to create geometry - {geom_error}")
-                    skipped_features += 1
-                    continue
-                    
-                attributes = feature.get('properties', {})
+                logger.info(f"Processing {feature_count} features from {src.driver} dataset")
                 
-                # Handle None values and convert to serializable types
-                clean_attributes = {}
-                for key, value in attributes.items():
-                    if value is None:
-                        clean_attributes[key] = None
-                    elif isinstance(value, (int, float, str, bool)):
-                        clean_attributes[key] = value
-                    else:
-                        clean_attributes[key] = str(value)
+                source_crs = self._get_dataset_crs(src)
+                logger.info(f"Dataset coordinate system: {source_crs}")
                 
-                features_to_create.append(
-                    VectorFeature(
-                        layer=vector_layer,
-                        geom=geom,
-                        attributes=clean_attributes
-                    )
+                # Shapefile schemas report 'Polygon' for multipart data, so the final type is taken from the records
+                geometry_type = self._normalize_schema_geometry_type(src.schema.get('geometry'))
+                bbox = self._transform_bounds_to_bbox(src.bounds, source_crs)
+                
+                temp_layer = self._create_layer_record(
+                    project, layer_name, created_by, s3_file_key, title,
+                    geometry_type or '', feature_count, bbox
                 )
                 
-            except Exception as e:
-                logger.warning(f"Feature {i}: Skipping invalid feature - {e}")
-                skipped_features += 1
+                self._create_staging_table(temp_layer)
+                try:
+                    geometry_types = self._load_fiona_features(src, source_crs, temp_layer)
+                    
+                    # Repairs are cast to the layer type, so settle it before validating
+                    temp_layer.geometry_type = self._resolve_geometry_type(geometry_types) or geometry_type
+                    if not temp_layer.geometry_type:
+                        # Only null geometries and no usable schema type: nothing can be loaded
+                        temp_layer.delete()
+                        raise ValueError("The uploaded file contains no features with a supported geometry type")
+                    temp_layer.save(update_fields=['geometry_type'])
+                    created_count = self._load_staged_features(temp_layer)
+                finally:
+                    self._drop_staging_table(temp_layer)
+            
+            if not created_count:
+                temp_layer.delete()
+                raise ValueError("No valid features found in the uploaded file after transformation")
+            
+            recalculate_layer_stats(temp_layer)
+            refresh_attribute_catalog(temp_layer)
+            
+            # Create database table for GeoServer and publish
+            self._create_and_publish_layer(temp_layer)
+            
+            return temp_layer
+            
+        except Exception as e:
+            logger.error(f"Error processing vector dataset: {e}")
+            raise
+    
+    def _get_dataset_crs(self, src):
+        """
+        Return the source CRS of a Fiona collection from its .prj/metadata, as an EPSG code
+        when one matches and as WKT otherwise. Falls back to coordinate-range detection only
+        when the dataset carries no CRS at all.
+        """
+        crs_wkt = src.crs_wkt
+        if crs_wkt:
+            try:
+                crs = pyproj.CRS.from_wkt(crs_wkt)
+                epsg = crs.to_epsg()
+                return f"EPSG:{epsg}" if epsg else crs.to_wkt()
+            except pyproj.exceptions.CRSError as e:
+                logger.warning(f"Could not parse dataset CRS, falling back to detection: {e}")
+        
+        logger.warning("Dataset has no CRS information, detecting from coordinates")
+        sample_features = []
+        for record in src:
+            if record.geometry is not None:
+                sample_features.append(fiona.model.to_dict(record))
+            if len(sample_features) >= self.CRS_SAMPLE_SIZE:
+                break
+        return self._detect_coordinate_system(sample_features)
+    
+    def _normalize_schema_geometry_type(self, schema_type):
+        """Map a Fiona schema geometry type ('3D Polygon', 'Unknown', ...) onto the layer choices."""
+        if not schema_type:
+            return None
+        schema_type = schema_type.replace('3D ', '')
+        valid_types = [choice[0] for choice in VectorLayer.GEOMETRY_TYPE_CHOICES]
+        return schema_type if schema_type in valid_types else None
+    
+    def _load_fiona_features(self, src, source_crs, vector_layer):
+        """
+        Stream records from an open Fiona collection into the layer's staging table in batches
+        of INGEST_BATCH_SIZE. Returns the geometry types seen.
+        """
+        staged_count = 0
+        geometry_types = []
+        batch = []
+        batch_start = 0
+        
+        for i, record in enumerate(src):
+            feature = fiona.model.to_dict(record)
+            if feature.get('geometry'):
+                geometry_type = feature['geometry']['type']
+                if geometry_type not in geometry_types:
+                    geometry_types.append(geometry_type)
+            batch.append(feature)
+            
+            if len(batch) >= self.INGEST_BATCH_SIZE:
+                staged_count += self._write_feature_batch(batch, source_crs, vector_layer, batch_start)
+                batch_start = i + 1
+                batch = []
+        
+        if batch:
+            staged_count += self._write_feature_batch(batch, source_crs, vector_layer, batch_start)
+        
+        logger.info(f"Staged {staged_count} features")
+        return geometry_types
+    
+    def _create_layer_record(self, project, layer_name, created_by, s3_file_key, title,
+                             geometry_type, feature_count, bbox):
+        """
+        Create the VectorLayer row for an upload and give it its unique vector_layer_<hex> name.
+        """
+        # Create vector layer with temporary name first to get the ID
+        temp_layer = VectorLayer.objects.create(
+            name="temp_layer",  # Temporary name
+            title=title or layer_name,  # Store original name in title
+            geometry_type=geometry_type,
+            project=project,
+            created_by=created_by,
+            s3_file_key=s3_file_key,
+            feature_count=feature_count,
+            bbox=bbox
+        )
+        
+        # Generate unique name using the ID to avoid conflicts
+        unique_name = f"vector_layer_{temp_layer.id.hex}"
+        
+        # Ensure it fits database field constraints (database column is 200 chars)
+        # Django model says 255 but actual DB column is 200
+        db_max_length = 200  # Actual database column limit
+        if len(unique_name) > db_max_length:
+            unique_name = unique_name[:db_max_length]
+            logger.warning(f"Truncated layer name to fit database column: {unique_name}")
+        
+        # Update with the unique name
+        temp_layer.name = unique_name
+        temp_layer.save()
+        
+        logger.info(f"Created vector layer with unique name: {unique_name} (original: {layer_name})")
+        
+        return temp_layer
+    
+    def _iter_geojson_features(self, file_path):
+        """Yield the features of a GeoJSON FeatureCollection one at a time."""
+        with open(file_path, 'rb') as f:
+            for feature in ijson.items(f, 'features.item', use_float=True):
+                yield feature
+    
+    def _scan_geojson(self, file_path):
+        """
+        Streaming pass over a GeoJSON file that keeps only aggregates: feature count,
+        geometry types, source-CRS bounds and the first few features for CRS detection.
+        """
+        feature_count = 0
+        geometry_types = []
+        sample_features = []
+        min_x = min_y = float('inf')
+        max_x = max_y = float('-inf')
+        
+        for feature in self._iter_geojson_features(file_path):
+            geometry = feature.get('geometry')
+            if not geometry or not geometry.get('type'):
+                continue
+            
+            feature_count += 1
+            if geometry['type'] not in geometry_types:
+                geometry_types.append(geometry['type'])
+            if len(sample_features) < self.CRS_SAMPLE_SIZE:
+                sample_features.append(feature)
+            
+            try:
+                coords = self._extract_all_coordinates(geometry)
+            except (KeyError, TypeError):
                 continue
+            
+            for coord in coords:
+                if len(coord) >= 2:
+                    min_x = min(min_x, coord[0])
+                    max_x = max(max_x, coord[0])
+                    min_y = min(min_y, coord[1])
+                    max_y = max(max_y, coord[1])
+        
+        bounds = (min_x, min_y, max_x, max_y) if min_x != float('inf') else None
+        return {
+            'feature_count': feature_count,
+            'geometry_types': geometry_types,
+            'bounds': bounds,
+            'sample_features': sample_features,
+        }
+    
+    def _resolve_geometry_type(self, geometry_types):
+        """
+        Pick the layer geometry type from the types seen in a file.
+        Single and multi variants of the same type are promoted to the multi type.
+        """
+        if not geometry_types:
+            return None
+        if len(geometry_types) == 1:
+            return geometry_types[0]
+        
+        for base_type in ('Point', 'LineString', 'Polygon'):
+            if set(geometry_types) <= {base_type, f"Multi{base_type}"}:
+                return f"Multi{base_type}"
+        
+        logger.warning(f"Mixed geometry types {geometry_types}, using {geometry_types[0]}")
+        return geometry_types[0]
+    
+    def _transform_bounds_to_bbox(self, bounds, source_crs):
+        """Build a WGS84 bbox polygon from (min_x, min_y, max_x, max_y) bounds in the source CRS."""
+        if not bounds:
+            return None
+        
+        min_x, min_y, max_x, max_y = bounds
+        if source_crs and source_crs != "EPSG:4326":
+            try:
+                min_x, min_y, max_x, max_y = self._get_transformer(source_crs).transform_bounds(min_x, min_y, max_x, max_y)
+            except Exception as e:
+                logger.error(f"Error transforming bounds: {e}")
+                return None
+        
+        return Polygon.from_bbox((min_x, min_y, max_x, max_y)) if min_x <= max_x and min_y <= max_y else None
+    
+    def _load_geojson_features(self, file_path, source_crs, vector_layer):
+        """
+        Stream features from a GeoJSON file, transform them to WGS84 and write them to the
+        layer's staging table in batches of INGEST_BATCH_SIZE. Returns the number of rows staged.
+        """
+        staged_count = 0
+        batch = []
+        batch_start = 0
+        
+        for i, feature in enumerate(self._iter_geojson_features(file_path)):
+            batch.append(feature)
+            
+            if len(batch) >= self.INGEST_BATCH_SIZE:
+                staged_count += self._write_feature_batch(batch, source_crs, vector_layer, batch_start)
+                batch_start = i + 1
+                batch = []
+        
+        if batch:
+            staged_count += self._write_feature_batch(batch, source_crs, vector_layer, batch_start)
+        
+        logger.info(f"Staged {staged_count} features")
+        return staged_count
+    
+    def _write_feature_batch(self, features, source_crs, vector_layer, start_index=0):
+        """
+        Reproject one batch of GeoJSON-like features to WGS84 and stage them for validation.
+        Features without a geometry or that fail to reproject are staged as rejected rows.
+        Returns the number of rows staged.
+        """
+        positions = [offset for offset, feature in enumerate(features) if feature.get('geometry')]
+        geometries = self._transform_geometries([features[offset]['geometry'] for offset in positions], source_crs)
+        transformed = dict(zip(positions, geometries))
         
-        if skipped_features > 0:
-            logger.warning(f"Skipped {skipped_features} invalid features out of {len(features)} total")
+        rows = []
+        for offset, feature in enumerate(features):
+            reason = None
+            if offset not in transformed:
+                reason = 'Missing geometry'
+            elif transformed[offset] is None:
+                reason = 'Reprojection failed'
+            rows.append((start_index + offset, transformed.get(offset), feature.get('properties'), reason))
         
-        # Bulk create features
-        if features_to_create:
-            VectorFeature.objects.bulk_create(features_to_create, batch_size=1000)
-            logger.info(f"Created {len(features_to_create)} valid features")
-        else:
-            raise ValueError("No valid features found in the uploaded file after transformation")
+        return self._stage_features(vector_layer, rows)
+    
+    def _clean_attributes(self, attributes):
+        """Convert feature properties to JSON-serializable values."""
+        clean_attributes = {}
+        for key, value in (attributes or {}).items():
+            if value is None or isinstance(value, (int, float, str, bool)):
+                clean_attributes[key] = value
+            else:
+                clean_attributes[key] = str(value)
+        return clean_attributes
+
+    def _get_staging_table_name(self, vector_layer):
+        """Name of the temporary table an upload is staged in before validation."""
+        return f"ingest_staging_{vector_layer.id.hex}"
+
+    def _create_staging_table(self, vector_layer):
+        """
+        Create the session-local staging table for a layer upload. Raw geometries are loaded
+        here as GeoJSON text so parsing and validation can run set-wise in PostGIS.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMP TABLE {self._get_staging_table_name(vector_layer)} (
+                    row_num bigint,
+                    geom_json text,
+                    attributes jsonb,
+                    geom geometry,
+                    status text,
+                    reason text
+                );
+            """)
+
+    def _drop_staging_table(self, vector_layer):
+        """Drop the staging table of a layer upload."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self._get_staging_table_name(vector_layer)};")
+
+    def _stage_features(self, vector_layer, rows):
+        """
+        Stream (row number, GeoJSON geometry, properties, rejection reason) rows into the
+        staging table with PostgreSQL COPY, one COPY per COPY_BATCH_SIZE rows.
+        Returns the number of rows staged.
+        """
+        staging_table = self._get_staging_table_name(vector_layer)
+        copy_sql = (
+            f"COPY {staging_table} (row_num, geom_json, attributes, status, reason) "
+            f"FROM STDIN WITH (FORMAT csv)"
+        )
+        start_time = time.monotonic()
+        row_count = 0
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        
+        with connection.cursor() as cursor:
+            for row_num, geometry, attributes, reason in rows:
+                # Empty CSV fields load as NULL
+                writer.writerow([
+                    row_num,
+                    json.dumps(geometry) if geometry is not None else None,
+                    json.dumps(self._clean_attributes(attributes)),
+                    'rejected' if reason else None,
+                    reason
+                ])
+                pending += 1
+                
+                if pending >= self.COPY_BATCH_SIZE:
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+                    row_count += pending
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    pending = 0
+            
+            if pending:
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                row_count += pending
+        
+        elapsed = time.monotonic() - start_time
+        rows_per_second = row_count / elapsed if elapsed > 0 else float(row_count)
+        logger.info(
+            f"COPY staged {row_count} features for layer {vector_layer.id} in {elapsed:.2f}s "
+            f"({rows_per_second:.0f} rows/s)"
+        )
+        return row_count
+
+    def _parse_staged_geometries(self, cursor, staging_table):
+        """
+        Parse the staged GeoJSON into geometries with one UPDATE. If any row cannot be parsed
+        the statement fails as a whole, so it is rerun through a per-row guarded function.
+        """
+        try:
+            with transaction.atomic():
+                cursor.execute(f"""
+                    UPDATE {staging_table}
+                    SET geom = ST_Force2D(ST_SetSRID(ST_GeomFromGeoJSON(geom_json), 4326))
+                    WHERE status IS NULL;
+                """)
+            return
+        except DatabaseError as e:
+            logger.warning(f"Bulk geometry parse failed, parsing rows individually: {e}")
+        
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION pg_temp.try_geom_from_geojson(geojson text) RETURNS geometry AS $$
+            BEGIN
+                RETURN ST_Force2D(ST_SetSRID(ST_GeomFromGeoJSON(geojson), 4326));
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute(f"""
+            UPDATE {staging_table}
+            SET geom = pg_temp.try_geom_from_geojson(geom_json)
+            WHERE status IS NULL;
+        """)
+
+    def _load_staged_features(self, vector_layer):
+        """
+        Validate the staged rows set-wise and move the accepted ones into the layer.
+        
+        Unreadable and empty geometries are rejected. Invalid geometries are repaired with
+        ST_MakeValid (keeping only parts of the original dimension) when repair_invalid is set,
+        rejected otherwise. A summary is stored in VectorLayer.ingest_report and every rejected
+        or repaired row is written to a CSV report on S3.
+        Returns the number of features loaded.
+        """
+        staging_table = self._get_staging_table_name(vector_layer)
+        start_time = time.monotonic()
+        
+        repair_sql = "ST_CollectionExtract(ST_MakeValid(geom), CASE ST_Dimension(geom) WHEN 0 THEN 1 WHEN 1 THEN 2 ELSE 3 END)"
+        if vector_layer.geometry_type.startswith('Multi'):
+            repair_sql = f"ST_Multi({repair_sql})"
+        
+        with connection.cursor() as cursor:
+            self._parse_staged_geometries(cursor, staging_table)
+            
+            cursor.execute(f"""
+                UPDATE {staging_table}
+                SET status = 'rejected',
+                    reason = CASE WHEN geom IS NULL THEN 'Unreadable geometry' ELSE 'Empty geometry' END
+                WHERE status IS NULL AND (geom IS NULL OR ST_IsEmpty(geom));
+            """)
+            cursor.execute(f"""
+                UPDATE {staging_table}
+                SET status = 'invalid', reason = ST_IsValidReason(geom)
+                WHERE status IS NULL AND NOT ST_IsValid(geom);
+            """)
+            
+            if self.repair_invalid:
+                cursor.execute(f"""
+                    UPDATE {staging_table}
+                    SET geom = {repair_sql}, status = 'repaired'
+                    WHERE status = 'invalid';
+                """)
+                cursor.execute(f"""
+                    UPDATE {staging_table}
+                    SET status = 'rejected', reason = reason || ' (repair failed)'
+                    WHERE status = 'repaired' AND (geom IS NULL OR ST_IsEmpty(geom) OR NOT ST_IsValid(geom));
+                """)
+            else:
+                cursor.execute(f"UPDATE {staging_table} SET status = 'rejected' WHERE status = 'invalid';")
+            
+            # Write straight into the layer partition when the table is partitioned,
+            # building the simplified LOD geometries in the same pass
+            feature_table = get_feature_table_for_layer(vector_layer.id, cursor)
+            lod_columns, lod_select, lod_params = get_lod_insert_sql(vector_layer)
+            cursor.execute(f"""
+                INSERT INTO {feature_table} (id, layer_id, geom{lod_columns}, attributes, created_at, updated_at)
+                SELECT gen_random_uuid(), %s, geom{lod_select}, attributes, now(), now()
+                FROM {staging_table}
+                WHERE status IS NULL OR status = 'repaired'
+                ORDER BY row_num;
+            """, [str(vector_layer.id)] + lod_params)
+            loaded_count = cursor.rowcount
+            
+            report = self._build_ingest_report(cursor, staging_table, vector_layer)
+        
+        report['loaded'] = loaded_count
+        vector_layer.ingest_report = report
+        vector_layer.save(update_fields=['ingest_report'])
+        
+        elapsed = time.monotonic() - start_time
+        logger.info(
+            f"Loaded {loaded_count} features for layer {vector_layer.id} in {elapsed:.2f}s "
+            f"({report['repaired']} repaired, {report['rejected']} rejected)"
+        )
+        return loaded_count
+
+    def _build_ingest_report(self, cursor, staging_table, vector_layer):
+        """
+        Summarise the validation outcome of a staged upload and upload the per-row
+        CSV report of rejected and repaired features to S3.
+        """
+        cursor.execute(f"SELECT status, COUNT(*) FROM {staging_table} GROUP BY status;")
+        counts = {status: count for status, count in cursor.fetchall()}
+        
+        report = {
+            'total': sum(counts.values()),
+            'repaired': counts.get('repaired', 0),
+            'rejected': counts.get('rejected', 0),
+            'repair_invalid': self.repair_invalid,
+            'reasons': {},
+            'rejected_sample': [],
+            'report_s3_key': None,
+        }
+        if not report['repaired'] and not report['rejected']:
+            return report
+        
+        # ST_IsValidReason appends the location, e.g. "Self-intersection[10 20]"
+        cursor.execute(f"""
+            SELECT split_part(reason, '[', 1) AS kind, COUNT(*)
+            FROM {staging_table}
+            WHERE status IN ('rejected', 'repaired')
+            GROUP BY kind
+            ORDER BY COUNT(*) DESC;
+        """)
+        report['reasons'] = {kind: count for kind, count in cursor.fetchall()}
+        
+        cursor.execute(f"""
+            SELECT row_num, reason FROM {staging_table}
+            WHERE status = 'rejected'
+            ORDER BY row_num
+            LIMIT %s;
+        """, [self.INGEST_REPORT_SAMPLE_SIZE])
+        report['rejected_sample'] = [{'row': row_num, 'reason': reason} for row_num, reason in cursor.fetchall()]
+        
+        buffer = io.StringIO()
+        cursor.copy_expert(f"""
+            COPY (
+                SELECT row_num, status, reason, attributes FROM {staging_table}
+                WHERE status IN ('rejected', 'repaired')
+                ORDER BY row_num
+            ) TO STDOUT WITH (FORMAT csv, HEADER)
+        """, buffer)
+        
+        report_key = f"{getattr(settings, 'VECTOR_INGEST_REPORT_S3_PREFIX', 'ingest_reports/vector_layers')}/{vector_layer.id}.csv"
+        try:
+            self.s3_client.put_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=report_key,
+                Body=buffer.getvalue().encode('utf-8'),
+                ContentType='text/csv'
+            )
+            report['report_s3_key'] = report_key
+        except Exception as e:
+            logger.error(f"Error uploading ingest report for layer {vector_layer.id}: {e}")
+        
+        return report
 
     def _extract_all_coordinates(self, geometry):
         """Extract all coordinate pairs from any geometry type."""
@@ -369,87 +936,15 @@ class VectorDataProcessor:
         
         return coords
 
-    def _calculate_bbox_from_features(self, geojson_features):
-        """Calculate bounding box from GeoJSON features."""
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-        
-        for feature in geojson_features:
-            geom = feature['geometry']
-            coords = self._extract_all_coordinates(geom)
-            
-            for coord in coords:
-                if len(coord) >= 2:
-                    min_x = min(min_x, coord[0])
-                    max_x = max(max_x, coord[0])
-                    min_y = min(min_y, coord[1])
-                    max_y = max(max_y, coord[1])
-        
-        if min_x != float('inf'):
-            # Create a polygon representing the bounding box
-            bbox_coords = [
-                [min_x, min_y],
-                [max_x, min_y], 
-                [max_x, max_y],
-                [min_x, max_y],
-                [min_x, min_y]
-            ]
-            return Polygon(bbox_coords, srid=4326)
-        
-        return None
-
     # Add all the other methods from the previous code (they remain the same)
-    # def _create_and_publish_layer(self, vector_layer):
-    #     """
-    #     Creates PostGIS table and publishes layer to GeoServer immediately.
-    #     """
-    #     try:
-    #         # Create database table for GeoServer
-    #         table_name = self._create_postgis_table(vector_layer)
-    #         logger.info(f"PostGIS table {table_name} created successfully")
-            
-    #         # Publish to GeoServer immediately with the clean layer name
-    #         success, geoserver_url = self.geoserver_manager.publish_layer_to_group(
-    #             company_id=vector_layer.project.company.id,
-    #             project_id=vector_layer.project.id,
-    #             layer_name=vector_layer.name,  # Use clean layer name, not UUID
-    #             layer_type='vector_layers',
-    #             table_name=table_name  # This is the UUID-based table name
-    #         )
-            
-    #         if success:
-    #             # Update vector layer with GeoServer information
-    #             vector_layer.geoserver_layer_name = vector_layer.name  # Clean name like "test_restaurants"
-    #             vector_layer.geoserver_url = geoserver_url
-    #             vector_layer.is_published = True
-    #             vector_layer.save()
-                
-    #             logger.info(f"Successfully published vector layer '{vector_layer.name}' to GeoServer")
-    #             logger.info(f"GeoServer layer name: {vector_layer.geoserver_layer_name}")
-    #             logger.info(f"GeoServer WMS URL: {vector_layer.geoserver_url}")
-                
-    #             # Test the layer by making a GetCapabilities request
-    #             self._verify_geoserver_layer(vector_layer)
-                
-    #         else:
-    #             logger.error(f"Failed to publish vector layer {vector_layer.name} to GeoServer: {geoserver_url}")
-    #             # Don't raise exception, layer is still created in database
-                        
-    #     except Exception as e:
-    #         logger.error(f"Error creating and publishing layer: {e}")
-    #         import traceback
-    #         logger.error(f"Traceback: {traceback.format_exc()}")
-    #         # Don't raise the exception here as the vector layer is still created
-
-
     def _create_and_publish_layer(self, vector_layer):
         """
-        Creates PostGIS table and publishes layer to GeoServer with safe naming.
+        Creates the PostGIS view and publishes layer to GeoServer with safe naming.
         """
         try:
-            # Create database table for GeoServer
-            table_name = self._create_postgis_table(vector_layer)
-            logger.info(f"PostGIS table {table_name} created successfully")
+            # Create database view for GeoServer
+            table_name = self._create_layer_view(vector_layer)
+            logger.info(f"PostGIS view {table_name} created successfully")
             
             # **Use the unique layer name (already safe from create_vector_layer)**
             layer_name = vector_layer.name  # This is already vec_<uuid> format
@@ -477,9 +972,6 @@ class VectorDataProcessor:
                 logger.info(f"GeoServer layer name: {vector_layer.geoserver_layer_name}")
                 logger.info(f"GeoServer WFS URL: {vector_layer.geoserver_url}")
                 
-                # Test the layer
-                self._verify_geoserver_layer(vector_layer)
-                
             else:
                 logger.error(f"Failed to publish vector layer {layer_name} to GeoServer: {geoserver_url}")
                         
@@ -490,71 +982,79 @@ class VectorDataProcessor:
 
 
 
-    def _create_postgis_table(self, vector_layer):
-        """Create PostGIS table for GeoServer to use"""
-        table_name = f"vector_layer_{vector_layer.id.hex}"
+    def _create_and_publish_layers(self, vector_layers):
+        """
+        Creates the PostGIS views for several layers of one project and publishes them
+        to GeoServer, updating the project layer group once for the whole batch.
+        """
+        if not vector_layers:
+            return
         
         try:
-            with connection.cursor() as cursor:
-                # Drop table if exists (for testing)
-                cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
-                
-                # Create table with proper geometry column (2D only)
-                cursor.execute(f"""
-                    CREATE TABLE {table_name} (
-                        id SERIAL PRIMARY KEY,
-                        geom GEOMETRY(GEOMETRY, 4326),
-                        attributes JSONB
-                    );
-                """)
+            project = vector_layers[0].project
+            views = [(layer.name, self._create_layer_view(layer)) for layer in vector_layers]
+            logger.info(f"Created {len(views)} PostGIS views for project {project.id}")
+            
+            results = self.geoserver_manager.publish_layers_to_group(
+                company_id=project.company.id,
+                project_id=project.id,
+                layers=views,
+                layer_type='vector_layers'
+            )
+            
+            for vector_layer in vector_layers:
+                success, geoserver_url = results.get(vector_layer.name, (False, None))
+                if not success:
+                    logger.error(f"Failed to publish vector layer {vector_layer.name} to GeoServer: {geoserver_url}")
+                    continue
                 
-                # Create spatial index
-                cursor.execute(f"""
-                    CREATE INDEX {table_name}_geom_idx 
-                    ON {table_name} USING GIST (geom);
-                """)
+                vector_layer.geoserver_layer_name = vector_layer.name[:200]
+                vector_layer.geoserver_url = geoserver_url
+                vector_layer.is_published = True
+                vector_layer.save(update_fields=['geoserver_layer_name', 'geoserver_url', 'is_published', 'updated_at'])
+            
+            logger.info(f"Published {sum(1 for success, _ in results.values() if success)}/{len(vector_layers)} vector layers to GeoServer")
+            
+        except Exception as e:
+            logger.error(f"Error creating and publishing layers: {e}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+
+    def _create_layer_view(self, vector_layer):
+        """
+        Create the vector_layer_<hex> view GeoServer publishes for a layer.
+        The view selects the layer's rows from the VectorFeature table, so features are
+        stored once and edits made through the API are visible to GeoServer immediately.
+        """
+        view_name = get_layer_view_name(vector_layer)
+        
+        try:
+            with connection.cursor() as cursor:
+                # Replaces both an earlier view and a legacy per-layer table
+                drop_layer_relation(cursor, view_name)
                 
-                # Create index on attributes for better performance
                 cursor.execute(f"""
-                    CREATE INDEX {table_name}_attributes_idx 
-                    ON {table_name} USING GIN (attributes);
-                """)
+                    CREATE VIEW {view_name} AS
+                    SELECT id, geom, attributes
+                    FROM {VectorFeature._meta.db_table}
+                    WHERE layer_id = %s;
+                """, [str(vector_layer.id)])
                 
-                # Insert features
-                features = vector_layer.features.all()
-                logger.info(f"Inserting {len(features)} features into table {table_name}")
-                
-                for feature in features:
-                    # Ensure geometry is 2D
-                    geom_wkt = feature.geom.wkt
-                    cursor.execute(f"""
-                        INSERT INTO {table_name} (geom, attributes)
-                        VALUES (ST_Force2D(ST_GeomFromText(%s, 4326)), %s);
-                    """, [geom_wkt, json.dumps(feature.attributes)])
-                
-                # Verify table creation and data
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
-                count = cursor.fetchone()[0]
-                logger.info(f"Table {table_name} created successfully with {count} features")
+                logger.info(f"View {view_name} created for layer {vector_layer.id}")
             
-            return table_name
+            return view_name
             
         except Exception as e:
-            logger.error(f"Error creating PostGIS table: {e}")
+            logger.error(f"Error creating PostGIS view: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    # Include all other methods from the previous implementation...
-    def _verify_geoserver_layer(self, vector_layer):
-        """Verify that the layer was successfully published to GeoServer by testing WMS GetCapabilities."""
-        # Implementation remains the same as before
-        pass
-
     def republish_layer(self, vector_layer):
-        """Republish an existing vector layer to GeoServer."""
-        # Implementation remains the same as before  
-        pass
+        """Recreate the PostGIS view of an existing vector layer, republish it to GeoServer and drop its cached tiles."""
+        self._create_and_publish_layer(vector_layer)
+        bump_tile_version(vector_layer)
+        return vector_layer.is_published
 
 
 
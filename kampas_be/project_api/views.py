@@ -7,11 +7,19 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from .models import Project, GroupType, GroupTag, CoordinateReferenceSystem, VectorLayer, VectorFeature, StreetImage, TerrainModel
 
-from .vector_layer_utils import create_vector_layer, update_vector_layer, update_feature_geometry, merge_vector_layers, split_layer_by_attribute, create_empty_layer, filter_features, get_feature_geojson
+from .layer_metadata_utils import update_layer_metadata
+from .attribute_index_utils import filter_by_attributes, record_attribute_filters
+from .attribute_catalog_utils import schedule_attribute_catalog_refresh
+from .analysis_utils import ANALYSIS_OPERATIONS, OVERLAY_OPERATIONS, JOIN_PREDICATES
+from .cluster_utils import cluster_points, cluster_feature, should_cluster
+from .lod_utils import choose_lod_field, describe_lod, with_lod_geometry, apply_lod_geometry, refresh_feature_lods
+from .vector_layer_utils import create_vector_layer, update_vector_layer, update_feature_geometry, create_empty_layer, filter_features, get_feature_geojson, stream_features_geojson, apply_feature_batch, SPLIT_MODES
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.text import compress_sequence
 from .geoserver_utils import get_geoserver_manager, GeoServerManager, StreetImageryLayerManager
 from .serializers import (
     ProjectSerializer, GroupTypeSerializer, GroupTagSerializer, 
@@ -21,21 +29,27 @@ from .serializers import (
     StreetImageUploadSerializer, StreetImageryLayerSerializer, TerrainModelSerializer, TerrainModelUpdateSerializer, TerrainModelCreateSerializer
 )
 from .vector_utils import VectorDataProcessor
+from .tile_utils import VectorTileRenderer, get_cached_vector_tile, bump_tile_version, is_valid_tile, parse_tile_fields, MAX_TILE_ZOOM
+from .raster_tile_utils import RasterTileRenderer, RASTER_TILE_FORMATS, get_cached_raster_tile, has_tileable_cog, parse_raster_tile_params
 from kampas_be.company_api.models import Client
 from django.db.models import Q
 from django.db import transaction
-from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.geos import GEOSGeometry, Polygon
 import json
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.utils.dateparse import parse_datetime
+import base64
+import uuid
 from kampas_be.kampas_be.storage_backends import create_project_folder, list_project_files, mark_file_for_deletion
 from celery.result import AsyncResult
 
 from .models import Project, RasterGroupTag, RasterLayer
 from .serializers import RasterGroupTagSerializer, RasterLayerSerializer, RasterLayerCreateSerializer
-from .tasks import process_raster_layer, process_vector_layer, process_bulk_file_uploads, process_street_images_upload, process_terrain_layer
+from .tasks import process_raster_layer, process_vector_layer, process_bulk_file_uploads, process_street_images_upload, process_terrain_layer, merge_vector_layers_task, split_vector_layer_task, split_vector_layer_multi_task, run_spatial_analysis_task
 from kampas_be.project_api.file_upload_utils import FileUploadProcessor
 from .street_image_utils import StreetImageProcessor
 
@@ -598,6 +612,168 @@ class VectorLayerPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+
+class FeatureCursorPagination:
+    """
+    Keyset pagination for feature lists on (created_at, id).
+    Pages are fetched with a row comparison against the edge row of the neighbouring page,
+    so deep pages cost the same as the first one. Uploaded features share created_at
+    timestamps, which is why id is part of the key (DRF's CursorPagination would fall back
+    to OFFSET within those ties).
+    
+    Query params: cursor, page_size, count ('exact' by default, 'estimate' from the planner
+    or 'none'). Offset paging with 'page' is deprecated: the parameter is ignored, the
+    first page is served and the response carries a 'warning'.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_query_param = 'page'
+    
+    def paginate_queryset(self, queryset, request, descending=False):
+        self.request = request
+        self.warning = None
+        if self.page_query_param in request.query_params:
+            self.warning = ("The 'page' parameter is deprecated and ignored. "
+                            "Follow the 'next'/'previous' links or pass 'cursor'.")
+        page_size = self._get_page_size(request)
+        cursor = self._decode_cursor(request.query_params.get(self.cursor_query_param))
+        
+        self.count_mode = request.query_params.get(self.count_query_param, 'exact').lower()
+        if self.count_mode not in ('estimate', 'exact', 'none'):
+            raise ValidationError({'count': "Expected one of 'estimate', 'exact' or 'none'."})
+        self.count = get_queryset_count(queryset, self.count_mode)
+        
+        # A reverse cursor walks back towards the first page; the ordering flips and the
+        # fetched rows are flipped back afterwards
+        reverse = bool(cursor and cursor[2])
+        table = VectorFeature._meta.db_table
+        if descending != reverse:
+            queryset = queryset.order_by('-created_at', '-id')
+            comparison = '<'
+        else:
+            queryset = queryset.order_by('created_at', 'id')
+            comparison = '>'
+        
+        if cursor:
+            queryset = queryset.extra(
+                where=[f'("{table}"."created_at", "{table}"."id") {comparison} (%s, %s)'],
+                params=[cursor[0], cursor[1]]
+            )
+        
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+        
+        self.next_cursor = self._encode_cursor(rows[-1]) if rows and has_next else None
+        self.previous_cursor = self._encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+        return rows
+    
+    def get_paginated_response(self, data, extra=None):
+        payload = {
+            'count': self.count,
+            'count_is_estimate': self.count_mode == 'estimate',
+            'next': self._get_link(self.next_cursor),
+            'previous': self._get_link(self.previous_cursor),
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+        }
+        if self.warning:
+            payload['warning'] = self.warning
+        payload.update(extra or {})
+        payload['results'] = data
+        return Response(payload)
+    
+    def _get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+    
+    def _get_link(self, cursor):
+        if not cursor:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+    
+    def _encode_cursor(self, feature, reverse=False):
+        payload = {'c': feature.created_at.isoformat(), 'i': str(feature.id)}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+    
+    def _decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            created_at = parse_datetime(payload['c'])
+            feature_id = uuid.UUID(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        if created_at is None:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        return created_at, feature_id, reverse
+
+
+def get_queryset_count(queryset, mode='exact'):
+    """
+    Count the rows of a queryset: 'exact' runs COUNT(*), 'estimate' reads the planner's row
+    estimate from EXPLAIN (no scan), 'none' skips counting and returns None.
+    """
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return queryset.count()
+    
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Could not estimate row count, counting exactly: {e}")
+        return queryset.count()
+
+
+def parse_cluster_params(params):
+    """Read the required 'zoom' and optional 'bbox' (minx,miny,maxx,maxy) cluster parameters."""
+    zoom = get_zoom_param(params)
+    if zoom is None:
+        raise ValidationError({'zoom': 'This parameter is required.'})
+    
+    bbox = params.get('bbox')
+    if not bbox:
+        return zoom, None
+    try:
+        bbox = tuple(float(x) for x in bbox.split(','))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise ValidationError({'bbox': 'Invalid bbox format. Expected minx,miny,maxx,maxy'})
+    return zoom, bbox
+
+
+def get_zoom_param(params):
+    """Read the optional 'zoom' parameter used to pick a geometry level of detail."""
+    zoom = params.get('zoom')
+    if zoom in (None, ''):
+        return None
+    try:
+        zoom = int(zoom)
+    except (TypeError, ValueError):
+        raise ValidationError({'zoom': 'Expected an integer zoom level.'})
+    if not 0 <= zoom <= MAX_TILE_ZOOM:
+        raise ValidationError({'zoom': f'Expected a zoom level between 0 and {MAX_TILE_ZOOM}.'})
+    return zoom
+
 # -----------------------------------------------------------------------------
 # VectorLayerAPIView
 # - Handles listing and uploading vector layers within a project.
@@ -830,41 +1006,31 @@ class VectorLayerMergeAPIView(APIView):
                 'error': 'A layer with this name already exists in the project.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if layer1.geometry_type != layer2.geometry_type:
+            return Response({
+                'error': 'Cannot merge layers: Geometry types do not match for merging.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            # Merge layers
-            merged_layer = merge_vector_layers(
-                layer1_id=layer1_id,
-                layer2_id=layer2_id,
+            # Merge layers in the background
+            task = merge_vector_layers_task.delay(
+                layer1_id=str(layer1.id),
+                layer2_id=str(layer2.id),
                 new_layer_name=new_layer_name,
-                created_by=user
+                created_by_id=str(user.id),
+                description=description
             )
             
-            # Update description if provided
-            if description:
-                merged_layer.description = description
-                merged_layer.save()
-
-            # **GENERATE WFS URL**
-            wfs_url = self._get_wfs_url(merged_layer.project.company.id, merged_layer.project.id, merged_layer.geoserver_layer_name)
-            
-            return Response({
-                'message': 'Vector layers merged successfully.',
-                'layer': {
-                    'id': merged_layer.id,
-                    'name': merged_layer.name,  # This is now the unique name
-                    'title': merged_layer.title,  # This is the user-provided name
-                    'geometry_type': merged_layer.geometry_type,
-                    'is_published': merged_layer.is_published,
-                    'layer_name': merged_layer.geoserver_layer_name,
-                    'wfs_url': wfs_url  # **CHANGED FROM wms_url TO wfs_url**
-                }
-            }, status=status.HTTP_201_CREATED)
+            logger.info(f"Started Celery task {task.id} to merge layers {layer1.id} and {layer2.id}")
             
-        except ValueError as e:
-            logger.error(f"ValueError in layer merge: {str(e)}")
             return Response({
-                'error': f'Cannot merge layers: {str(e)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
+                'message': 'Vector layer merge started. Processing will continue in the background.',
+                'task_id': task.id,
+                'status': 'PENDING',
+                'layer_name': new_layer_name,
+                'project_id': project_id,
+                'check_status_url': f'/tasks/{task.id}/status/'
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             logger.error(f"Error merging layers: {e}")
@@ -883,6 +1049,9 @@ class VectorLayerSplitAPIView(APIView):
     """
     /api/projects/<project_id>/vector-layers/split/
     Split a vector layer based on attribute value
+    
+    mode=value (default) copies the features matching attribute_value into one new layer.
+    mode=distinct|grid|polygons creates one layer per attribute value, grid cell or polygon.
     """
     permission_classes = [IsAuthenticated]
     
@@ -895,6 +1064,10 @@ class VectorLayerSplitAPIView(APIView):
                 user in project.managers.all() or user in project.editors.all()):
             return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
         
+        mode = request.data.get('mode', 'value')
+        if mode != 'value':
+            return self._start_multi_split(request, user, project, mode)
+        
         # Validate input
         required_fields = ['layer_id', 'attribute_key', 'attribute_value', 'new_layer_name']
         for field in required_fields:
@@ -918,35 +1091,26 @@ class VectorLayerSplitAPIView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            # Split layer
-            split_layer = split_layer_by_attribute(
-                layer_id=layer_id,
+            # Split layer in the background
+            task = split_vector_layer_task.delay(
+                layer_id=str(layer.id),
                 attribute_key=attribute_key,
                 attribute_value=attribute_value,
                 new_layer_name=new_layer_name,
-                created_by=user
+                created_by_id=str(user.id),
+                description=description
             )
             
-            # Update description if provided
-            if description:
-                split_layer.description = description
-                split_layer.save()
-
-            # **GENERATE WFS URL**
-            wfs_url = self._get_wfs_url(split_layer.project.company.id, split_layer.project.id, split_layer.geoserver_layer_name)
+            logger.info(f"Started Celery task {task.id} to split layer {layer.id}")
             
             return Response({
-                'message': 'Vector layer split successfully.',
-                'layer': {
-                    'id': split_layer.id,
-                    'name': split_layer.name,  # This is now the unique name
-                    'title': split_layer.title,  # This is the user-provided name
-                    'geometry_type': split_layer.geometry_type,
-                    'is_published': split_layer.is_published,
-                    'layer_name': split_layer.geoserver_layer_name,
-                    'wfs_url': wfs_url  # **CHANGED FROM wms_url TO wfs_url**
-                }
-            }, status=status.HTTP_201_CREATED)
+                'message': 'Vector layer split started. Processing will continue in the background.',
+                'task_id': task.id,
+                'status': 'PENDING',
+                'layer_name': new_layer_name,
+                'project_id': project_id,
+                'check_status_url': f'/tasks/{task.id}/status/'
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             logger.error(f"Error splitting layer: {e}")
@@ -954,6 +1118,83 @@ class VectorLayerSplitAPIView(APIView):
                 'error': f'Error splitting layer: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _start_multi_split(self, request, user, project, mode):
+        """Validate a multi-output split request and queue it"""
+        if mode not in SPLIT_MODES:
+            return Response({
+                'error': f"Invalid mode. Use 'value' or one of: {', '.join(SPLIT_MODES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        required_fields = {
+            'distinct': ['layer_id', 'attribute_key'],
+            'grid': ['layer_id', 'cell_size'],
+            'polygons': ['layer_id', 'polygon_layer_id'],
+        }[mode]
+        for field in required_fields:
+            if field not in request.data:
+                return Response({
+                    'error': f'Missing required field: {field}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            layer = VectorLayer.objects.get(id=request.data['layer_id'], project=project, is_active=True)
+        except VectorLayer.DoesNotExist:
+            return Response({
+                'error': 'Layer does not exist or does not belong to this project.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        cell_size = None
+        if mode == 'grid':
+            try:
+                cell_size = float(request.data['cell_size'])
+                if cell_size <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return Response({'error': 'cell_size must be a positive number.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        polygon_layer_id = None
+        if mode == 'polygons':
+            try:
+                polygon_layer = VectorLayer.objects.get(
+                    id=request.data['polygon_layer_id'], project=project, is_active=True
+                )
+            except VectorLayer.DoesNotExist:
+                return Response({
+                    'error': 'Polygon layer does not exist or does not belong to this project.'
+                }, status=status.HTTP_404_NOT_FOUND)
+            if polygon_layer.geometry_type not in ('Polygon', 'MultiPolygon'):
+                return Response({'error': 'polygon_layer_id must reference a polygon layer.'}, status=status.HTTP_400_BAD_REQUEST)
+            polygon_layer_id = str(polygon_layer.id)
+        
+        try:
+            task = split_vector_layer_multi_task.delay(
+                layer_id=str(layer.id),
+                mode=mode,
+                created_by_id=str(user.id),
+                attribute_key=request.data.get('attribute_key'),
+                cell_size=cell_size,
+                polygon_layer_id=polygon_layer_id,
+                name_attribute=request.data.get('name_attribute'),
+                name_prefix=request.data.get('new_layer_name'),
+                description=request.data.get('description', '')
+            )
+            
+            logger.info(f"Started Celery task {task.id} to split layer {layer.id} ({mode})")
+            
+            return Response({
+                'message': 'Vector layer split started. Processing will continue in the background.',
+                'task_id': task.id,
+                'status': 'PENDING',
+                'mode': mode,
+                'project_id': str(project.id),
+                'check_status_url': f'/tasks/{task.id}/status/'
+            }, status=status.HTTP_202_ACCEPTED)
+            
+        except Exception as e:
+            logger.error(f"Error splitting layer: {e}")
+            return Response({
+                'error': f'Error splitting layer: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def _get_wfs_url(self, company_id, project_id, layer_name):
         """Generate WFS GetFeature URL"""
@@ -961,6 +1202,105 @@ class VectorLayerSplitAPIView(APIView):
         geoserver_url = settings.GEOSERVER_URL.rstrip('/')
         return f"{geoserver_url}/{company_id}/wfs?service=WFS&version=1.1.0&request=GetFeature&typeName={company_id}:{layer_name}&outputFormat=application/json"
 
+class VectorLayerAnalysisAPIView(APIView):
+    """
+    /api/projects/<project_id>/vector-layers/analysis/
+    Run a buffer, clip, intersection, dissolve or spatial join on vector layers
+    in the background and publish the result as a new layer
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, project_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        
+        # Check permissions
+        if not (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all()):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        operation = request.data.get('operation')
+        if operation not in ANALYSIS_OPERATIONS:
+            return Response({
+                'error': f"Invalid operation. Use one of: {', '.join(ANALYSIS_OPERATIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        required_fields = ['layer_id']
+        if operation in OVERLAY_OPERATIONS:
+            required_fields.append('overlay_layer_id')
+        if operation == 'buffer':
+            required_fields.append('distance')
+        for field in required_fields:
+            if field not in request.data:
+                return Response({
+                    'error': f'Missing required field: {field}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            layer = VectorLayer.objects.get(id=request.data['layer_id'], project=project, is_active=True)
+            overlay_layer = None
+            if operation in OVERLAY_OPERATIONS:
+                overlay_layer = VectorLayer.objects.get(
+                    id=request.data['overlay_layer_id'], project=project, is_active=True
+                )
+        except VectorLayer.DoesNotExist:
+            return Response({
+                'error': 'One or both layers do not exist or do not belong to this project.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if operation == 'clip' and overlay_layer.geometry_type not in ('Polygon', 'MultiPolygon'):
+            return Response({'error': 'overlay_layer_id must reference a polygon layer for clip.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        distance = None
+        if operation == 'buffer':
+            try:
+                distance = float(request.data['distance'])
+                if distance <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return Response({'error': 'distance must be a positive number of metres.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        predicate = request.data.get('predicate', 'intersects')
+        if operation == 'spatial_join' and predicate not in JOIN_PREDICATES:
+            return Response({
+                'error': f"Invalid predicate. Use one of: {', '.join(JOIN_PREDICATES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        keep_unmatched = request.data.get('keep_unmatched', True)
+        if isinstance(keep_unmatched, str):
+            keep_unmatched = keep_unmatched.lower() in ('true', '1', 'yes')
+        
+        try:
+            task = run_spatial_analysis_task.delay(
+                operation=operation,
+                layer_id=str(layer.id),
+                created_by_id=str(user.id),
+                new_layer_name=request.data.get('new_layer_name'),
+                overlay_layer_id=str(overlay_layer.id) if overlay_layer else None,
+                distance=distance,
+                dissolve_key=request.data.get('dissolve_key') or None,
+                predicate=predicate,
+                keep_unmatched=bool(keep_unmatched),
+                description=request.data.get('description', '')
+            )
+            
+            logger.info(f"Started Celery task {task.id} to run {operation} on layer {layer.id}")
+            
+            return Response({
+                'message': f'Spatial analysis ({operation}) started. Processing will continue in the background.',
+                'task_id': task.id,
+                'status': 'PENDING',
+                'operation': operation,
+                'project_id': str(project.id),
+                'check_status_url': f'/tasks/{task.id}/status/'
+            }, status=status.HTTP_202_ACCEPTED)
+            
+        except Exception as e:
+            logger.error(f"Error starting spatial analysis: {e}")
+            return Response({
+                'error': f'Error starting spatial analysis: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class VectorFeatureListAPIView(APIView):
     """
     /api/projects/<project_id>/vector-layers/<layer_id>/features/
@@ -979,9 +1319,10 @@ class VectorFeatureListAPIView(APIView):
             return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
         
         # Get features for this layer
-        features = VectorFeature.objects.filter(layer=layer)
+        features = VectorFeature.objects.filter(layer=layer).select_related('layer')
         
         # Apply filters if provided
+        bbox_coords = None
         bbox = request.query_params.get('bbox')
         if bbox:
             try:
@@ -1007,19 +1348,30 @@ class VectorFeatureListAPIView(APIView):
                     'error': f'Error parsing bbox: {str(e)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Apply attribute filters
-        for key, value in request.query_params.items():
-            if key.startswith('attr_'):
-                attr_key = key[5:]  # Remove 'attr_' prefix
-                features = features.filter(attributes__contains={attr_key: value})
+        # Apply attribute filters ('attr_' prefix stripped)
+        attribute_filters = {
+            key[5:]: value for key, value in request.query_params.items() if key.startswith('attr_')
+        }
+        if attribute_filters:
+            features = filter_by_attributes(features, attribute_filters)
+            record_attribute_filters(layer, attribute_filters.keys())
+        
+        # Pre-simplified geometry only when the client asks for a zoom level
+        try:
+            lod_field = choose_lod_field(get_zoom_param(request.query_params))
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        features = with_lod_geometry(features, lod_field)
         
         # Paginate results
-        paginator = PageNumberPagination()
-        paginator.page_size = 100  # Adjust as needed
-        paginated_features = paginator.paginate_queryset(features, request)
+        paginator = FeatureCursorPagination()
+        try:
+            paginated_features = paginator.paginate_queryset(features, request)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = VectorFeatureSerializer(paginated_features, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        serializer = VectorFeatureSerializer(apply_lod_geometry(paginated_features), many=True)
+        return paginator.get_paginated_response(serializer.data, extra={'lod': describe_lod(lod_field)})
     
     def post(self, request, project_id, layer_id):
         user = request.user
@@ -1060,6 +1412,10 @@ class VectorFeatureListAPIView(APIView):
                 geom=geometry,
                 attributes=attributes
             )
+            update_layer_metadata(layer, added=1, added_extents=[geometry.extent])
+            refresh_feature_lods(layer, [feature.id])
+            bump_tile_version(layer)
+            schedule_attribute_catalog_refresh(layer)
             
             serializer = VectorFeatureSerializer(feature)
             return Response({
@@ -1111,6 +1467,8 @@ class VectorFeatureDetailAPIView(APIView):
             return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
+            old_extent = feature.geom.extent
+            
             # Update geometry if provided
             if 'geometry' in request.data:
                 geometry_data = request.data['geometry']
@@ -1136,6 +1494,12 @@ class VectorFeatureDetailAPIView(APIView):
             
             # Use the utility function to update in PostGIS if needed
             update_feature_geometry(feature_id, feature.geom, feature.attributes)
+            if 'geometry' in request.data:
+                update_layer_metadata(layer, added_extents=[feature.geom.extent], removed_extents=[old_extent])
+                refresh_feature_lods(layer, [feature.id])
+            bump_tile_version(layer)
+            if 'attributes' in request.data:
+                schedule_attribute_catalog_refresh(layer)
             
             serializer = VectorFeatureSerializer(feature)
             return Response({
@@ -1162,7 +1526,11 @@ class VectorFeatureDetailAPIView(APIView):
         
         try:
             # Delete feature
+            old_extent = feature.geom.extent
             feature.delete()
+            update_layer_metadata(layer, removed=1, removed_extents=[old_extent])
+            bump_tile_version(layer)
+            schedule_attribute_catalog_refresh(layer)
             
             return Response({
                 'message': 'Feature deleted successfully.'
@@ -1180,6 +1548,69 @@ class VectorFeatureDetailAPIView(APIView):
                 user in project.managers.all() or user in project.editors.all() or 
                 user in project.viewers.all() or user in project.reviewers.all())
 
+class VectorFeatureBatchAPIView(APIView):
+    """
+    /api/projects/<project_id>/vector-layers/<layer_id>/features/batch/
+    Create, update and delete many features in one transaction
+    
+    Body: {"create": [Feature, ...] | FeatureCollection,
+           "update": [{"id": ..., "geometry": ..., "properties": ...}, ...],
+           "delete": [feature_id, ...]}
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, project_id, layer_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(VectorLayer, id=layer_id, project=project, is_active=True)
+        
+        # Check permissions
+        if not (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all()):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        creates = request.data.get('create') or []
+        if isinstance(creates, dict):
+            creates = creates.get('features') or []
+        updates = request.data.get('update') or []
+        deletes = request.data.get('delete') or []
+        
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            return Response({
+                'error': "'create', 'update' and 'delete' must be lists."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        item_count = len(creates) + len(updates) + len(deletes)
+        max_items = getattr(settings, 'VECTOR_FEATURE_BATCH_MAX_ITEMS', 10000)
+        if not item_count:
+            return Response({'error': 'The batch is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+        if item_count > max_items:
+            return Response({
+                'error': f'A batch may contain at most {max_items} items.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            batch = apply_feature_batch(layer, creates=creates, updates=updates, deletes=deletes)
+            
+            if not batch['applied']:
+                return Response({
+                    'error': 'Batch rejected; no changes were applied.',
+                    'results': batch['results']
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            return Response({
+                'message': 'Feature batch applied successfully.',
+                'summary': batch['summary'],
+                'feature_count': layer.feature_count,
+                'results': batch['results']
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Error applying feature batch: {e}")
+            return Response({
+                'error': f'Error applying feature batch: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # -----------------------------------------------------------------------------
 # VectorLayerDetailAPIView
 # - Handles retrieving, updating, and deleting specific vector layers.
@@ -1273,6 +1704,8 @@ class TaskStatusAPIView(APIView):
             
             if task_result.failed():
                 response_data['error'] = str(task_result.info)
+            elif task_result.status == 'PROGRESS':
+                response_data['progress'] = task_result.info
             
             return Response(response_data, status=status.HTTP_200_OK)
             
@@ -1499,18 +1932,13 @@ class VectorLayerDetailAPIView(APIView):
 
 
 
-class FeaturePagination(PageNumberPagination):
-    page_size = 100
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
-
 class VectorFeatureFilterAPIView(APIView):
     """
     /api/projects/<project_id>/features/filter
     Filter vector features by various criteria
     """
     permission_classes = [IsAuthenticated]
-    pagination_class = FeaturePagination
+    pagination_class = FeatureCursorPagination
     
     def get(self, request, project_id):
         """Filter features by query parameters"""
@@ -1556,28 +1984,36 @@ class VectorFeatureFilterAPIView(APIView):
                 project_id=project_id,
                 company_id=user.company.id
             )
-            
-            # Get total count before pagination
-            total_count = features_qs.count()
+            lod_field = choose_lod_field(get_zoom_param(request.query_params))
+            features_qs = with_lod_geometry(features_qs, lod_field)
             
             if response_format.lower() == 'geojson':
                 # Return GeoJSON format (without pagination for mapping purposes)
                 max_features = int(request.query_params.get('max_features', 1000))
-                limited_features = features_qs[:max_features]
+                limited_features = list(features_qs[:max_features + 1])
+                truncated = len(limited_features) > max_features
+                limited_features = limited_features[:max_features]
+                
+                count_mode = request.query_params.get('count', 'exact')
+                total_count = get_queryset_count(features_qs, count_mode) if truncated else len(limited_features)
                 
                 geojson_data = get_feature_geojson(limited_features)
                 geojson_data['total_count'] = total_count
+                geojson_data['count_is_estimate'] = truncated and count_mode == 'estimate'
                 geojson_data['returned_count'] = len(geojson_data['features'])
+                geojson_data['lod'] = describe_lod(lod_field)
                 
-                if total_count > max_features:
+                if truncated:
                     geojson_data['warning'] = f'Only showing first {max_features} features out of {total_count} total'
                 
                 return Response(geojson_data, status=status.HTTP_200_OK)
             
             else:
-                # Return paginated JSON format
-                paginator = FeaturePagination()
-                paginated_features = paginator.paginate_queryset(features_qs, request)
+                # Return cursor-paginated JSON format
+                paginator = FeatureCursorPagination()
+                paginated_features = apply_lod_geometry(
+                    paginator.paginate_queryset(features_qs, request, descending=True)
+                )
                 
                 # Serialize features
                 features_data = []
@@ -1604,9 +2040,11 @@ class VectorFeatureFilterAPIView(APIView):
                         'attributes': attributes,
                         'project_id': project_id
                     },
-                    'total_count': total_count
-                })
+                    'total_count': paginator.count
+                }, extra={'lod': describe_lod(lod_field)})
                 
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error filtering features: {e}")
             logger.error(f"Full traceback:", exc_info=True)
@@ -1645,28 +2083,36 @@ class VectorFeatureFilterAPIView(APIView):
                 project_id=project_id,
                 company_id=user.company.id
             )
-            
-            # Get total count
-            total_count = features_qs.count()
+            lod_field = choose_lod_field(get_zoom_param(data))
+            features_qs = with_lod_geometry(features_qs, lod_field)
             
             if response_format.lower() == 'geojson':
-                # Return GeoJSON format
-                max_features = data.get('max_features', 1000)
-                limited_features = features_qs[:max_features]
+                # Return GeoJSON format (without pagination for mapping purposes)
+                max_features = int(data.get('max_features', 1000))
+                limited_features = list(features_qs[:max_features + 1])
+                truncated = len(limited_features) > max_features
+                limited_features = limited_features[:max_features]
+                
+                count_mode = data.get('count', 'exact')
+                total_count = get_queryset_count(features_qs, count_mode) if truncated else len(limited_features)
                 
                 geojson_data = get_feature_geojson(limited_features)
                 geojson_data['total_count'] = total_count
+                geojson_data['count_is_estimate'] = truncated and count_mode == 'estimate'
                 geojson_data['returned_count'] = len(geojson_data['features'])
+                geojson_data['lod'] = describe_lod(lod_field)
                 
-                if total_count > max_features:
+                if truncated:
                     geojson_data['warning'] = f'Only showing first {max_features} features out of {total_count} total'
                 
                 return Response(geojson_data, status=status.HTTP_200_OK)
             
             else:
-                # Return paginated JSON format
-                paginator = FeaturePagination()
-                paginated_features = paginator.paginate_queryset(features_qs, request)
+                # Return cursor-paginated JSON format
+                paginator = FeatureCursorPagination()
+                paginated_features = apply_lod_geometry(
+                    paginator.paginate_queryset(features_qs, request, descending=True)
+                )
                 
                 features_data = []
                 for feature in paginated_features:
@@ -1692,9 +2138,11 @@ class VectorFeatureFilterAPIView(APIView):
                         'attributes': attributes,
                         'project_id': project_id
                     },
-                    'total_count': total_count
-                })
+                    'total_count': paginator.count
+                }, extra={'lod': describe_lod(lod_field)})
                 
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error filtering features via POST: {e}")
             logger.error(f"Full traceback:", exc_info=True)
@@ -1709,6 +2157,124 @@ class VectorFeatureFilterAPIView(APIView):
                 user in project.viewers.all() or user in project.reviewers.all())
 
 
+class VectorLayerExportAPIView(APIView):
+    """
+    /api/projects/<project_id>/vector-layers/<layer_id>/export/
+    Stream a layer (optionally filtered by bbox / attr_* params) as a GeoJSON download.
+    Query params: format ('geojson' or 'ndjson'), gzip ('true' for a .gz download).
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, project_id, layer_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(VectorLayer, id=layer_id, project=project, is_active=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        export_format = request.query_params.get('format', 'geojson').lower()
+        if export_format not in ('geojson', 'ndjson'):
+            return Response({
+                'error': "Invalid format. Expected 'geojson' or 'ndjson'."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        use_gzip = request.query_params.get('gzip', 'false').lower() in ('true', '1', 'yes')
+        
+        features = VectorFeature.objects.filter(layer=layer)
+        
+        # Apply filters if provided
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                minx, miny, maxx, maxy = [float(x) for x in bbox.split(',')]
+            except ValueError:
+                return Response({
+                    'error': 'Invalid bbox format. Expected minx,miny,maxx,maxy'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            features = features.filter(geom__intersects=Polygon.from_bbox((minx, miny, maxx, maxy)))
+        
+        attribute_filters = {
+            key[5:]: value for key, value in request.query_params.items() if key.startswith('attr_')
+        }
+        if attribute_filters:
+            features = filter_by_attributes(features, attribute_filters)
+            record_attribute_filters(layer, attribute_filters.keys())
+        
+        # Exports are full resolution unless a zoom is requested
+        try:
+            lod_field = choose_lod_field(get_zoom_param(request.query_params))
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ndjson = export_format == 'ndjson'
+        content = stream_features_geojson(features, ndjson=ndjson, lod_field=lod_field)
+        filename = f"{layer.name}.{'ndjson' if ndjson else 'geojson'}"
+        content_type = 'application/geo+json-seq' if ndjson else 'application/geo+json'
+        
+        if use_gzip:
+            content = compress_sequence(content)
+            filename = f"{filename}.gz"
+            content_type = 'application/gzip'
+        
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Geometry-LOD'] = str(describe_lod(lod_field)['level'])
+        return response
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
+class VectorLayerTileAPIView(APIView):
+    """
+    /api/projects/<project_id>/vector-layers/<layer_id>/tiles/<z>/<x>/<y>.mvt
+    Serve a layer as Mapbox Vector Tiles built with ST_AsMVT (cached in Redis and S3).
+    Optional 'fields' query param: comma-separated attribute keys to include (empty for none).
+    Tiles capped at VECTOR_TILE_MAX_FEATURES carry an 'X-Tile-Truncated: true' header.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, VectorTileRenderer]
+    
+    def get(self, request, project_id, layer_id, z, x, y):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(VectorLayer, id=layer_id, project=project, is_active=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if not is_valid_tile(z, x, y):
+            return Response({'error': f'Invalid tile coordinates {z}/{x}/{y}.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            fields = parse_tile_fields(request.query_params.get('fields'))
+            tile, truncated = get_cached_vector_tile(layer, z, x, y, fields=fields)
+        except Exception as e:
+            logger.error(f"Error building tile {z}/{x}/{y} for layer {layer_id}: {e}")
+            return Response({
+                'error': f'Error building tile: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if not tile:
+            response = HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        else:
+            response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+        if truncated:
+            response['X-Tile-Truncated'] = 'true'
+        return response
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
 #===================================Raster_Layer===========================================
 
 
@@ -1880,6 +2446,73 @@ class RasterLayerDetailAPIView(APIView):
             logger.error(f"Error deleting raster layer: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class RasterLayerTileAPIView(APIView):
+    """
+    /api/projects/<project_id>/raster-layers/<layer_id>/tiles/<z>/<x>/<y>.<png|webp>
+    Serve a raster layer as XYZ tiles rendered straight from its COG (cached in Redis).
+    Optional query params: 'bands' (1 or 3 band indexes), 'rescale' ('min,max', or one
+    pair per band separated by ';'), 'colormap' (single band) and 'resampling'.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, RasterTileRenderer]
+    
+    def get(self, request, project_id, layer_id, z, x, y, image_format):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(RasterLayer, id=layer_id, project=project, deleted_at__isnull=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return _raster_tile_response(request, layer, z, x, y, image_format)
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
+def _raster_tile_response(request, source, z, x, y, image_format, default_colormap=None):
+    """Validate a tile request, render (or fetch) the tile and wrap it in an image response."""
+    if not is_valid_tile(z, x, y):
+        return Response({'error': f'Invalid tile coordinates {z}/{x}/{y}.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if image_format not in RASTER_TILE_FORMATS:
+        return Response({
+            'error': f"Unsupported tile format '{image_format}'. Options: {', '.join(RASTER_TILE_FORMATS)}."
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not has_tileable_cog(source):
+        return Response({
+            'error': 'Tiles are only served from Cloud-Optimized GeoTIFFs and this raster has none. Use the GeoServer WMS layer instead.'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    try:
+        params = parse_raster_tile_params(request.query_params, getattr(source, 'band_count', None))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if default_colormap and not params['colormap'] and not params['bands']:
+        params['colormap'] = default_colormap
+    
+    try:
+        tile = get_cached_raster_tile(source, z, x, y, image_format, **params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error rendering raster tile {z}/{x}/{y} for {source.id}: {e}")
+        return Response({
+            'error': f'Error rendering tile: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    if not tile:
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+    
+    return HttpResponse(tile, content_type=RASTER_TILE_FORMATS[image_format][1])
+
 class RasterLayerUploadAPIView(APIView):
     """
     /api/projects/<project_id>/raster-layers/upload
@@ -2450,6 +3083,225 @@ class StreetImageGeoAPIView(APIView):
 
 
 
+class StreetImageClusterAPIView(APIView):
+    """
+    GET /api/projects/<project_id>/street-images/clusters/?zoom=<z>&bbox=minx,miny,maxx,maxy
+    Street image locations aggregated into grid clusters for the map.
+    Returns individual images from VECTOR_CLUSTER_MAX_ZOOM on.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, project_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            zoom, bbox = parse_cluster_params(request.query_params)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            if not should_cluster(zoom):
+                images = StreetImage.objects.filter(
+                    project=project, is_active=True, location__isnull=False
+                ).order_by('-uploaded_at')
+                if bbox:
+                    images = images.filter(location__bboverlaps=Polygon.from_bbox(bbox))
+                features, truncated = self._image_features(images)
+                return Response({
+                    'type': 'FeatureCollection',
+                    'features': features,
+                    'clustered': False,
+                    'truncated': truncated,
+                    'zoom': zoom
+                }, status=status.HTTP_200_OK)
+            
+            clusters = cluster_points(
+                StreetImage._meta.db_table, 'location',
+                'project_id = %s AND is_active AND location IS NOT NULL', [str(project.id)],
+                zoom, bbox
+            )
+            
+            # Single-image cells are drawn as the image itself
+            single_ids = [cluster['id'] for cluster in clusters if cluster['count'] == 1]
+            images = StreetImage.objects.filter(id__in=single_ids)
+            properties = {str(image.id): self._image_properties(image) for image in images}
+            
+            return Response({
+                'type': 'FeatureCollection',
+                'features': [cluster_feature(cluster, properties.get(cluster['id'])) for cluster in clusters],
+                'clustered': True,
+                'total_images': sum(cluster['count'] for cluster in clusters),
+                'zoom': zoom
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Error clustering street images: {e}")
+            return Response({
+                'error': f'Error clustering street images: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _image_features(self, images):
+        """GeoJSON features of individual images, capped at VECTOR_CLUSTER_MAX_POINTS"""
+        max_points = getattr(settings, 'VECTOR_CLUSTER_MAX_POINTS', 5000)
+        images = list(images[:max_points + 1])
+        features = [
+            {
+                'type': 'Feature',
+                'id': str(image.id),
+                'geometry': {'type': 'Point', 'coordinates': [image.location.x, image.location.y]},
+                'properties': {'cluster': False, **self._image_properties(image)}
+            }
+            for image in images[:max_points]
+        ]
+        return features, len(images) > max_points
+    
+    def _image_properties(self, image):
+        """Properties of an individual image point, as returned by the street image geo views"""
+        return {
+            'streetimage_id': str(image.id),
+            'original_filename': image.original_filename,
+            'file_path': image.file_path,
+            'image_type': image.image_type,
+            'uploaded_at': image.uploaded_at.isoformat(),
+            'view_image_url': image.file_path
+        }
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
+class VectorLayerClusterAPIView(APIView):
+    """
+    GET /api/projects/<project_id>/vector-layers/<layer_id>/clusters/?zoom=<z>&bbox=minx,miny,maxx,maxy
+    Features of a point layer aggregated into grid clusters for the map.
+    Returns individual features from VECTOR_CLUSTER_MAX_ZOOM on.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, project_id, layer_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(VectorLayer, id=layer_id, project=project, is_active=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if layer.geometry_type not in ('Point', 'MultiPoint'):
+            return Response({
+                'error': 'Clustering is only available for point layers.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            zoom, bbox = parse_cluster_params(request.query_params)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            if not should_cluster(zoom):
+                features = VectorFeature.objects.filter(layer=layer).order_by()
+                if bbox:
+                    features = features.filter(geom__bboverlaps=Polygon.from_bbox(bbox))
+                max_points = getattr(settings, 'VECTOR_CLUSTER_MAX_POINTS', 5000)
+                features = list(features[:max_points + 1])
+                return Response({
+                    'type': 'FeatureCollection',
+                    'features': [
+                        {
+                            'type': 'Feature',
+                            'id': str(feature.id),
+                            'geometry': json.loads(feature.geom.geojson),
+                            'properties': {'cluster': False, **feature.attributes}
+                        }
+                        for feature in features[:max_points]
+                    ],
+                    'clustered': False,
+                    'truncated': len(features) > max_points,
+                    'zoom': zoom
+                }, status=status.HTTP_200_OK)
+            
+            clusters = cluster_points(
+                VectorFeature._meta.db_table, 'geom', 'layer_id = %s', [str(layer.id)], zoom, bbox
+            )
+            
+            # Single-feature cells carry the feature's attributes
+            single_ids = [cluster['id'] for cluster in clusters if cluster['count'] == 1]
+            attributes = {
+                str(feature_id): feature_attributes
+                for feature_id, feature_attributes in VectorFeature.objects.filter(
+                    layer=layer, id__in=single_ids
+                ).values_list('id', 'attributes')
+            }
+            
+            return Response({
+                'type': 'FeatureCollection',
+                'features': [cluster_feature(cluster, attributes.get(cluster['id'])) for cluster in clusters],
+                'clustered': True,
+                'total_features': sum(cluster['count'] for cluster in clusters),
+                'zoom': zoom
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Error clustering layer features: {e}")
+            return Response({
+                'error': f'Error clustering layer features: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
+class VectorLayerAttributesAPIView(APIView):
+    """
+    GET /api/projects/<project_id>/vector-layers/<layer_id>/attributes/
+    Attribute catalog of a layer: keys, types, null ratios, distinct counts,
+    most frequent values and numeric ranges. The catalog is built in the background:
+    when it is missing, or ?refresh=true is passed, a rebuild is queued and the current
+    (possibly empty) catalog is returned with 202 Accepted.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, project_id, layer_id):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        layer = get_object_or_404(VectorLayer, id=layer_id, project=project, is_active=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        refresh = request.query_params.get('refresh', 'false').lower() in ('true', '1', 'yes')
+        # Layers ingested before the catalog existed are cataloged on first request
+        refreshing = refresh or layer.attribute_catalog_updated_at is None
+        if refreshing:
+            schedule_attribute_catalog_refresh(layer)
+        
+        return Response({
+            'layer_id': str(layer.id),
+            'feature_count': layer.attribute_catalog.get('feature_count', 0),
+            'attributes': layer.attribute_catalog.get('attributes', []),
+            'updated_at': layer.attribute_catalog_updated_at,
+            'refreshing': refreshing
+        }, status=status.HTTP_202_ACCEPTED if refreshing else status.HTTP_200_OK)
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or 
+                user in project.managers.all() or user in project.editors.all() or 
+                user in project.viewers.all() or user in project.reviewers.all())
+
+
 class StreetImageryLayerAPIView(APIView):
     """
     Get street imagery layer information for a project
@@ -2639,3 +3491,31 @@ class TerrainModelDetailAPIView(APIView):
         return (user.is_admin or user == project.project_head or
                 user in project.managers.all() or user in project.editors.all() or
                 user in project.viewers.all() or user in project.reviewers.all())
+
+
+class TerrainModelTileAPIView(APIView):
+    """
+    /api/projects/<project_id>/terrain-models/<model_id>/tiles/<z>/<x>/<y>.<png|webp>
+    Serve a terrain model as XYZ tiles rendered straight from its COG (cached in Redis).
+    Elevations are stretched over the model's elevation range with the 'terrain' colormap
+    unless 'rescale' / 'colormap' are given.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, RasterTileRenderer]
+    
+    def get(self, request, project_id, model_id, z, x, y, image_format):
+        user = request.user
+        project = get_object_or_404(Project, id=project_id, company=user.company)
+        terrain_model = get_object_or_404(TerrainModel, id=model_id, project=project, is_active=True)
+        
+        # Check project access
+        if not self._has_project_access(user, project):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return _raster_tile_response(request, terrain_model, z, x, y, image_format, default_colormap='terrain')
+    
+    def _has_project_access(self, user, project):
+        """Check if user has access to project"""
+        return (user.is_admin or user == project.project_head or
+                user in project.managers.all() or user in project.editors.all() or
+                user in project.viewers.all() or user in project.reviewers.all())